@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+'''
+Compare the installed JSON decoders on an option chain response: decoding
+the whole body, extracting only the quote records, extracting only a few
+fields of each, and each of those through to the quote DataFrame.
+
+    python benchmarks/bench_decode.py [--payload recorded.json] [--number N]
+'''
+
+import argparse
+import json
+import timeit
+
+import payloads
+from tradeking import api
+from tradeking import decoders
+
+
+FIELDS = ('bid', 'ask', 'strikeprice', 'xdate', 'put_call')
+
+
+def cases(decoder, content):
+    quotes = api._quote_records()
+    fields = api._quote_records(FIELDS)
+
+    return (
+        ('loads', lambda: decoder.loads(content)),
+        ('extract', lambda: decoders.decode(decoder, content, quotes)),
+        ('extract fields', lambda: decoders.decode(decoder, content, fields)),
+        ('loads + df', lambda: api._quotes_to_df(
+            decoder.loads(content)['response']['quotes']['quote'])),
+        ('extract + df', lambda: api._quotes_to_df(
+            decoders.decode(decoder, content, quotes))),
+        ('fields + df', lambda: api._quotes_to_df(
+            decoders.decode(decoder, content, fields))),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--payload', help='recorded market/ext/quotes or '
+                                          'market/options/search JSON')
+    parser.add_argument('--number', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.payload is None:
+        content = json.dumps(payloads.chain()).encode('utf-8')
+    else:
+        with open(args.payload, 'rb') as f:
+            content = f.read()
+
+    expected = decoders.get('json').loads(content)
+    print('%d quotes, %.1f MB' % (len(expected['response']['quotes']['quote']),
+                                  len(content) / 1e6))
+
+    for name in decoders.DECODERS:
+        decoder = decoders.get(name)
+
+        if decoder.loads(content) != expected:
+            raise AssertionError('%s decodes differently' % name)
+
+        for case, func in cases(decoder, content):
+            elapsed = timeit.timeit(func, number=args.number)
+            print('%-9s %-15s %10.3f ms/chain' %
+                  (name, case, elapsed / args.number * 1000))
+
+
+if __name__ == '__main__':
+    main()
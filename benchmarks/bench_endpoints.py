@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+'''
+Measure end-to-end throughput of Market.quotes, Options.quote,
+Options.search and Account.holdings against a replayed cassette.
+
+Without --cassette a synthetic cassette is recorded first from payloads
+shaped like the API's. Record a real one with transport.Recorder and the
+same calls to benchmark against live data offline.
+
+    python benchmarks/bench_endpoints.py [--cassette ibm.json.gz]
+        [--latency SECONDS] [--number N]
+'''
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import payloads
+from tradeking import api
+from tradeking import transport
+from tradeking import utils
+
+
+ACCOUNT = '12345678'
+UNDERLYING = 'IBM'
+STOCKS = ['SYM%d' % i for i in range(500)]
+
+
+def _holdings(num_holdings=200):
+    return [{'accounttype': '1',
+             'costbasis': str(1000 + i),
+             'gainloss': str(i - 100),
+             'instrument': {'cusip': '%09d' % i, 'desc': 'SYM%d' % i,
+                            'factor': '0', 'sectyp': 'CS',
+                            'sym': 'SYM%d' % i},
+             'marketvalue': str(1100 + i),
+             'marketvaluechange': '0',
+             'price': '%.2f' % (10 + i / 10.0),
+             'purchaseprice': '10.00',
+             'qty': str(100 + i),
+             'quote': {'change': '0', 'lastprice': '%.2f' % (10 + i / 10.0)},
+             'underlying': None}
+            for i in range(num_holdings)]
+
+
+class Synthetic(object):
+    '''Transport answering the benchmarked endpoints from payloads.'''
+    def __init__(self):
+        chain = payloads.chain(UNDERLYING)
+        self.chain = chain
+        self.quotes = dict((quote['symbol'], quote)
+                           for quote in chain['response']['quotes']['quote'])
+
+        for symbol in STOCKS:
+            quote = dict(next(iter(self.quotes.values())))
+            quote['symbol'] = symbol
+            self.quotes[symbol] = quote
+
+        parsed = utils.parse_option_symbols(list(self.quotes)[:-len(STOCKS)])
+        self.strikes = sorted(set(parsed['strike'] / utils.Price.BASE))
+        self.expirations = sorted(set(
+            parsed['expiration'].dt.strftime('%Y-%m-%d')))
+
+    def _body(self, method, url, data):
+        path = url.split('?')[0]
+
+        if path.endswith('market/ext/quotes.json'):
+            symbols = data['symbols'].split(',')
+            quotes = [self.quotes[symbol] for symbol in symbols]
+            return {'response': {'quotes': {'quote': quotes}}}
+
+        if path.endswith('market/options/strikes.json'):
+            return {'response': {'prices': {'price': [
+                '%.2f' % strike for strike in self.strikes]}}}
+
+        if path.endswith('market/options/expirations.json'):
+            return {'response': {'expirationdates': {
+                'date': self.expirations}}}
+
+        if path.endswith('market/options/search.json'):
+            return self.chain
+
+        if path.endswith('holdings.json'):
+            return {'response': {'accountholdings': {
+                'holding': _holdings(), 'totalsecurities': '0'}}}
+
+        raise KeyError(url)
+
+    def request(self, method, url, data=None, **kwargs):
+        body = json.dumps(self._body(method, url, data)).encode('utf-8')
+        return transport.response(content=body, url=url,
+                                  headers={'Content-Type':
+                                           'application/json'})
+
+
+def tradeking(transport_):
+    return api.TradeKing('', '', '', '', scheduler=False, coalesce=False,
+                         transport=transport_)
+
+
+def cases(tkapi):
+    market = tkapi.market
+    account = tkapi.account(ACCOUNT)
+
+    return (
+        ('Market.quotes', lambda: market.quotes(STOCKS)),
+        ('Options.quote', lambda: market.options.quote(UNDERLYING)),
+        ('Options.search',
+         lambda: market.options.search(UNDERLYING, 'strikeprice >= 0')),
+        ('Account.holdings', lambda: account.holdings),
+    )
+
+
+def record(path):
+    '''Record a cassette of every benchmarked call from Synthetic.'''
+    with transport.Recorder(path, transport=Synthetic()) as recorder:
+        for name, func in cases(tradeking(recorder)):
+            func()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cassette')
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--jitter', type=float, default=0)
+    parser.add_argument('--number', type=int, default=5)
+    args = parser.parse_args()
+
+    cassette = args.cassette
+
+    if cassette is None:
+        fd, cassette = tempfile.mkstemp(suffix='.json.gz')
+        os.close(fd)
+        record(cassette)
+
+    replay = transport.Replay(cassette, latency=args.latency,
+                              jitter=args.jitter)
+
+    try:
+        for name, func in cases(tradeking(replay)):
+            result = func()
+            rows = len(result)
+            requests = replay.requests
+
+            start = time.perf_counter()
+            for _ in range(args.number):
+                func()
+            elapsed = (time.perf_counter() - start) / args.number
+            requests = (replay.requests - requests) / args.number
+
+            print('%-18s %8.1f calls/s %12.0f rows/s %5.0f requests/call' %
+                  (name, 1 / elapsed, rows / elapsed, requests))
+    finally:
+        if args.cassette is None:
+            os.unlink(cassette)
+
+
+if __name__ == '__main__':
+    main()
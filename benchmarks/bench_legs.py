@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+'''
+Compare the memory use and build time of a LegStore against a list of Leg
+instances.
+
+    python benchmarks/bench_legs.py [--legs N]
+'''
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from tradeking import option
+from tradeking import utils
+
+
+def zero(symbol, *args, **kwargs):
+    return 0
+
+
+def symbols(num_legs):
+    expirations = pd.date_range('2014-01-18', periods=20, freq='4W-SAT')
+    strikes = np.arange(num_legs // (2 * len(expirations)) + 1) * 0.5 + 50
+    return utils.option_symbols('IBM', expirations, strikes)[:num_legs]
+
+
+def leg_list(symbols):
+    return [option.Leg(symbol, premium_func=zero) for symbol in symbols]
+
+
+def leg_store(symbols):
+    return option.LegStore.from_symbols(symbols, premium_func=zero)
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--legs', type=int, default=100000)
+    args = parser.parse_args()
+
+    symbols_ = symbols(args.legs)
+    print('%d legs' % len(symbols_))
+
+    price = utils.Price(60)
+    expected = option.Leg(symbols_[-1], premium_func=zero).payoff(price)
+
+    for name, func in (('Leg list', leg_list), ('LegStore', leg_store)):
+        legs, elapsed, size = measure(func, symbols_)
+        assert legs[-1].payoff(price) == expected
+        print('%-10s %10.3f s %12.1f bytes/leg' % (name, elapsed,
+                                                   size / len(legs)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+'''
+Compare template based bulk FIXML serialization against building and
+serializing an lxml tree per order.
+
+    python benchmarks/bench_orders.py [--orders N] [--number N]
+'''
+
+import argparse
+import timeit
+
+from lxml import etree
+
+from tradeking import orders
+
+
+def basket(num_orders):
+    basket = []
+
+    for i in range(num_orders):
+        if i % 4 == 3:
+            basket.append({'account': '12345678',
+                           'legs': [('IBM140118C00190000', orders.SELL, 4),
+                                    ('IBM140118C00200000', orders.BUY, 4)],
+                           'price': -3.10})
+        else:
+            basket.append({'account': '12345678',
+                           'security_type': orders.STOCK,
+                           'security': 'SYM%d' % i,
+                           'quantity': 100 + i,
+                           'side': orders.SELL if i % 2 else orders.BUY})
+
+    return basket
+
+
+def per_order_tree(basket):
+    serialized = []
+
+    for order in basket:
+        if 'legs' in order:
+            fixml = orders.MultiLegOrder(**order)
+        else:
+            fixml = orders.Order(**order)
+
+        serialized.append(etree.tostring(fixml))
+
+    return serialized
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=500)
+    parser.add_argument('--number', type=int, default=10)
+    args = parser.parse_args()
+
+    orders_ = basket(args.orders)
+    assert per_order_tree(orders_) == orders.serialize(orders_)
+
+    for name, func in (('lxml tree', per_order_tree),
+                       ('template', orders.serialize)):
+        elapsed = timeit.timeit(lambda: func(orders_), number=args.number)
+        print('%-10s %12.0f orders/s' % (name,
+                                        args.orders * args.number / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+'''
+Compare the vectorized payoff engine against the per-tick apply path.
+
+    python benchmarks/bench_payoffs.py [--number N]
+'''
+
+import argparse
+import timeit
+
+import pandas as pd
+
+from tradeking import option
+from tradeking import utils
+
+
+def zero(symbol, *args, **kwargs):
+    return 0
+
+
+def per_tick_leg_payoffs(leg):
+    prices = pd.Series(range(leg._start, leg._stop, leg._tick_size))
+
+    payoffs = prices.apply(leg._payoff_func)
+    payoffs.index = prices
+
+    if leg._long_short == utils.SHORT:
+        payoffs = payoffs * -1
+    return payoffs
+
+
+def per_tick_multileg_payoffs(multileg):
+    payoffs = pd.Series(dtype=float)
+    for leg in multileg._legs:
+        payoffs = payoffs.add(per_tick_leg_payoffs(leg), fill_value=0)
+    return payoffs
+
+
+def vectorized_multileg_payoffs(multileg):
+    return pd.Series(multileg._payoffs(multileg._prices()),
+                     index=multileg._prices())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args()
+
+    strangle = option.Strangle('IBM', call_strike=190, put_strike=170,
+                               expiration='2014-01-18', premium_func=zero)
+
+    expected = per_tick_multileg_payoffs(strangle)
+    actual = vectorized_multileg_payoffs(strangle).reindex(expected.index)
+    assert (expected == actual).all()
+
+    for name, func in (('per-tick', per_tick_multileg_payoffs),
+                       ('vectorized', vectorized_multileg_payoffs)):
+        elapsed = timeit.timeit(lambda: func(strangle), number=args.number)
+        print('%-12s %10.3f ms/strategy' % (name,
+                                             elapsed / args.number * 1000))
+
+
+if __name__ == '__main__':
+    main()
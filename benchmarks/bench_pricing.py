@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+'''
+Check the pricing module against reference values then time repricing and
+implied volatility over a synthetic chain.
+
+    python benchmarks/bench_pricing.py [--contracts N] [--number N]
+'''
+
+import argparse
+import timeit
+
+import numpy as np
+
+from tradeking import pricing
+
+
+# NOTE(jkoelker) Hull, Options, Futures and Other Derivatives, examples 15.6
+#                and 19.1 (S=49, K=50, r=0.05, sigma=0.2, 20 weeks), and
+#                Haug, The Complete Guide to Option Pricing Formulas,
+#                Bjerksund-Stensland (1993) call.
+REFERENCES = (
+    ('bs call', lambda: pricing.black_scholes(42, 40, 0.5, 0.1, 0.2, 'C'),
+     4.7594),
+    ('bs put', lambda: pricing.black_scholes(42, 40, 0.5, 0.1, 0.2, 'P'),
+     0.8086),
+    ('delta', lambda: pricing.greeks(49, 50, 0.3846, 0.05, 0.2,
+                                     'C')['delta'], 0.5216),
+    ('gamma', lambda: pricing.greeks(49, 50, 0.3846, 0.05, 0.2,
+                                     'C')['gamma'], 0.0655),
+    ('theta', lambda: pricing.greeks(49, 50, 0.3846, 0.05, 0.2,
+                                     'C')['theta'], -4.3054),
+    ('vega', lambda: pricing.greeks(49, 50, 0.3846, 0.05, 0.2,
+                                    'C')['vega'], 12.1052),
+    ('rho', lambda: pricing.greeks(49, 50, 0.3846, 0.05, 0.2,
+                                   'C')['rho'], 8.9066),
+    ('bs93 call', lambda: pricing.bjerksund_stensland(42, 40, 0.75, 0.04,
+                                                      0.35, 'C', q=0.08),
+     5.2704),
+    ('iv', lambda: pricing.implied_volatility(4.7594, 42, 40, 0.5, 0.1,
+                                              'C'), 0.2),
+)
+
+
+def check():
+    for name, func, expected in REFERENCES:
+        value = float(func())
+        assert abs(value - expected) < 1e-4, (name, value, expected)
+
+
+def chain(num_contracts, seed=0):
+    rng = np.random.default_rng(seed)
+    return {'S': 100.0,
+            'K': rng.uniform(50, 150, num_contracts),
+            'T': rng.uniform(0.02, 2, num_contracts),
+            'r': 0.03,
+            'sigma': rng.uniform(0.1, 0.8, num_contracts),
+            'call_put': rng.random(num_contracts) < 0.5,
+            'q': 0.01}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--contracts', type=int, default=50000)
+    parser.add_argument('--number', type=int, default=5)
+    args = parser.parse_args()
+
+    check()
+
+    c = chain(args.contracts)
+    values = dict((model, pricing.price(model=model, **c))
+                  for model in pricing.MODELS)
+    iv_args = dict((k, v) for k, v in c.items() if k != 'sigma')
+
+    cases = [('greeks', lambda: pricing.greeks(**c))]
+
+    for model in pricing.MODELS:
+        cases.append(('%s price' % model,
+                      lambda model=model: pricing.price(model=model, **c)))
+        cases.append(('%s iv' % model,
+                      lambda model=model: pricing.implied_volatility(
+                          values[model], model=model, **iv_args)))
+
+    for name, func in cases:
+        elapsed = timeit.timeit(func, number=args.number)
+        print('%-16s %12.0f contracts/s' % (name, args.contracts *
+                                            args.number / elapsed))
+
+
+if __name__ == '__main__':
+    main()
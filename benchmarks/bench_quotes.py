@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+'''
+Compare the schema based quote decoder against the per-column clean/astype
+passes it replaced.
+
+    python benchmarks/bench_quotes.py [--payload recorded.json] [--number N]
+'''
+
+import argparse
+import timeit
+
+import pandas as pd
+
+import payloads
+from tradeking import api
+
+
+def column_pass_quotes_to_df(quotes):
+    if not isinstance(quotes, list):
+        quotes = [quotes]
+    df = pd.DataFrame.from_records(quotes, index='symbol')
+
+    for col in df.keys().intersection(api._DATE_KEYS):
+        kwargs = {}
+        if col == 'timestamp':
+            kwargs['unit'] = 's'
+
+        try:
+            df[col] = pd.to_datetime(df[col], **kwargs)
+        except ValueError:
+            pass
+
+    for col in df.keys().intersection(api._INT_KEYS):
+        cleaned = df[col].str.replace(r'[$,%]', '', regex=True)
+        df[col] = cleaned.astype('int', errors='ignore')
+
+    for col in df.keys().intersection(api._FLOAT_KEYS):
+        cleaned = df[col].str.replace(r'[$,%]', '', regex=True)
+        df[col] = cleaned.astype('float', errors='ignore')
+
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--payload', help='recorded market/ext/quotes JSON')
+    parser.add_argument('--number', type=int, default=10)
+    args = parser.parse_args()
+
+    quotes = payloads.load(args.payload)['response']['quotes']['quote']
+    print('%d quotes' % len(quotes))
+
+    for name, func in (('column-pass', column_pass_quotes_to_df),
+                       ('schema', api._quotes_to_df)):
+        elapsed = timeit.timeit(lambda: func(quotes), number=args.number)
+        print('%-12s %10.3f ms/chain' % (name, elapsed / args.number * 1000))
+
+
+if __name__ == '__main__':
+    main()
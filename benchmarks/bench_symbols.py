@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+'''
+Compare the bulk option symbol codec against formatting and parsing one
+symbol at a time.
+
+    python benchmarks/bench_symbols.py [--number N]
+'''
+
+import argparse
+import itertools
+import timeit
+
+import pandas as pd
+
+from tradeking import utils
+
+
+def per_symbol_option_symbol(underlying, expiration, call_put, strike):
+    expiration = pd.to_datetime(expiration).strftime('%y%m%d')
+
+    strike = str(utils.Price.encode(strike))
+    strike = ('0' * (8 - len(strike))) + strike
+
+    return '%s%s%s%s' % (underlying, expiration, call_put, strike)
+
+
+def per_symbol_option_symbols(underlying, expirations, strikes):
+    return [per_symbol_option_symbol(*args) for args in
+            itertools.product([underlying], expirations, 'CP', strikes)]
+
+
+def per_symbol_parse(symbols):
+    return [(symbol[:-15].upper(),
+             pd.to_datetime(symbol[-15:-9], format='%y%m%d'),
+             symbol[-9:-8].upper(),
+             utils.Price.decode(symbol[-8:]))
+            for symbol in symbols]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--number', type=int, default=3)
+    args = parser.parse_args()
+
+    expirations = [d.strftime('%Y-%m-%d')
+                   for d in pd.date_range('2014-01-18', periods=20,
+                                          freq='4W-SAT')]
+    strikes = [50 + 0.5 * i for i in range(500)]
+
+    symbols = utils.option_symbols('IBM', expirations, strikes)
+    assert symbols == per_symbol_option_symbols('IBM', expirations, strikes)
+    print('%d symbols' % len(symbols))
+
+    cases = (
+        ('format per-symbol',
+         lambda: per_symbol_option_symbols('IBM', expirations, strikes)),
+        ('format bulk',
+         lambda: utils.option_symbols('IBM', expirations, strikes)),
+        ('parse per-symbol', lambda: per_symbol_parse(symbols)),
+        ('parse bulk', lambda: utils.parse_option_symbols(symbols)),
+    )
+
+    for name, func in cases:
+        elapsed = timeit.timeit(func, number=args.number)
+        print('%-18s %10.3f ms' % (name, elapsed / args.number * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+'''
+Option chain payloads for the benchmarks.
+
+`load` reads a recorded `market/ext/quotes` JSON response when one is given,
+otherwise `chain` synthesizes a response shaped like the API's.
+'''
+
+import datetime
+import json
+import random
+
+from tradeking import utils
+
+
+def _quote(underlying, expiration, call_put, strike, rng):
+    symbol = utils.option_symbol(underlying, expiration, call_put, strike)
+    bid = round(rng.uniform(0.05, 25), 2)
+    ask = round(bid + rng.uniform(0.01, 0.5), 2)
+    return {
+        'ask': '%.2f' % ask,
+        'asksz': str(rng.randint(1, 500)),
+        'bid': '%.2f' % bid,
+        'bidsz': str(rng.randint(1, 500)),
+        'chg': '%.2f' % rng.uniform(-2, 2),
+        'chg_sign': rng.choice(('u', 'd', 'e')),
+        'contract_size': '100',
+        'date': '2014-01-17',
+        'datetime': '2014-01-17T16:00:00-05:00',
+        'days_to_expiration': str(rng.randint(1, 700)),
+        'hi': '%.2f' % ask,
+        'idelta': '%.4f' % rng.uniform(-1, 1),
+        'igamma': '%.4f' % rng.uniform(0, 0.1),
+        'imp_volatility': '%.4f' % rng.uniform(0.1, 0.8),
+        'incr_vl': str(rng.randint(0, 100)),
+        'irho': '%.4f' % rng.uniform(-0.5, 0.5),
+        'issue_desc': '%s %s %s %.2f' % (underlying, expiration, call_put,
+                                         strike),
+        'itheta': '%.4f' % rng.uniform(-0.5, 0),
+        'ivega': '%.4f' % rng.uniform(0, 0.5),
+        'last': '%.2f' % bid,
+        'lo': '%.2f' % bid,
+        'openinterest': '{:,}'.format(rng.randint(0, 50000)),
+        'opn': '%.2f' % bid,
+        'pchg': '%.2f %%' % rng.uniform(-10, 10),
+        'pcls': '%.2f' % bid,
+        'pr_openinterest': str(rng.randint(0, 50000)),
+        'prem_mult': '100',
+        'put_call': 'call' if call_put == utils.CALL else 'put',
+        'rootsymbol': underlying,
+        'secclass': '1',
+        'strikeprice': '%.2f' % strike,
+        'symbol': symbol,
+        'timestamp': '1389992400',
+        'tr_num': str(rng.randint(0, 1000)),
+        'undersymbol': underlying,
+        'vl': str(rng.randint(0, 10000)),
+        'xdate': expiration.replace('-', ''),
+        'xday': expiration[8:],
+        'xmonth': expiration[5:7],
+        'xyear': expiration[:4],
+    }
+
+
+def chain(underlying='IBM', num_expirations=10, num_strikes=250, seed=0):
+    '''Synthesize a quotes response for a full option chain.'''
+    rng = random.Random(seed)
+    start = datetime.date(2014, 1, 18)
+    expirations = [(start + datetime.timedelta(weeks=4 * i)).isoformat()
+                   for i in range(num_expirations)]
+    strikes = [50 + 2.5 * i for i in range(num_strikes)]
+
+    quotes = [_quote(underlying, expiration, call_put, strike, rng)
+              for expiration in expirations
+              for call_put in (utils.CALL, utils.PUT)
+              for strike in strikes]
+    return {'response': {'@id': 'benchmark', 'quotes': {'quote': quotes}}}
+
+
+def load(path=None, **kwargs):
+    '''Load a recorded quotes response from `path`, or synthesize one.'''
+    if path is None:
+        return chain(**kwargs)
+
+    with open(path) as f:
+        return json.load(f)
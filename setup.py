@@ -20,6 +20,12 @@ setup(name='tradeking',
           'lxml',
           'requests',
           'requests_oauthlib',
+          'numpy',
           'pandas',
       ],
+      extras_require={
+          'async': ['aiohttp'],
+          'orjson': ['orjson'],
+          'simdjson': ['pysimdjson'],
+      },
       )
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+'''A local HTTP server answering API requests from canned responses.'''
+
+import http.server
+import json
+import select
+import socket
+import sys
+import threading
+import urllib.parse
+
+
+class Chunked(object):
+    '''
+    A response body sent with chunked transfer encoding, one write per
+        item of `chunks` (bytes). With `hold` the connection then stays open,
+        sending nothing, until the client closes it or the server stops, as
+        a quiet stream does; otherwise the body ends after the last chunk.
+    '''
+    def __init__(self, chunks, hold=False):
+        self.chunks = list(chunks)
+        self.hold = hold
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # NOTE(jkoelker) Clients hanging up on a stream are expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super(_Server, self).handle_error(request, client_address)
+
+
+class StubServer(object):
+    '''
+    Serve `routes`, a dict of path (without the format), or of (method,
+        path) to tell methods apart, to a list of (status, body, headers)
+        responses given in order, repeating the last one, or to a callable
+        taking (method, path, query, body) and returning one response.
+        Bodies that are not bytes or Chunked are sent as JSON.
+
+    `requests` records the (method, path, query, body) of every request.
+
+        with StubServer({'/v1/market/clock': [(200, {...}, {})]}) as server:
+            tkapi = TradeKing(..., base_url=server.url + '/v1')
+    '''
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+        self._served = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._server = _Server(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        args=(0.01,), daemon=True)
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d' % self._server.server_address[1]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopping.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def respond(self, method, path, query, body):
+        path = path.rsplit('.', 1)[0]
+
+        with self._lock:
+            self.requests.append((method, path, query, body))
+            route = (method, path)
+
+            if route not in self.routes:
+                route = path
+
+            responses = self.routes.get(route)
+
+            if not responses:
+                return 404, {'response': {'error': 'Not found'}}, {}
+
+            if callable(responses):
+                return responses(method, path, query, body)
+
+            served = self._served.get(route, 0)
+            self._served[route] = served + 1
+            return responses[min(served, len(responses) - 1)]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _hold(self):
+                while not stub._stopping.is_set():
+                    readable = select.select([self.connection], [], [],
+                                             0.01)[0]
+
+                    if readable and not self.connection.recv(
+                            1, socket.MSG_PEEK):
+                        return
+
+            def _chunked(self, status, chunked, headers):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Transfer-Encoding', 'chunked')
+
+                for name, value in headers.items():
+                    self.send_header(name, value)
+
+                self.end_headers()
+
+                try:
+                    for chunk in chunked.chunks:
+                        self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk),
+                                                              chunk))
+                        self.wfile.flush()
+
+                    if chunked.hold:
+                        self._hold()
+                    else:
+                        self.wfile.write(b'0\r\n\r\n')
+                except OSError:
+                    pass
+
+                self.close_connection = True
+
+            def _respond(self):
+                url = urllib.parse.urlsplit(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8')
+                status, content, headers = stub.respond(
+                    self.command, url.path, urllib.parse.parse_qs(url.query),
+                    urllib.parse.parse_qs(body))
+
+                if isinstance(content, Chunked):
+                    return self._chunked(status, content, headers)
+
+                if not isinstance(content, bytes):
+                    content = json.dumps(content).encode('utf-8')
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+
+                for name, value in headers.items():
+                    self.send_header(name, value)
+
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = _respond
+            do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
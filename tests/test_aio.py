@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from tradeking import aio
+from tradeking import api
+from tradeking import cache
+from tradeking import orders
+from tradeking import timesales
+
+from tests import stub
+
+
+ACCOUNTS = ('11111111', '22222222')
+
+
+def _quote(symbol, last):
+    return {'symbol': symbol, 'bid': '%.2f' % (last - 0.01),
+            'ask': '%.2f' % (last + 0.01), 'last': '%.2f' % last,
+            'vl': '1,000', 'datetime': '2014-01-17T15:59:00-05:00'}
+
+
+def _holding(sym, cusip, qty):
+    return {'accounttype': '1', 'costbasis': '100', 'qty': qty,
+            'instrument': {'cusip': cusip, 'sectyp': 'CS', 'sym': sym}}
+
+
+def _order():
+    return orders.Order(ACCOUNTS[0], orders.STOCK, 'IBM', 10)
+
+
+def _ok(body):
+    return [(200, {'response': body}, {})]
+
+
+def routes():
+    quotes = {'quotes': {'quote': [_quote('IBM', 187.74),
+                                   _quote('F', 15.44)]}}
+    routes = {
+        '/v1/market/clock': _ok({'@id': 'x', 'date': '2014-01-17 16:00:00',
+                                 'status': {'current': 'close'}}),
+        '/v1/market/ext/quotes': _ok(quotes),
+        '/v1/market/options/search': _ok(quotes),
+        '/v1/market/options/strikes': _ok({'prices': {'price': ['180',
+                                                                '185']}}),
+        '/v1/market/options/expirations': _ok({'expirationdates': {
+            'date': ['2014-02-22', '2014-03-22']}}),
+        '/v1/market/toplists/toppctgainers': _ok(quotes),
+        '/v1/market/timesales': _ok({'quotes': {'quote': [
+            {'timestamp': '1389882600', 'opn': '187.0', 'hi': '188.0',
+             'lo': '186.5', 'last': '187.5', 'vl': '1000',
+             'incr_vl': '1000'},
+            {'timestamp': '1389882900', 'opn': '187.5', 'hi': '188.5',
+             'lo': '187.0', 'last': '188.0', 'vl': '2000',
+             'incr_vl': '1000'}]}}),
+        '/v1/accounts': _ok({'accounts': {'accountsummary': [
+            {'account': account} for account in ACCOUNTS]}}),
+    }
+
+    for i, account in enumerate(ACCOUNTS):
+        path = '/v1/accounts/%s/' % account
+        routes[path + 'balances'] = _ok({'accountbalance': {
+            'account': account, 'accountvalue': '%d' % (1000 * (i + 1))}})
+        routes[path + 'holdings'] = _ok({'accountholdings': {'holding': [
+            _holding('IBM', '459200101', '10'),
+            _holding('AAPL', '037833100', '%d' % (5 + i))]}})
+        routes[('GET', path + 'orders')] = _ok({'orderstatus': {
+            'order': []}})
+        routes[path + 'history'] = _ok({'transactions': {'transaction': [
+            {'date': '2014-01-16T00:00:00-05:00', 'amount': '-1877.40'},
+            {'date': '2014-01-17T00:00:00-05:00', 'amount': '10.00'}]}})
+        routes[path + 'orders/preview'] = _ok({'error': 'Success'})
+        routes[('POST', path + 'orders')] = _ok({'error': 'Success',
+                                                 'clientorderid': '1'})
+
+    return routes
+
+
+@unittest.skipIf(aio.aiohttp is None, 'aiohttp is not installed')
+class AsyncTradeKingTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = stub.StubServer(routes())
+        self.server.__enter__()
+        self.base_url = self.server.url + '/v1'
+        self.tkapi = aio.TradeKing('key', 'secret', 'token', 'secret',
+                                   base_url=self.base_url)
+        self.sync = api.TradeKing('key', 'secret', 'token', 'secret',
+                                  base_url=self.base_url)
+
+    async def asyncTearDown(self):
+        await self.tkapi.close()
+        self.server.__exit__(None, None, None)
+
+    def _requests(self, path):
+        return [r for r in self.server.requests if r[1] == path]
+
+    async def test_clock(self):
+        clock = await self.tkapi.market.clock()
+        self.assertEqual(clock['status'], {'current': 'close'})
+
+    async def test_memoized(self):
+        tkapi = aio.TradeKing('key', 'secret', 'token', 'secret',
+                              base_url=self.base_url,
+                              cache=cache.MemoryCache())
+        self.addAsyncCleanup(tkapi.close)
+        options = tkapi.market.options
+
+        for symbol in ('IBM', 'ibm'):
+            pd.testing.assert_series_equal(
+                await options.strikes(symbol),
+                self.sync.market.options.strikes(symbol))
+            pd.testing.assert_series_equal(
+                await options.expirations(symbol),
+                self.sync.market.options.expirations(symbol))
+
+        clock = await tkapi.market.clock()
+        clock['date'] = 'changed'
+        self.assertEqual((await tkapi.market.clock())['date'],
+                         '2014-01-17 16:00:00')
+
+        for path in ('strikes', 'expirations'):
+            # NOTE(jkoelker) One from each client, the sync one uncached.
+            self.assertEqual(len(self._requests(
+                '/v1/market/options/' + path)), 3)
+
+        self.assertEqual(len(self._requests('/v1/market/clock')), 1)
+
+    async def test_same_frames_as_sync(self):
+        market = self.tkapi.market
+        pd.testing.assert_frame_equal(await market.quotes(['IBM', 'F']),
+                                      self.sync.market.quotes(['IBM', 'F']))
+        pd.testing.assert_frame_equal(
+            await market.options.search('IBM', 'strikeprice >= 0'),
+            self.sync.market.options.search('IBM', 'strikeprice >= 0'))
+        pd.testing.assert_frame_equal(await market.toplist(),
+                                      self.sync.market.toplist())
+
+    async def test_signed(self):
+        await self.tkapi.market.quotes(['IBM', 'F'])
+        method, path, query, body = self.server.requests[-1]
+        self.assertEqual(method, 'POST')
+        self.assertEqual(body['symbols'], ['IBM,F'])
+
+    async def test_accounts(self):
+        self.assertEqual(await self.tkapi.accounts(), list(ACCOUNTS))
+
+    async def test_snapshot(self):
+        snapshot = await self.tkapi.snapshot()
+        expected = self.sync.snapshot()
+
+        for name in ('balances', 'holdings', 'orders'):
+            pd.testing.assert_frame_equal(getattr(snapshot, name),
+                                          getattr(expected, name))
+
+        self.assertEqual(snapshot.holdings['instrument.cusip'].iloc[1],
+                         '037833100')
+
+    async def test_watch(self):
+        watcher = await self.tkapi.watch()
+        changed = await watcher.poll()
+        self.assertEqual(sorted(changed.balances.index), list(ACCOUNTS))
+        self.assertIsNone(await watcher.poll())
+
+    async def test_iter_history(self):
+        account = self.tkapi.account(ACCOUNTS[0])
+        transactions = [t async for t in account.iter_history()]
+        self.assertEqual(transactions, self.sync.account(
+            ACCOUNTS[0]).history())
+
+    async def test_order(self):
+        response = await self.tkapi.account(ACCOUNTS[0]).order(_order())
+        self.assertEqual(response['error'], 'Success')
+        self.assertEqual(len(self._requests(
+            '/v1/accounts/%s/orders/preview' % ACCOUNTS[0])), 1)
+
+    async def test_basket(self):
+        results = await self.tkapi.account(ACCOUNTS[0]).basket(
+            [_order() for _ in range(3)], max_workers=2)
+
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result.error is None for result in results))
+        self.assertTrue(all(result.response['clientorderid'] == '1'
+                            for result in results))
+
+    async def test_basket_rejected_preview(self):
+        path = '/v1/accounts/%s/' % ACCOUNTS[0]
+        self.server.routes[path + 'orders/preview'] = _ok(
+            {'error': 'Insufficient funds'})
+
+        with self.assertRaises(api.OrderError) as raised:
+            await self.tkapi.account(ACCOUNTS[0]).basket(
+                [_order() for _ in range(3)])
+
+        self.assertTrue(any(result.error == 'Insufficient funds'
+                            for result in raised.exception.results))
+        self.assertEqual(self._requests(path + 'orders'), [])
+
+    async def test_timesales(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.tkapi.market.timesales_store = timesales.Store(path)
+
+        bars = await self.tkapi.market.timesales('IBM', '2014-01-06',
+                                                 '2014-01-07')
+        self.assertEqual(len(bars), 4)
+        self.assertEqual(len(self._requests('/v1/market/timesales')), 2)
+
+        cached = await self.tkapi.market.timesales('IBM', '2014-01-06',
+                                                   '2014-01-07')
+        pd.testing.assert_frame_equal(cached, bars)
+        self.assertEqual(len(self._requests('/v1/market/timesales')), 2)
+
+    async def test_unsupported(self):
+        self.assertEqual(self.tkapi.market.batch_window, 0)
+
+        with self.assertRaises(NotImplementedError):
+            self.tkapi.market.batch_window = 0.01
+
+        with self.assertRaises(NotImplementedError):
+            self.tkapi.market.stream(['IBM'])
+
+
+@unittest.skipIf(aio.aiohttp is None, 'aiohttp is not installed')
+class OutsideLoopTest(unittest.TestCase):
+    def test_created_outside_a_loop(self):
+        with stub.StubServer(routes()) as server:
+            tkapi = aio.TradeKing('key', 'secret', 'token', 'secret',
+                                  base_url=server.url + '/v1')
+            self.assertIsNone(tkapi._api._semaphore)
+
+            async def clock():
+                try:
+                    return await tkapi.market.clock()
+                finally:
+                    await tkapi.close()
+
+            self.assertEqual(asyncio.run(clock())['status'],
+                             {'current': 'close'})
+            self.assertIsNotNone(tkapi._api._semaphore)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tradeking import batch
+from tradeking import option
+from tradeking import utils
+
+
+EXPIRATION = '2014-02-22'
+SYMBOL = 'IBM140222C00180000'
+
+
+def _premium(symbol):
+    return utils.Price(1.25)
+
+
+def _spread(buy_strike, sell_strike):
+    return pd.DataFrame({'strategy': 'spread', 'underlying': 'IBM',
+                         'expiration': EXPIRATION,
+                         'long_short': [utils.LONG, utils.SHORT],
+                         'call_put': utils.CALL,
+                         'strike': [buy_strike, sell_strike],
+                         'premium': 1.25})
+
+
+class EvaluateTest(unittest.TestCase):
+    def assertMatches(self, legs, multileg, include_premium=True):
+        result = batch.evaluate(legs, include_premium=include_premium)
+        expected = multileg.payoffs - multileg.cost
+
+        if include_premium:
+            expected = expected - multileg.premium
+
+        payoffs = result.payoffs.iloc[0]
+        np.testing.assert_array_equal(payoffs.index.to_numpy(),
+                                      expected.index.to_numpy())
+        np.testing.assert_array_equal(payoffs.to_numpy(),
+                                      expected.to_numpy())
+        self.assertEqual(result.max_profit.iloc[0], expected.max())
+        self.assertEqual(result.max_loss.iloc[0], expected.min())
+        return result
+
+    def test_straddle(self):
+        legs = batch.straddles('IBM', [EXPIRATION], [180.0])
+        legs['premium'] = 1.25
+        self.assertMatches(legs, option.Straddle(SYMBOL,
+                                                 premium_func=_premium))
+
+    def test_strangle(self):
+        legs = batch.strangles('IBM', [EXPIRATION], [170.0], [190.0])
+        result = self.assertMatches(legs, option.Strangle(
+            SYMBOL, call_strike=190, put_strike=170, premium_func=_premium),
+            include_premium=False)
+
+        self.assertEqual(result.breakevens.iloc[0], (163750.0, 196250.0))
+
+    def test_collar(self):
+        legs = batch.collars('IBM', [EXPIRATION], [180.0], [190.0])
+        self.assertMatches(legs, option.Collar(
+            SYMBOL, put_strike=180, call_strike=190, premium_func=_premium),
+            include_premium=False)
+
+    def test_spread(self):
+        multileg = option.MultiLeg(
+            option.Leg(SYMBOL, premium_func=_premium),
+            option.Leg('IBM140222C00190000', long_short=utils.SHORT,
+                       premium_func=_premium))
+        result = self.assertMatches(_spread(180.0, 190.0), multileg)
+
+        # NOTE(jkoelker) The premiums net out, cost is 6.25.
+        self.assertEqual(result.breakevens.iloc[0], (186250.0,))
+
+    def test_zero_plateau_breakevens(self):
+        strangle = batch.strangles('IBM', [EXPIRATION], [170.0], [190.0])
+        collar = batch.collars('IBM', [EXPIRATION], [180.0], [190.0])
+        straddle = batch.straddles('IBM', [EXPIRATION], [180.0])
+
+        breakevens = [batch.evaluate(legs, include_cost=False)
+                      .breakevens.iloc[0]
+                      for legs in (strangle, collar, straddle)]
+
+        self.assertEqual(breakevens, [(170000.0, 190000.0),
+                                      (180000.0, 190000.0), (180000.0,)])
+
+    def test_many_strategies(self):
+        legs = batch.strangles('IBM', [EXPIRATION], [170.0, 175.0],
+                               [185.0, 190.0])
+        result = batch.evaluate(legs, include_cost=False)
+
+        self.assertEqual(len(result.payoffs), 4)
+        self.assertEqual(result.breakevens.iloc[1], (170000.0, 190000.0))
+        self.assertEqual(result.breakevens.iloc[2], (175000.0, 185000.0))
+
+    def test_empty(self):
+        result = batch.evaluate(batch.straddles('IBM', [EXPIRATION], []))
+
+        self.assertEqual(len(result.payoffs), 0)
+        self.assertEqual(len(result.breakevens), 0)
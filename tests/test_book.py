@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tradeking import api
+from tradeking import book
+from tradeking import stream
+
+from tests import stub
+from tests import test_quotes
+
+
+class QuoteBookTest(unittest.TestCase):
+    def setUp(self):
+        self.book = book.QuoteBook(['IBM', 'F'],
+                                   fields=('bid', 'ask', 'last', 'vl'))
+
+    def test_added_symbols_unchanged(self):
+        self.assertEqual(len(self.book), 2)
+        self.assertIn('IBM', self.book)
+        self.assertEqual(len(self.book.changed()), 0)
+        self.assertTrue(self.book.snapshot().isna().all().all())
+
+    def test_records(self):
+        self.book.update([{'symbol': 'IBM', 'bid': '187.73',
+                           'ask': '187.75', 'vl': '1,000'},
+                          {'symbol': 'AAPL', 'last': '540.00'}])
+
+        changed = self.book.changed()
+        self.assertEqual(list(changed.index), ['IBM', 'AAPL'])
+        self.assertEqual(changed.loc['IBM', 'ask'], 187.75)
+        self.assertEqual(changed.loc['IBM', 'vl'], 1000)
+        self.assertTrue(np.isnan(changed.loc['AAPL', 'bid']))
+        self.assertEqual(len(self.book.changed()), 0)
+        self.assertEqual(list(self.book.snapshot().index),
+                         ['IBM', 'F', 'AAPL'])
+
+    def test_last_update_wins(self):
+        self.book.update([{'symbol': 'IBM', 'bid': '1'},
+                          {'symbol': 'IBM', 'bid': '2'}])
+
+        self.assertEqual(self.book.snapshot().loc['IBM', 'bid'], 2.0)
+
+    def test_missing_values_kept(self):
+        self.book.update({'symbol': 'IBM', 'bid': '1', 'ask': '2'})
+        self.book.changed()
+        self.book.update({'symbol': 'IBM', 'bid': 'n/a'})
+
+        snapshot = self.book.snapshot()
+        self.assertEqual(snapshot.loc['IBM', 'bid'], 1.0)
+        self.assertEqual(snapshot.loc['IBM', 'ask'], 2.0)
+        self.assertEqual(len(self.book.changed()), 0)
+
+    def test_stream_records(self):
+        self.book.update(stream.Quote('F', None, 15.43, 15.45, 100, 200))
+        self.book.update([stream.Trade('F', None, 15.44, 1000, None, None)])
+
+        row = self.book.changed().loc['F']
+        self.assertEqual((row['bid'], row['ask'], row['last'], row['vl']),
+                         (15.43, 15.45, 15.44, 1000))
+
+    def test_frame(self):
+        df = pd.DataFrame({'bid': [1.0, np.nan], 'ask': ['2', '3'],
+                           'other': [5, 6]},
+                          index=pd.Index(['IBM', 'MSFT'], name='symbol'))
+        self.book.update({'symbol': 'MSFT', 'bid': '9'})
+        self.book.update(df)
+
+        snapshot = self.book.snapshot()
+        self.assertEqual(snapshot.loc['MSFT', 'bid'], 9.0)
+        self.assertEqual(snapshot.loc['MSFT', 'ask'], 3.0)
+        self.assertNotIn('other', snapshot.columns)
+
+    def test_changed_without_clear(self):
+        self.book.update({'symbol': 'F', 'bid': '1'})
+
+        self.assertEqual(len(self.book.changed(clear=False)), 1)
+        self.assertEqual(len(self.book.changed()), 1)
+        self.assertEqual(len(self.book.changed()), 0)
+
+    def test_grows(self):
+        small = book.QuoteBook(fields=('bid',), capacity=2)
+        small.update([{'symbol': 'S%d' % i, 'bid': str(i)}
+                      for i in range(5)])
+
+        self.assertGreaterEqual(small.capacity, 5)
+        np.testing.assert_array_equal(small.view('bid'), range(5))
+        self.assertEqual(len(small.changed()), 5)
+
+    def test_view_is_read_only(self):
+        self.book.update({'symbol': 'IBM', 'bid': '1'})
+        view = self.book.view('bid')
+
+        self.assertEqual(len(view), 2)
+        self.assertTrue(np.shares_memory(view, self.book._columns['bid']))
+
+        with self.assertRaises(ValueError):
+            view[0] = 2.0
+
+        self.book.update({'symbol': 'IBM', 'bid': '3'})
+        self.assertEqual(view[0], 3.0)
+
+    def test_snapshot_is_a_copy(self):
+        self.book.update({'symbol': 'IBM', 'bid': '1'})
+        snapshot = self.book.snapshot()
+        self.book.update({'symbol': 'IBM', 'bid': '2'})
+
+        self.assertEqual(snapshot.loc['IBM', 'bid'], 1.0)
+
+
+class PollTest(unittest.TestCase):
+    def test_poll(self):
+        quotes = test_quotes.Quotes()
+        symbols = ['S%02d' % i for i in range(5)]
+
+        with stub.StubServer({test_quotes.PATH: quotes}) as server:
+            tkapi = api.TradeKing('key', 'secret', 'token', 'secret',
+                                  base_url=server.url + '/v1')
+            quote_book = book.QuoteBook(symbols, fields=('bid', 'last'))
+            quote_book.poll(tkapi.market, chunk_size=2)
+            tkapi._api.close()
+
+        self.assertEqual(sorted(map(len, quotes.chunks)), [1, 2, 2])
+        changed = quote_book.changed()
+        self.assertEqual(list(changed.index), symbols)
+        self.assertEqual(changed.loc['S03', 'last'],
+                         float(test_quotes._quote('S03')['last']))
+
+        fids = [r[3]['fids'] for r in server.requests]
+        self.assertEqual(fids, [['bid,last']] * 3)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from tradeking import api
+from tradeking import cache
+from tradeking import scheduler
+
+from tests import stub
+
+
+def _ok(body):
+    return [(200, {'response': body}, {})]
+
+
+ROUTES = {
+    '/v1/market/options/strikes': _ok({'prices': {'price': ['180',
+                                                            '185']}}),
+    '/v1/market/options/expirations': _ok({'expirationdates': {
+        'date': ['2014-02-22', '2014-03-22']}}),
+    '/v1/market/clock': _ok({'@id': 'x', 'date': '2014-01-17 16:00:00',
+                             'status': {'current': 'close'}}),
+}
+
+
+class Counter(object):
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+class CacheTests(object):
+    def test_memoize(self):
+        fetch = Counter()
+
+        self.assertEqual(self.cache.memoize('strikes', ('IBM',), fetch), 1)
+        self.assertEqual(self.cache.memoize('strikes', ('IBM',), fetch), 1)
+        self.assertEqual(self.cache.memoize('strikes', ('F',), fetch), 2)
+
+    def test_symbols_ignore_case(self):
+        fetch = Counter()
+
+        self.cache.memoize('strikes', ('ibm',), fetch)
+        self.assertEqual(self.cache.memoize('strikes', ('IBM',), fetch), 1)
+        self.assertEqual(self.cache.get(('strikes', 'IBM')), 1)
+
+        self.cache.invalidate('strikes', 'Ibm')
+        self.assertEqual(self.cache.memoize('strikes', ('IBM',), fetch), 2)
+
+    def test_invalidate(self):
+        for key in (('strikes', 'IBM'), ('strikes', 'IBMX'),
+                    ('expirations', 'IBM')):
+            self.cache.set(key, key)
+
+        self.cache.invalidate('strikes', 'IBM')
+        self.assertIsNone(self.cache.get(('strikes', 'IBM')))
+        self.assertEqual(self.cache.get(('strikes', 'IBMX')),
+                         ('strikes', 'IBMX'))
+
+        self.cache.invalidate('strikes')
+        self.assertIsNone(self.cache.get(('strikes', 'IBMX')))
+        self.assertIsNotNone(self.cache.get(('expirations', 'IBM')))
+
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.get(('expirations', 'IBM')))
+
+    def test_expired(self):
+        self.cache.set(('clock',), 'stale', ttl=-1)
+        self.assertEqual(self.cache.get(('clock',), 'missing'), 'missing')
+
+    def test_endpoint_ttls(self):
+        self.assertEqual(self.cache.ttls['strikes'], 3600)
+        self.assertEqual(self.cache.ttls['clock'], 1)
+
+
+class MemoryCacheTest(CacheTests, unittest.TestCase):
+    def setUp(self):
+        self.clock = scheduler.FakeClock()
+        self.cache = cache.MemoryCache(maxsize=3, ttls={'clock': 1},
+                                       clock=self.clock.monotonic)
+
+    def test_ttl(self):
+        fetch = Counter()
+
+        self.cache.memoize('clock', (), fetch)
+        self.clock.now += 0.5
+        self.assertEqual(self.cache.memoize('clock', (), fetch), 1)
+        self.clock.now += 0.5
+        self.assertEqual(self.cache.memoize('clock', (), fetch), 2)
+
+        self.cache.memoize('other', (), fetch)
+        self.clock.now += 299
+        self.assertEqual(self.cache.memoize('other', (), fetch), 3)
+        self.clock.now += 1
+        self.assertEqual(self.cache.memoize('other', (), fetch), 4)
+
+    def test_lru(self):
+        for key in 'ABC':
+            self.cache.set((key,), key)
+
+        self.cache.get(('A',))
+        self.cache.set(('D',), 'D')
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertIsNone(self.cache.get(('B',)))
+        self.assertEqual(self.cache.get(('A',)), 'A')
+
+
+class DiskCacheTest(CacheTests, unittest.TestCase):
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.path = os.path.join(path, 'cache', 'tradeking.db')
+        self.cache = cache.DiskCache(self.path, maxsize=3,
+                                     ttls={'clock': 1})
+
+    def test_shared(self):
+        self.cache.set(('strikes', 'IBM'), [180.0, 185.0])
+        other = cache.DiskCache(self.path)
+
+        self.assertEqual(other.get(('strikes', 'IBM')), [180.0, 185.0])
+
+    def test_lru(self):
+        for key in 'ABCD':
+            self.cache.set((key,), key)
+
+        self.assertIsNone(self.cache.get(('A',)))
+        self.assertEqual(self.cache.get(('D',)), 'D')
+
+
+class MemoizeTest(unittest.TestCase):
+    def _api(self, server, **kwargs):
+        return api.TradeKing('key', 'secret', 'token', 'secret',
+                             base_url=server.url + '/v1', **kwargs)
+
+    def _requests(self, server, path):
+        return [r for r in server.requests if r[1] == path]
+
+    def test_options_metadata(self):
+        with stub.StubServer(ROUTES) as server:
+            options = self._api(server,
+                                cache=cache.MemoryCache()).market.options
+
+            self.assertEqual(list(options.strikes('ibm')), [180.0, 185.0])
+            self.assertEqual(list(options.strikes('IBM')), [180.0, 185.0])
+            options.expirations('IBM')
+            expirations = options.expirations('ibm')
+
+        self.assertEqual(len(self._requests(
+            server, '/v1/market/options/strikes')), 1)
+        self.assertEqual(len(self._requests(
+            server, '/v1/market/options/expirations')), 1)
+        self.assertEqual(str(expirations.iloc[1].date()), '2014-03-22')
+
+    def test_clock_is_a_copy(self):
+        with stub.StubServer(ROUTES) as server:
+            market = self._api(server, cache=cache.MemoryCache()).market
+            market.clock['date'] = 'changed'
+            clock = market.clock
+
+        self.assertEqual(clock['date'], '2014-01-17 16:00:00')
+        self.assertEqual(len(self._requests(server, '/v1/market/clock')), 1)
+
+    def test_uncached(self):
+        with stub.StubServer(ROUTES) as server:
+            options = self._api(server).market.options
+            options.strikes('IBM')
+            options.strikes('IBM')
+
+        self.assertEqual(len(self._requests(
+            server, '/v1/market/options/strikes')), 2)
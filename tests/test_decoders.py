@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tradeking import api
+from tradeking import decoders
+
+
+QUOTES = [
+    {'symbol': 'IBM', 'bid': '187.73', 'ask': '187.75', 'pchg': '1.25%',
+     'vl': '3,851,522', 'dollar_value': '$1,234.50', 'eps': '',
+     'datetime': '2014-01-17T15:59:00-05:00', 'exch': 'NYSE'},
+    {'symbol': 'F', 'bid': '15.43', 'ask': '15.44', 'pchg': '-0.5%',
+     'vl': '412', 'dollar_value': '12.00', 'eps': '1.76',
+     'datetime': '2014-01-17T15:58:00-05:00', 'exch': 'NYSE'},
+]
+
+
+def _content(quotes, **response):
+    response['quotes'] = {'quote': quotes}
+    return json.dumps({'response': response}).encode('utf-8')
+
+
+class BackendsTest(unittest.TestCase):
+    def test_order(self):
+        available = [name for name, module in
+                     (('orjson', decoders.orjson), ('json', json),
+                      ('simdjson', decoders.simdjson))
+                     if module is not None]
+
+        self.assertEqual(list(decoders.DECODERS), available)
+        self.assertEqual(decoders.default().name, available[0])
+        self.assertEqual(decoders.get().name, available[0])
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, decoders.get, 'yaml')
+
+    def test_backends_agree(self):
+        content = _content(QUOTES)
+        how = api._quote_records(('bid', 'exch'))
+
+        for name in decoders.DECODERS:
+            decoder = decoders.get(name)
+            self.assertEqual(decoder.name, name)
+            self.assertEqual(decoder.loads(content), json.loads(content))
+            self.assertEqual(decoders.decode(decoder, content,
+                                             api._quote_records()), QUOTES)
+            self.assertEqual(decoders.decode(decoder, content, how),
+                             [{'bid': q['bid'], 'exch': q['exch'],
+                               'symbol': q['symbol']} for q in QUOTES])
+
+
+class MissingPathTest(unittest.TestCase):
+    def test_missing(self):
+        content = json.dumps({'response': {'error': 'Invalid symbol'}})
+
+        for name in decoders.DECODERS:
+            with self.assertRaises(decoders.MissingPath) as raised:
+                decoders.decode(decoders.get(name), content.encode(),
+                                api._quote_records())
+
+            error = raised.exception
+            self.assertIsInstance(error, KeyError)
+            self.assertEqual(error.path, ('response', 'quotes', 'quote'))
+            self.assertEqual(error.error, 'Invalid symbol')
+            self.assertEqual(str(error), 'Response has no '
+                             'response/quotes/quote: Invalid symbol')
+
+    def test_null(self):
+        content = _content(None)
+
+        for name in decoders.DECODERS:
+            with self.assertRaises(decoders.MissingPath) as raised:
+                decoders.decode(decoders.get(name), content,
+                                api._quote_records())
+
+            self.assertIsNone(raised.exception.error)
+            self.assertEqual(str(raised.exception),
+                             'Response has no response/quotes/quote')
+
+    def test_not_json(self):
+        for name in decoders.DECODERS:
+            self.assertIsNone(decoders._error(decoders.get(name),
+                                              b'<html/>'))
+
+
+class CoercionTest(unittest.TestCase):
+    def _frames(self, quotes):
+        content = _content(quotes)
+        return [api._quotes_to_df(decoders.decode(decoders.get(name),
+                                                  content,
+                                                  api._quote_records()))
+                for name in decoders.DECODERS]
+
+    def test_coercions(self):
+        for df in self._frames(QUOTES):
+            self.assertEqual(list(df.index), ['IBM', 'F'])
+            np.testing.assert_array_equal(df['pchg'], [1.25, -0.5])
+            np.testing.assert_array_equal(df['vl'], [3851522, 412])
+            self.assertEqual(df['vl'].dtype, np.int64)
+            np.testing.assert_array_equal(df['dollar_value'],
+                                          [1234.5, 12.0])
+            self.assertTrue(np.isnan(df['eps'].iloc[0]))
+            self.assertEqual(df['eps'].iloc[1], 1.76)
+            self.assertEqual(df['datetime'].iloc[0],
+                             pd.Timestamp('2014-01-17T15:59:00-05:00'))
+            self.assertEqual(list(df['exch']), ['NYSE', 'NYSE'])
+
+    def test_single_dict(self):
+        for df in self._frames(QUOTES[0]):
+            self.assertEqual(list(df.index), ['IBM'])
+            self.assertEqual(df['bid'].iloc[0], 187.73)
+            self.assertEqual(df['vl'].iloc[0], 3851522)
+
+    def test_unparsable_dates_kept(self):
+        quotes = [dict(QUOTES[0], xdate='never')]
+
+        for df in self._frames(quotes):
+            self.assertEqual(df['xdate'].iloc[0], 'never')
+
+    def test_epoch_timestamps(self):
+        quotes = [dict(QUOTES[0], timestamp='1389992340')]
+
+        for df in self._frames(quotes):
+            self.assertEqual(df['timestamp'].iloc[0],
+                             pd.Timestamp('2014-01-17 20:59:00'))
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+import concurrent.futures
+import copy
+import threading
+import unittest
+
+from tradeking import api
+from tradeking import flight
+
+
+TIMEOUT = 5
+
+
+class Gate(object):
+    '''A call that blocks until opened, counting how often it ran.'''
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.entered = threading.Event()
+        self.opened = threading.Event()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+
+        self.entered.set()
+        self.opened.wait(TIMEOUT)
+
+        if self.error is not None:
+            raise self.error
+
+        return self.result
+
+
+def _follow(pool, single, key, func, waiters, **kwargs):
+    '''Submit `waiters` calls and return once all of them are waiting.'''
+    futures = [pool.submit(single.do, key, func, **kwargs)
+               for _ in range(waiters)]
+
+    for _ in range(100):
+        with single._lock:
+            if key in single._calls:
+                break
+
+        threading.Event().wait(0.01)
+
+    # NOTE(jkoelker) Followers block on the leader's future; give them a
+    #                moment to get there before the leader finishes.
+    threading.Event().wait(0.05)
+    return futures
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        self.single = flight.SingleFlight()
+        self.pool = concurrent.futures.ThreadPoolExecutor(8)
+        self.addCleanup(self.pool.shutdown)
+
+    def test_coalesces(self):
+        gate = Gate(result={'quote': [1]})
+        leader = self.pool.submit(self.single.do, 'key', gate)
+        self.assertTrue(gate.entered.wait(TIMEOUT))
+        followers = _follow(self.pool, self.single, 'key', gate, 4)
+        gate.opened.set()
+
+        results = [f.result(TIMEOUT) for f in [leader] + followers]
+        self.assertEqual(gate.calls, 1)
+        self.assertTrue(all(result is gate.result for result in results))
+        self.assertEqual(self.single._calls, {})
+
+    def test_copies_for_followers(self):
+        gate = Gate(result={'quote': [1]})
+        leader = self.pool.submit(self.single.do, 'key', gate,
+                                  copy=copy.deepcopy)
+        self.assertTrue(gate.entered.wait(TIMEOUT))
+        followers = _follow(self.pool, self.single, 'key', gate, 2,
+                            copy=copy.deepcopy)
+        gate.opened.set()
+
+        self.assertIs(leader.result(TIMEOUT), gate.result)
+
+        for future in followers:
+            result = future.result(TIMEOUT)
+            self.assertEqual(result, gate.result)
+            self.assertIsNot(result, gate.result)
+            self.assertIsNot(result['quote'], gate.result['quote'])
+
+    def test_keys_are_separate(self):
+        gate = Gate(result=1)
+        leader = self.pool.submit(self.single.do, 'key', gate)
+        self.assertTrue(gate.entered.wait(TIMEOUT))
+
+        self.assertEqual(self.single.do('other', lambda: 2), 2)
+        gate.opened.set()
+        self.assertEqual(leader.result(TIMEOUT), 1)
+
+    def test_error_reaches_every_caller(self):
+        gate = Gate(error=ValueError('boom'))
+        leader = self.pool.submit(self.single.do, 'key', gate)
+        self.assertTrue(gate.entered.wait(TIMEOUT))
+        followers = _follow(self.pool, self.single, 'key', gate, 3)
+        gate.opened.set()
+
+        for future in [leader] + followers:
+            with self.assertRaises(ValueError):
+                future.result(TIMEOUT)
+
+        self.assertEqual(gate.calls, 1)
+        self.assertEqual(self.single.do('key', lambda: 'again'), 'again')
+
+
+class BatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.fetches = []
+        self.pool = concurrent.futures.ThreadPoolExecutor(8)
+        self.addCleanup(self.pool.shutdown)
+
+    def fetch(self, keys, group):
+        self.fetches.append((sorted(keys), group))
+        return dict((key, '%s:%s' % (group, key)) for key in keys)
+
+    @staticmethod
+    def split(result, keys):
+        return [result[key] for key in keys]
+
+    def test_window_merges_callers(self):
+        batcher = flight.Batcher(self.fetch, self.split, 0.2)
+        futures = [self.pool.submit(batcher.submit, keys)
+                   for keys in (['IBM'], ['F', 'IBM'], ['AAPL'])]
+
+        self.assertEqual([f.result(TIMEOUT) for f in futures],
+                         [['None:IBM'], ['None:F', 'None:IBM'],
+                          ['None:AAPL']])
+        self.assertEqual(self.fetches, [(['AAPL', 'F', 'IBM'], None)])
+
+    def test_groups_fetch_separately(self):
+        batcher = flight.Batcher(self.fetch, self.split, 0.2)
+        futures = [self.pool.submit(batcher.submit, ['IBM'], group)
+                   for group in ('bid', 'ask', 'bid')]
+
+        self.assertEqual([f.result(TIMEOUT) for f in futures],
+                         [['bid:IBM'], ['ask:IBM'], ['bid:IBM']])
+        self.assertEqual(sorted(self.fetches),
+                         [(['IBM'], 'ask'), (['IBM'], 'bid')])
+
+    def test_later_calls_start_a_new_window(self):
+        batcher = flight.Batcher(self.fetch, self.split, 0)
+
+        self.assertEqual(batcher.submit(['IBM']), ['None:IBM'])
+        self.assertEqual(batcher.submit(['F']), ['None:F'])
+        self.assertEqual(self.fetches, [(['IBM'], None), (['F'], None)])
+
+    def test_error_reaches_every_caller(self):
+        def fetch(keys, group):
+            self.fetches.append(sorted(keys))
+            raise ValueError('boom')
+
+        batcher = flight.Batcher(fetch, self.split, 0.2)
+        futures = [self.pool.submit(batcher.submit, [key])
+                   for key in ('IBM', 'F')]
+
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(TIMEOUT)
+
+        self.assertEqual(self.fetches, [['F', 'IBM']])
+        self.assertEqual(batcher._pending, {})
+
+
+class CoalesceTest(unittest.TestCase):
+    def setUp(self):
+        self.tkapi = api.API('key', 'secret', 'token', 'secret')
+        self.gate = Gate(result={'response': {'balances': [1]}})
+        self.tkapi._request = lambda *args, **kwargs: self.gate()
+        self.pool = concurrent.futures.ThreadPoolExecutor(4)
+        self.addCleanup(self.pool.shutdown)
+
+    def _concurrent(self, url, callers=3):
+        futures = [self.pool.submit(self.tkapi.get, url)
+                   for _ in range(callers)]
+        self.assertTrue(self.gate.entered.wait(TIMEOUT))
+        threading.Event().wait(0.1)
+        self.gate.opened.set()
+        return [f.result(TIMEOUT) for f in futures]
+
+    def test_market_data_coalesced_into_copies(self):
+        results = self._concurrent(api.BASE_URL + '/market/clock')
+
+        self.assertEqual(self.gate.calls, 1)
+        self.assertTrue(all(r == self.gate.result for r in results))
+        self.assertEqual(len(set(map(id, results))), len(results))
+
+    def test_account_requests_not_coalesced(self):
+        results = self._concurrent(api.BASE_URL + '/accounts/1/balances')
+
+        self.assertEqual(self.gate.calls, 3)
+        self.assertTrue(all(r is self.gate.result for r in results))
+
+    def test_keys(self):
+        key = self.tkapi._flight_key
+        market = api.BASE_URL + '/market/ext/quotes.json'
+        account = api.BASE_URL + '/accounts/1/orders.json'
+
+        self.assertIsNotNone(key('POST', market, True,
+                                 {'data': {'symbols': 'IBM'}}))
+        self.assertIsNone(key('GET', account, True, {}))
+        self.assertIsNone(key('POST', account, True, {}))
+        self.assertIsNone(key('GET', market, True, {'stream': True}))
+
+        self.tkapi.coalesce = False
+        self.assertIsNone(key('GET', market, True, {}))
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from tradeking import history
+
+
+TODAY = datetime.date(2014, 1, 17)
+
+
+def _transaction(date, amount, symbol='IBM'):
+    return {'date': '%sT00:00:00-05:00' % date, 'amount': amount,
+            'transaction': {'security': {'sym': symbol}}}
+
+
+class Account(object):
+    '''Answers _history with `pages`, a dict of date range to transactions.'''
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def _history(self, date_range='all', transactions='all'):
+        self.requests.append(date_range)
+        page = self.pages.get(date_range, self.pages.get(history.ALL))
+        return {'response': {'transactions': {'transaction': list(page)}}}
+
+
+class KeysTest(unittest.TestCase):
+    def test_duplicates_told_apart(self):
+        a = _transaction('2014-01-16', '10.00')
+        b = _transaction('2014-01-16', '-5.00')
+        keys = list(history.keys([a, b, dict(a)]))
+
+        self.assertEqual(len(set(keys)), 3)
+        self.assertEqual(keys[0].rsplit('-', 1)[0], keys[2].rsplit('-', 1)[0])
+        self.assertEqual(list(history.keys([b, a])), [keys[1], keys[0]])
+
+    def test_covering_range(self):
+        for since, date_range in ((TODAY, history.TODAY),
+                                  (datetime.date(2014, 1, 13),
+                                   history.CURRENT_WEEK),
+                                  (datetime.date(2014, 1, 1),
+                                   history.CURRENT_MONTH),
+                                  (datetime.date(2013, 12, 31),
+                                   history.ALL)):
+            self.assertEqual(history.covering_range(since, today=TODAY),
+                             date_range)
+
+
+class IterTransactionsTest(unittest.TestCase):
+    def setUp(self):
+        week = [_transaction('2014-01-17', '1.00'),
+                _transaction('2014-01-14', '2.00')]
+        self.account = Account({
+            history.TODAY: week[:1],
+            history.CURRENT_WEEK: week,
+            history.ALL: week + [_transaction('2013-12-02', '3.00')],
+        })
+
+    def test_since_requests_covering_range(self):
+        transactions = list(history.iter_transactions(
+            self.account, since=datetime.date(2014, 1, 15), today=TODAY))
+
+        self.assertEqual([t['amount'] for t in transactions], ['1.00'])
+        self.assertEqual(self.account.requests, [history.CURRENT_WEEK])
+
+    def test_ranges_narrowest_first(self):
+        transactions = history.iter_transactions(
+            self.account, ranges=(history.TODAY, history.CURRENT_WEEK),
+            today=TODAY)
+
+        self.assertEqual(next(transactions)['amount'], '1.00')
+        self.assertEqual(self.account.requests, [history.TODAY])
+        self.assertEqual([t['amount'] for t in transactions],
+                         ['2.00', '3.00'])
+        self.assertEqual(self.account.requests,
+                         [history.TODAY, history.CURRENT_WEEK, history.ALL])
+
+    def test_to_frame(self):
+        df = history.to_frame(history.iter_transactions(self.account))
+
+        self.assertEqual(df['amount'].sum(), 6.0)
+        self.assertEqual(str(df['date'].dt.tz), 'UTC')
+        self.assertIn('transaction.security.sym', df.columns)
+
+
+class HistorySyncTest(unittest.TestCase):
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.state_path = os.path.join(path, 'state.json')
+        self.log_path = os.path.join(path, 'history.jsonl')
+        self.page = [_transaction('2014-01-16', '1.00'),
+                     _transaction('2014-01-15', '2.00'),
+                     _transaction('2014-01-16', '3.00'),
+                     _transaction('2014-01-15', '4.00', symbol='F')]
+        self.account = Account({history.ALL: self.page})
+
+    def _sync(self):
+        sync = history.HistorySync(self.account, self.state_path,
+                                   log_path=self.log_path)
+        self.saves = []
+        save = sync._save
+        sync._save = lambda since, seen: (self.saves.append(since),
+                                          save(since, seen))
+        return sync
+
+    def _logged(self):
+        with open(self.log_path) as f:
+            return [json.loads(line)['amount'] for line in f]
+
+    def test_sync(self):
+        df = self._sync().sync()
+
+        self.assertEqual(list(df['amount']), [2.0, 4.0, 1.0, 3.0])
+        self.assertEqual(self._logged(), ['2.00', '4.00', '1.00', '3.00'])
+        self.assertEqual(len(self._sync().sync()), 0)
+        self.assertEqual(self.saves, [])
+
+        with open(self.state_path) as f:
+            self.assertEqual(json.load(f)['date'], '2014-01-16')
+
+    def test_one_write_per_date(self):
+        list(self._sync().iter_new())
+
+        self.assertEqual(self.saves, [datetime.date(2014, 1, 15),
+                                      datetime.date(2014, 1, 16)])
+
+    def test_new_transactions(self):
+        self._sync().sync()
+        self.page.append(_transaction('2014-01-16', '5.00'))
+        self.page.append(_transaction('2014-01-17', '6.00'))
+        self.page.append(_transaction('2014-01-14', '7.00'))
+
+        self.assertEqual([t['amount'] for t in self._sync().iter_new()],
+                         ['5.00', '6.00'])
+        self.assertEqual(self._logged()[4:], ['5.00', '6.00'])
+
+    def test_stop_early(self):
+        transactions = self._sync().iter_new()
+        self.assertEqual(next(transactions)['amount'], '2.00')
+        transactions.close()
+
+        self.assertEqual(self._logged(), ['2.00'])
+        self.assertEqual([t['amount'] for t in self._sync().iter_new()],
+                         ['4.00', '1.00', '3.00'])
+        self.assertEqual(self._logged(), ['2.00', '4.00', '1.00', '3.00'])
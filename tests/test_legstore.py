@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tradeking import batch
+from tradeking import option
+from tradeking import utils
+
+
+SYMBOLS = ['IBM140222C00180000', 'IBM140222P00185000', 'f140322c00015500',
+           'F140322P00015000']
+SIDES = [utils.LONG, utils.SHORT, utils.SHORT, utils.LONG]
+PREMIUMS = {'IBM140222C00180000': 2.5, 'IBM140222P00185000': 4.25,
+            'F140322C00015500': 0.5, 'F140322P00015000': 0.75}
+
+
+def _premium(symbol):
+    return utils.Price(PREMIUMS[symbol])
+
+
+class BatchPremium(object):
+    '''Premium function with a batch hook, as QuotePremium has.'''
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, symbol):
+        raise AssertionError('Priced %s alone' % symbol)
+
+    def premiums(self, symbols):
+        self.batches.append(list(symbols))
+        return utils.PriceArray.encode([PREMIUMS[s] for s in symbols])
+
+
+class LegStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = option.LegStore.from_symbols(
+            SYMBOLS, long_shorts=SIDES, premium_func=_premium)
+        self.legs = [option.Leg(symbol, long_short=side,
+                                premium_func=_premium)
+                     for symbol, side in zip(SYMBOLS, SIDES)]
+
+    def test_columns(self):
+        store = self.store
+
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.underlyings, ['IBM', 'F'])
+        np.testing.assert_array_equal(store.underlying_codes, [0, 0, 1, 1])
+        np.testing.assert_array_equal(store.puts, [False, True, False, True])
+        np.testing.assert_array_equal(store.sides, [1, -1, -1, 1])
+        np.testing.assert_array_equal(store.strikes,
+                                      [180000, 185000, 15500, 15000])
+        self.assertEqual(store.nbytes, 4 * (4 + 8 + 1 + 8 + 1))
+
+        store.premiums()
+        self.assertEqual(store.nbytes, 4 * (4 + 8 + 1 + 8 + 1 + 8))
+
+    def test_symbols(self):
+        self.assertEqual(self.store.symbols(), [s.upper() for s in SYMBOLS])
+
+        df = self.store.to_frame()
+        self.assertEqual(df['long_short'].tolist(), SIDES)
+        self.assertEqual(df['strike'].tolist(), [180.0, 185.0, 15.5, 15.0])
+
+    def test_views_match_legs(self):
+        for view, leg in zip(self.store, self.legs):
+            self.assertEqual(view._symbol, leg._symbol)
+            self.assertEqual(view._long_short, leg._long_short)
+            self.assertEqual(view._call_put, leg._call_put)
+            self.assertEqual(view._strike, leg._strike)
+            self.assertEqual(view._expiration, leg._expiration)
+            self.assertEqual(view.premium, leg.premium)
+            self.assertEqual(view.cost, leg.cost)
+            self.assertEqual(view.payoff(utils.Price(170)),
+                             leg.payoff(utils.Price(170)))
+            pd.testing.assert_series_equal(view.payoffs, leg.payoffs)
+
+    def test_indexing(self):
+        self.assertEqual(self.store[-1]._symbol, SYMBOLS[-1])
+
+        with self.assertRaises(IndexError):
+            self.store[4]
+
+        with self.assertRaises(IndexError):
+            self.store[-5]
+
+    def test_payoffs(self):
+        prices = utils.PriceArray.encode([10, 15.25, 180, 190])
+        payoffs = self.store.payoffs(prices)
+
+        self.assertIsInstance(payoffs, utils.PriceArray)
+        self.assertEqual(payoffs.shape, (4, 4))
+
+        for row, leg in zip(payoffs, self.legs):
+            np.testing.assert_array_equal(
+                row, [leg.payoff(price) for price in prices])
+
+    def test_multileg_of_views(self):
+        views = option.MultiLeg(*list(self.store)[:2])
+        legs = option.MultiLeg(*self.legs[:2])
+
+        pd.testing.assert_series_equal(views.payoffs, legs.payoffs)
+        self.assertEqual(views.premium, legs.premium)
+        self.assertEqual(views.cost, legs.cost)
+
+    def test_premiums_batched(self):
+        premium = BatchPremium()
+        store = option.LegStore.from_symbols(SYMBOLS, long_shorts=SIDES,
+                                             premium_func=premium)
+
+        np.testing.assert_array_equal(store.premiums().decode(),
+                                      [2.5, -4.25, -0.5, 0.75])
+        self.assertEqual(store[1].premium, utils.Price(-4.25))
+        self.assertEqual(premium.batches, [store.symbols()])
+
+    def test_from_frame(self):
+        legs = batch.straddles('IBM', ['2014-02-22'], [180.0, 182.5])
+        store = option.LegStore.from_frame(legs, premium_func=_premium)
+
+        self.assertEqual(len(store), len(legs))
+        self.assertEqual(store.to_frame()['strike'].tolist(),
+                         legs['strike'].tolist())
+        self.assertEqual(store.to_frame()['call_put'].tolist(),
+                         legs['call_put'].tolist())
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+import math
+import unittest
+
+from tradeking import api
+from tradeking import metrics
+
+from tests import stub
+
+
+BASE_URL = 'https://api.tradeking.com/v1'
+
+
+def _sample(endpoint='market/clock', status=200, seconds=0.002,
+            response_bytes=1000):
+    return metrics.Sample(endpoint=endpoint, method='GET', status=status,
+                          timings=dict((stage, seconds)
+                                       for stage in metrics.STAGES),
+                          request_bytes=0, response_bytes=response_bytes)
+
+
+class EndpointTest(unittest.TestCase):
+    def test_labels(self):
+        for url, label in (
+                ('/market/clock.json', 'market/clock'),
+                ('/market/ext/quotes.json?symbols=IBM', 'market/ext/quotes'),
+                ('/accounts.json', 'accounts'),
+                ('/accounts/12345678.json', 'accounts/{id}'),
+                ('/accounts/12345678/orders/preview.json',
+                 'accounts/{id}/orders/preview'),
+                ('/market/news/search.json', 'market/news/search'),
+                ('/market/news/a1b2c3.json', 'market/news/{id}'),
+                ('/market/news/a1.b2.json', 'market/news/{id}')):
+            self.assertEqual(metrics.endpoint(BASE_URL + url, BASE_URL),
+                             label)
+
+    def test_outside_base_url(self):
+        self.assertEqual(metrics.endpoint('/accounts/1/balances.json',
+                                          BASE_URL), 'accounts/{id}/balances')
+
+
+class HistogramTest(unittest.TestCase):
+    def test_quantiles(self):
+        histogram = metrics.Histogram((1, 2, 5, 10))
+
+        self.assertTrue(math.isnan(histogram.quantile(0.5)))
+
+        for value in (0.5, 1.5, 1.5, 4, 7):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [1, 2, 1, 1, 0])
+        self.assertEqual(histogram.quantile(0.5), 2)
+        self.assertEqual(histogram.quantile(0.9), 7)
+        self.assertEqual(histogram.quantile(0.1), 1)
+
+    def test_overflow(self):
+        histogram = metrics.Histogram((1,))
+        histogram.observe(30)
+
+        self.assertEqual(histogram.counts, [0, 1])
+        self.assertEqual(histogram.quantile(0.99), 30)
+
+
+class HistogramsTest(unittest.TestCase):
+    def setUp(self):
+        self.histograms = metrics.Histograms(time_buckets=(0.001, 0.01),
+                                             size_buckets=(1024,))
+
+    def test_summary(self):
+        self.histograms.record(_sample(seconds=0.002))
+        self.histograms.record(_sample(seconds=0.004))
+        self.histograms.observe('market/clock', 'dataframe', 0.0005)
+
+        summary = self.histograms.summary()
+        total = summary.loc[('market/clock', 'total')]
+
+        self.assertEqual(set(summary.loc['market/clock'].index),
+                         set(metrics.STAGES + ('dataframe',)))
+        self.assertEqual(total['count'], 2)
+        self.assertAlmostEqual(total['mean'], 0.003)
+        self.assertEqual(total['max'], 0.004)
+        self.assertEqual(summary.loc[('market/clock', 'dataframe'), 'p50'],
+                         0.0005)
+
+    def test_exposition(self):
+        self.histograms.record(_sample(status=200, response_bytes=2000))
+        self.histograms.record(_sample(status=429, response_bytes=None))
+        lines = self.histograms.exposition().splitlines()
+
+        self.assertIn('# TYPE tradeking_request_seconds histogram', lines)
+        self.assertIn('tradeking_request_seconds_bucket{endpoint='
+                      '"market/clock",stage="total",le="0.01"} 2', lines)
+        self.assertIn('tradeking_payload_bytes_bucket{endpoint='
+                      '"market/clock",direction="response",le="1024"} 0',
+                      lines)
+        self.assertIn('tradeking_payload_bytes_count{endpoint='
+                      '"market/clock",direction="response"} 1', lines)
+        self.assertIn('tradeking_responses_total{endpoint="market/clock",'
+                      'status="429"} 1', lines)
+
+    def test_reset(self):
+        self.histograms.record(_sample())
+        self.histograms.reset()
+
+        self.assertEqual(len(self.histograms.summary()), 0)
+        self.assertEqual(self.histograms.statuses, {})
+
+
+class RecordTest(unittest.TestCase):
+    def test_requests_are_recorded(self):
+        routes = {
+            '/v1/market/clock': [(200, {'response': {'@id': 'x'}}, {})],
+            '/v1/market/news/a1b2c3': [(200, {'response': {}}, {})],
+            '/v1/accounts/12345678/balances': [(200, {'response': {}}, {})],
+        }
+        histograms = metrics.Histograms()
+
+        with stub.StubServer(routes) as server:
+            tkapi = api.TradeKing('key', 'secret', 'token', 'secret',
+                                  base_url=server.url + '/v1',
+                                  metrics=histograms)
+            tkapi.market.clock
+            tkapi.market.news._article('a1b2c3')
+            tkapi.account('12345678')._get('balances')
+            tkapi.market.news._article('missing')
+
+        summary = histograms.summary()
+
+        self.assertEqual(sorted(set(summary.index.get_level_values(0))),
+                         ['accounts/{id}/balances', 'market/clock',
+                          'market/news/{id}'])
+        self.assertEqual(set(summary.loc['market/clock'].index),
+                         set(metrics.STAGES))
+        self.assertEqual(summary.loc[('market/news/{id}', 'total'),
+                                     'count'], 2)
+        self.assertEqual(histograms.statuses[('market/news/{id}', 404)], 1)
+        self.assertTrue(all(summary['max'] >= 0))
+
+    def test_noop(self):
+        tkapi = api.TradeKing('key', 'secret', 'token', 'secret')
+
+        self.assertIs(tkapi._api.metrics, metrics.NOOP)
+        self.assertFalse(metrics.NOOP.enabled)
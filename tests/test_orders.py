@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from lxml import etree
+import pandas as pd
+
+from tradeking import api
+from tradeking import orders
+
+from tests import stub
+
+
+LEGS = [('IBM140118C00190000', orders.BUY, 1, orders.OPEN),
+        {'symbol': 'IBM140118P00185000', 'side': orders.SELL,
+         'quantity': 2, 'position_effect': orders.CLOSE}]
+
+STOCK = {'account': '12345678', 'security_type': orders.STOCK,
+         'security': 'IBM', 'quantity': 100}
+TRAILING = dict(STOCK, security='F', side=orders.SELL,
+                order_type=orders.TRAILING_STOP, trailing_stop_offset=0.5)
+MULTILEG = {'account': '12345678', 'legs': LEGS, 'price': -1.25}
+
+PATH = '/v1/accounts/12345678/'
+SUCCESS = (200, {'response': {'error': 'Success', 'clientorderid': '1'}}, {})
+REJECTED = (200, {'response': {'error': 'Insufficient funds'}}, {})
+
+
+def _tostring(order):
+    if 'legs' in order:
+        return etree.tostring(orders.MultiLegOrder(**order))
+
+    return etree.tostring(orders.Order(**order))
+
+
+class SerializeTest(unittest.TestCase):
+    def test_dicts(self):
+        basket = [STOCK, TRAILING, MULTILEG, dict(MULTILEG, price=None)]
+        self.assertEqual(orders.serialize(basket),
+                         [_tostring(order) for order in basket])
+
+    def test_mixed_frame(self):
+        basket = [STOCK, MULTILEG, TRAILING]
+        frame = pd.DataFrame(basket)
+
+        # NOTE(jkoelker) The multileg row has no quantity, so the column is
+        #                float and the stock rows hold 100.0.
+        self.assertEqual(frame['quantity'].dtype, float)
+        self.assertEqual(orders.serialize(frame),
+                         [_tostring(order) for order in basket])
+
+    def test_escaped(self):
+        order = dict(STOCK, account='1&2<3>"')
+        self.assertEqual(orders.serialize([order]), [_tostring(order)])
+
+    def test_tostring_passes_bytes(self):
+        serialized = orders.serialize([STOCK])[0]
+        self.assertIs(orders.tostring(serialized), serialized)
+
+
+class BasketTest(unittest.TestCase):
+    def _account(self, previews, submits):
+        server = stub.StubServer({PATH + 'orders/preview': previews,
+                                  ('POST', PATH + 'orders'): submits})
+        server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        tkapi = api.TradeKing('key', 'secret', 'token', 'secret',
+                              base_url=server.url + '/v1')
+        self.server = server
+        return tkapi.account('12345678')
+
+    def _requests(self, what):
+        return [r for r in self.server.requests if r[1] == PATH + what]
+
+    def test_order(self):
+        account = self._account([SUCCESS], [SUCCESS])
+
+        self.assertEqual(account.order(orders.Order(**STOCK))['error'],
+                         'Success')
+        account.order(orders.serialize([STOCK])[0], preview=False)
+
+        self.assertEqual(len(self._requests('orders/preview')), 1)
+        self.assertEqual(len(self._requests('orders')), 1)
+
+    def test_preview_then_submit(self):
+        account = self._account([SUCCESS], [SUCCESS])
+        results = account.basket([STOCK, TRAILING, MULTILEG])
+
+        self.assertEqual([result.order for result in results],
+                         orders.serialize([STOCK, TRAILING, MULTILEG]))
+        self.assertTrue(all(result.error is None and
+                            result.preview['error'] == 'Success' and
+                            result.response['clientorderid'] == '1' and
+                            result.preview_time >= 0 and
+                            result.submit_time >= 0
+                            for result in results))
+        self.assertEqual(len(self._requests('orders/preview')), 3)
+        self.assertEqual(len(self._requests('orders')), 3)
+
+    def test_preview_only(self):
+        account = self._account([SUCCESS], [SUCCESS])
+        results = account.basket(pd.DataFrame([STOCK, TRAILING]),
+                                 submit=False)
+
+        self.assertEqual([result.response for result in results],
+                         [None, None])
+        self.assertEqual(len(self._requests('orders/preview')), 2)
+        self.assertEqual(self._requests('orders'), [])
+
+    def test_rejected_preview_fails_fast(self):
+        account = self._account([REJECTED, SUCCESS], [SUCCESS])
+
+        with self.assertRaises(api.OrderError) as raised:
+            account.basket([STOCK] * 5, max_workers=1)
+
+        results = raised.exception.results
+        self.assertEqual(results[0].error, 'Insufficient funds')
+
+        # NOTE(jkoelker) The second preview may have started before the
+        #                rejection was seen, the rest never run.
+        self.assertEqual([result.error for result in results[2:]],
+                         ['Cancelled'] * 3)
+        self.assertLessEqual(len(self._requests('orders/preview')), 2)
+        self.assertEqual(self._requests('orders'), [])
+
+    def test_rejected_submit(self):
+        account = self._account([SUCCESS], [SUCCESS, REJECTED])
+
+        with self.assertRaises(api.OrderError) as raised:
+            account.basket([STOCK, STOCK], max_workers=1)
+
+        self.assertEqual(str(raised.exception), 'Order rejected')
+        self.assertEqual([result.error for result in raised.exception.results],
+                         [None, 'Insufficient funds'])
+        self.assertEqual(len(self._requests('orders')), 2)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+import itertools
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tradeking import option
+from tradeking import utils
+
+
+CALL = 'IBM140222C00180000'
+PUT = 'IBM140222P00185000'
+
+
+def _premium(symbol):
+    return utils.Price(1.5)
+
+
+def _scalar(legs, prices):
+    return [sum(leg.payoff(int(price)) for leg in legs) for price in prices]
+
+
+class LegPayoffsTest(unittest.TestCase):
+    def test_matches_payoff(self):
+        for symbol, side in itertools.product((CALL, PUT),
+                                              (utils.LONG, utils.SHORT)):
+            leg = option.Leg(symbol, long_short=side, premium_func=_premium)
+            payoffs = leg.payoffs
+
+            self.assertEqual(payoffs.index[0], leg._start)
+            self.assertEqual(payoffs.index[-1], leg._stop - 1)
+            self.assertEqual(len(payoffs), 4001)
+            np.testing.assert_array_equal(payoffs.to_numpy(),
+                                          _scalar([leg], payoffs.index))
+
+    def test_any_shape(self):
+        leg = option.Leg(PUT, premium_func=_premium)
+        prices = utils.PriceArray.encode([[170, 185], [190, 184.99]])
+
+        np.testing.assert_array_equal(leg._payoffs(prices).decode(),
+                                      [[15, 0], [0, 0.01]])
+
+    def test_reset_start_stop(self):
+        leg = option.Leg(CALL, price_range=1, tick_size=0.5,
+                         premium_func=_premium)
+        self.assertEqual(leg.payoffs.index.tolist(),
+                         [179000, 179500, 180000, 180500, 181000])
+
+        leg.reset_start_stop(utils.Price(180), utils.Price(182))
+        self.assertEqual(leg.payoffs.tolist(), [0, 500, 1000, 1500])
+
+
+class MultiLegPayoffsTest(unittest.TestCase):
+    def test_shared_grid(self):
+        call = option.Leg(CALL, price_range=2, tick_size=0.5,
+                          premium_func=_premium)
+        put = option.Leg(PUT, long_short=utils.SHORT, price_range=1,
+                         tick_size=0.25, premium_func=_premium)
+        multileg = option.MultiLeg(call, put)
+        payoffs = multileg.payoffs
+
+        self.assertEqual(payoffs.index[0], utils.Price(178))
+        self.assertEqual(payoffs.index[-1], utils.Price(186))
+        self.assertEqual(payoffs.index[1] - payoffs.index[0], 250)
+        np.testing.assert_array_equal(payoffs.to_numpy(),
+                                      _scalar([call, put], payoffs.index))
+
+    def test_add_leg_invalidates(self):
+        multileg = option.MultiLeg(option.Leg(CALL, premium_func=_premium))
+        before = multileg.payoffs
+        multileg.add_leg(option.Leg(PUT, premium_func=_premium))
+
+        self.assertFalse(multileg.payoffs.equals(before))
+        self.assertEqual(multileg.premium, utils.Price(3))
+
+    def test_strategies(self):
+        straddle = option.Straddle(CALL, premium_func=_premium)
+        legs = straddle._legs
+
+        self.assertEqual([leg._call_put for leg in legs],
+                         [utils.PUT, utils.CALL])
+        self.assertEqual(straddle.payoffs.min(), 0)
+        self.assertEqual(straddle.payoffs[utils.Price(180)], 0)
+        np.testing.assert_array_equal(
+            straddle.payoffs.to_numpy(),
+            _scalar(legs, straddle.payoffs.index))
+
+    def test_series(self):
+        payoffs = option.Put(PUT, premium_func=_premium).payoffs
+
+        self.assertIsInstance(payoffs, pd.Series)
+        self.assertEqual(payoffs.dtype, np.int64)
+        self.assertEqual(payoffs[utils.Price(175)], utils.Price(10))
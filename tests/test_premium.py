@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tradeking import option
+from tradeking import scheduler
+from tradeking import utils
+
+
+SYMBOLS = ('IBM140222C00180000', 'IBM140222P00180000',
+           'F140222C00015000', 'F140222P00015000')
+
+
+class Market(object):
+    def __init__(self, quotes):
+        self._quotes = quotes
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def quotes(self, symbols):
+        with self._lock:
+            self.requests.append(list(symbols))
+
+        return self._quotes.loc[[s for s in symbols
+                                 if s in self._quotes.index]]
+
+
+class TradeKing(object):
+    def __init__(self, quotes):
+        self.market = Market(quotes)
+
+
+def _quotes():
+    return pd.DataFrame({'bid': [7.9, 3.1, 0.5, np.nan],
+                         'ask': [8.0, 3.3, 0.7, np.nan]},
+                        index=pd.Index(SYMBOLS, name='symbol'))
+
+
+class QuotePremiumTest(unittest.TestCase):
+    def setUp(self):
+        self.tkapi = TradeKing(_quotes())
+        self.clock = scheduler.FakeClock()
+        self.premium = option.QuotePremium(self.tkapi, ttl=5,
+                                           clock=self.clock.monotonic)
+
+    def test_legs_batched(self):
+        straddle = option.Straddle(SYMBOLS[0], premium_func=self.premium)
+        call = option.Call(SYMBOLS[2], premium_func=self.premium)
+
+        self.assertEqual(straddle.premium, utils.Price(11.15))
+        self.assertEqual(call.premium, utils.Price(0.6))
+        self.assertEqual([sorted(r) for r in self.tkapi.market.requests],
+                         [sorted(SYMBOLS[:3])])
+
+    def test_ttl_requotes_only_asked_symbols(self):
+        self.premium.register(*SYMBOLS[:3])
+        self.premium(SYMBOLS[0])
+        self.assertEqual(len(self.tkapi.market.requests), 1)
+
+        self.premium(SYMBOLS[1])
+        self.assertEqual(len(self.tkapi.market.requests), 1)
+
+        self.clock.sleep(5)
+        self.assertEqual(self.premium(SYMBOLS[1]), utils.Price(3.2))
+        self.assertEqual(self.tkapi.market.requests[1:], [[SYMBOLS[1]]])
+
+    def test_pending_symbols_pruned(self):
+        for symbol in SYMBOLS[:3]:
+            option.Leg(symbol, premium_func=self.premium)
+
+        self.premium.fetch()
+        self.assertEqual(self.premium._pending, {})
+
+        self.clock.sleep(5)
+        option.Leg(SYMBOLS[2], premium_func=self.premium)
+        self.premium.fetch(SYMBOLS[0])
+        self.assertEqual(self.tkapi.market.requests[1:],
+                         [[SYMBOLS[2], SYMBOLS[0]]])
+
+    def test_premiums(self):
+        premiums = self.premium.premiums(SYMBOLS[:3])
+
+        self.assertIsInstance(premiums, utils.PriceArray)
+        np.testing.assert_array_equal(premiums.decode(), [7.95, 3.2, 0.6])
+
+    def test_missing_quote(self):
+        with self.assertRaises(KeyError) as raised:
+            self.premium.premiums([SYMBOLS[0], 'AAPL140222C00500000'])
+
+        self.assertIn('AAPL140222C00500000', str(raised.exception))
+
+        # NOTE(jkoelker) The unquoted symbol is not asked for again.
+        self.premium.fetch()
+        self.assertEqual(len(self.tkapi.market.requests), 1)
+
+    def test_unpriced_quote(self):
+        with self.assertRaises(ValueError) as raised:
+            self.premium.premiums(SYMBOLS)
+
+        self.assertIn(SYMBOLS[3], str(raised.exception))
+
+    def test_concurrent_fetches_share_a_batch(self):
+        self.premium.register(*SYMBOLS)
+        threads = [threading.Thread(target=self.premium, args=(symbol,))
+                   for symbol in SYMBOLS[:3]]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(self.tkapi.market.requests), 1)
+
+
+class TradeKingPremiumTest(unittest.TestCase):
+    def test_token_client_shared(self):
+        tokens = dict(consumer_key='key', consumer_secret='secret',
+                      oauth_token='token', oauth_secret='secret')
+
+        first = option.Straddle(SYMBOLS[0], **tokens)
+        second = option.Straddle(SYMBOLS[2], **tokens)
+
+        self.assertIs(first._legs[0]._premium_func,
+                      second._legs[0]._premium_func)
+        self.assertIsInstance(first._legs[0]._premium_func,
+                              option.QuotePremium)
+
+    def test_tkapi_scoped(self):
+        tkapi = TradeKing(_quotes())
+        tkapi._premiums = {}
+        other = TradeKing(_quotes())
+        other._premiums = {}
+
+        self.assertIs(option.tradeking_premium(tkapi),
+                      option.tradeking_premium(tkapi))
+        self.assertIsNot(option.tradeking_premium(tkapi),
+                         option.tradeking_premium(other))
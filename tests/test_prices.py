@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy as np
+
+from tradeking import batch
+from tradeking import option
+from tradeking import utils
+
+
+CALL = 'IBM140222C00180000'
+PUT = 'IBM140222P00185000'
+
+
+def _premium(symbol):
+    return utils.Price(1.5)
+
+
+class PriceArrayTest(unittest.TestCase):
+    def test_arithmetic_stays_fixed_point(self):
+        prices = utils.PriceArray.encode([7.95, 8.10])
+
+        self.assertIsInstance(prices - utils.Price(0.05), utils.PriceArray)
+        np.testing.assert_array_equal((prices * 2).decode(), [15.9, 16.2])
+        np.testing.assert_array_equal((prices / 3).view(np.ndarray),
+                                      [2650, 2700])
+        self.assertEqual(prices.sum(), utils.Price(16.05))
+        self.assertIsInstance(prices[0], utils.Price)
+
+    def test_in_place_does_not_copy(self):
+        payoffs = utils.PriceArray(np.zeros(3, dtype=np.int64))
+        before = payoffs
+        payoffs += utils.PriceArray.encode([1, 2, 3])
+
+        self.assertTrue(np.shares_memory(payoffs, before))
+        np.testing.assert_array_equal(before.decode(), [1, 2, 3])
+
+
+class PayoffsTest(unittest.TestCase):
+    def test_leg_payoffs(self):
+        leg = option.Leg(CALL, premium_func=_premium)
+        multileg = option.MultiLeg(leg, option.Leg(PUT,
+                                                   premium_func=_premium))
+        prices = multileg._prices()
+
+        self.assertIsInstance(prices, utils.PriceArray)
+        self.assertIsInstance(leg._payoffs(prices), utils.PriceArray)
+        self.assertIsInstance(multileg._payoffs(prices), utils.PriceArray)
+        self.assertEqual(multileg.payoffs.dtype, np.int64)
+
+    def test_store(self):
+        store = option.LegStore.from_symbols(
+            [CALL, PUT], long_shorts=[utils.LONG, utils.SHORT],
+            premium_func=_premium)
+        payoffs = store.payoffs(utils.PriceArray.encode([175, 180, 190]))
+
+        self.assertIsInstance(payoffs, utils.PriceArray)
+        np.testing.assert_array_equal(payoffs.decode(),
+                                      [[0, 0, 10], [-10, -5, 0]])
+        np.testing.assert_array_equal(store.premiums().decode(), [1.5, -1.5])
+        self.assertEqual(store[1].premium, utils.Price(-1.5))
+
+    def test_evaluate_premiums(self):
+        legs = batch.straddles('IBM', ['2014-02-22'], [180.0])
+        legs['premium'] = 1.234
+        result = batch.evaluate(legs, include_cost=False)
+
+        # NOTE(jkoelker) Two legs of 1.234 stay exactly 2.468.
+        self.assertEqual(result.max_loss.iloc[0], -2468)
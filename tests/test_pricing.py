@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tradeking import pricing
+
+
+HOUR = 1 / (365 * 24.0)
+
+
+class BlackScholesTest(unittest.TestCase):
+    # NOTE(jkoelker) S=K=100, r=5%, sigma=20%, one year.
+    def test_call(self):
+        value = pricing.black_scholes(100, 100, 1, 0.05, 0.2, 'C')
+        self.assertAlmostEqual(float(value), 10.4506, places=4)
+
+    def test_put(self):
+        value = pricing.black_scholes(100, 100, 1, 0.05, 0.2, 'P')
+        self.assertAlmostEqual(float(value), 5.5735, places=4)
+
+    def test_put_call_parity(self):
+        K = np.linspace(50, 150, 21)
+        calls = pricing.black_scholes(100, K, 0.5, 0.03, 0.3, 'C', q=0.01)
+        puts = pricing.black_scholes(100, K, 0.5, 0.03, 0.3, 'P', q=0.01)
+        parity = 100 * np.exp(-0.01 * 0.5) - K * np.exp(-0.03 * 0.5)
+        np.testing.assert_allclose(calls - puts, parity, atol=1e-10)
+
+    def test_greeks(self):
+        # NOTE(jkoelker) Hull, Options, Futures and Other Derivatives,
+        #                S=49, K=50, r=5%, sigma=20%, 20 weeks.
+        greeks = pricing.greeks(49, 50, 0.3846, 0.05, 0.2, 'C')
+        expected = {'delta': 0.5216, 'gamma': 0.0655, 'theta': -4.3054,
+                    'vega': 12.1052, 'rho': 8.9066}
+
+        for greek, value in expected.items():
+            self.assertAlmostEqual(float(greeks[greek]), value, places=3,
+                                   msg=greek)
+
+
+class BjerksundStenslandTest(unittest.TestCase):
+    def test_haug_call(self):
+        # NOTE(jkoelker) Haug, The Complete Guide to Option Pricing
+        #                Formulas, S=42, K=40, T=0.75, r=4%, b=-4%,
+        #                sigma=35%.
+        value = pricing.bjerksund_stensland(42, 40, 0.75, 0.04, 0.35, 'C',
+                                            q=0.08)
+        self.assertAlmostEqual(float(value), 5.2704, places=4)
+
+    def test_no_early_exercise_without_dividends(self):
+        european = pricing.black_scholes(100, 100, 1, 0.05, 0.2, 'C')
+        american = pricing.bjerksund_stensland(100, 100, 1, 0.05, 0.2, 'C')
+        self.assertAlmostEqual(float(american), float(european), places=8)
+
+    def test_american_put_above_european(self):
+        K = np.linspace(80, 120, 9)
+        european = pricing.black_scholes(100, K, 1, 0.05, 0.2, 'P')
+        american = pricing.bjerksund_stensland(100, K, 1, 0.05, 0.2, 'P')
+        self.assertTrue(np.all(american >= european - 1e-10))
+
+
+class ImpliedVolatilityTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.K = rng.uniform(80, 120, 200)
+        self.T = rng.uniform(0.1, 2, 200)
+        self.sigma = rng.uniform(0.1, 0.8, 200)
+        self.calls = rng.random(200) < 0.5
+
+    def _round_trip(self, model, method):
+        value = pricing.price(100, self.K, self.T, 0.03, self.sigma,
+                              self.calls, q=0.01, model=model)
+        sigma = pricing.implied_volatility(value, 100, self.K, self.T, 0.03,
+                                           self.calls, q=0.01, model=model,
+                                           method=method)
+        np.testing.assert_allclose(sigma, self.sigma, atol=1e-4)
+
+    def test_newton(self):
+        self._round_trip(pricing.EUROPEAN, pricing.NEWTON)
+
+    def test_bisection(self):
+        self._round_trip(pricing.EUROPEAN, pricing.BISECTION)
+
+    def test_american_newton(self):
+        self._round_trip(pricing.AMERICAN, pricing.NEWTON)
+
+    def test_american_bisection(self):
+        self._round_trip(pricing.AMERICAN, pricing.BISECTION)
+
+    def test_reference(self):
+        sigma = pricing.implied_volatility(10.4506, 100, 100, 1, 0.05, 'C')
+        self.assertAlmostEqual(float(sigma), 0.2, places=4)
+
+    def test_unreachable_value_is_nan(self):
+        sigma = pricing.implied_volatility([0.0, 200.0], 100, 100, 1, 0.05,
+                                           'C')
+        self.assertTrue(np.isnan(sigma).all())
+
+    def test_unknown_method(self):
+        self.assertRaises(ValueError, pricing.implied_volatility, 10.4506,
+                          100, 100, 1, 0.05, 'C', method='secant')
+
+
+class YearsToExpirationTest(unittest.TestCase):
+    def test_naive_now_is_new_york(self):
+        years = pricing.years_to_expiration(['2014-02-22', '2014-02-23'],
+                                            now='2014-02-22 15:00')
+        np.testing.assert_allclose(years, [HOUR, 25 * HOUR])
+
+    def test_aware_now(self):
+        for now in (pd.Timestamp('2014-02-22 20:00', tz='UTC'),
+                    pd.Timestamp('2014-02-23 05:00', tz='Asia/Tokyo')):
+            years = pricing.years_to_expiration(['2014-02-22'], now=now)
+            np.testing.assert_allclose(years, [HOUR])
+
+    def test_daylight_saving(self):
+        # NOTE(jkoelker) Clocks went forward on 2014-03-09, in summer the
+        #                close is 20:00 UTC.
+        now = pd.Timestamp('2014-03-08 16:00', tz='America/New_York')
+        np.testing.assert_allclose(
+            pricing.years_to_expiration(['2014-03-10'], now=now),
+            [47 * HOUR])
+        np.testing.assert_allclose(
+            pricing.years_to_expiration(
+                ['2014-07-18'], now=pd.Timestamp('2014-07-18 19:00',
+                                                 tz='UTC')),
+            [HOUR])
+
+    def test_aware_expirations(self):
+        expirations = pd.to_datetime(['2014-02-22T00:00:00-05:00'])
+        years = pricing.years_to_expiration(expirations,
+                                            now='2014-02-22 12:00')
+        np.testing.assert_allclose(years, [4 * HOUR])
+
+    def test_expired(self):
+        years = pricing.years_to_expiration(['2014-02-21'],
+                                            now='2014-02-22 12:00')
+        np.testing.assert_array_equal(years, [0])
+
+    def test_current_time(self):
+        tomorrow = pd.Timestamp.now(tz='America/New_York') + pd.Timedelta(
+            days=1)
+        years = pricing.years_to_expiration([tomorrow.date()])
+
+        self.assertTrue(8 * HOUR < years[0] < 40 * HOUR)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tradeking import api
+
+from tests import stub
+
+
+PATH = '/v1/market/ext/quotes'
+
+
+def _quote(symbol):
+    last = 10.0 + sum(map(ord, symbol)) % 100
+    return {'symbol': symbol, 'bid': '%.2f' % (last - 0.01),
+            'ask': '%.2f' % (last + 0.01), 'last': '%.2f' % last,
+            'vl': '1,000', 'datetime': '2014-01-17T15:59:00-05:00'}
+
+
+class Quotes(object):
+    '''Quote every symbol requested, upper-cased, as TradeKing does.'''
+    def __init__(self):
+        self.chunks = []
+        self._lock = threading.Lock()
+
+    def __call__(self, method, path, query, body):
+        symbols = body['symbols'][0].upper().split(',')
+
+        with self._lock:
+            self.chunks.append(symbols)
+
+        return 200, {'response': {'quotes': {'quote': [
+            _quote(symbol) for symbol in symbols]}}}, {}
+
+
+class QuotesTest(unittest.TestCase):
+    def setUp(self):
+        self.quotes = Quotes()
+        self.server = stub.StubServer({PATH: self.quotes})
+        self.server.__enter__()
+        self.addCleanup(self.server.__exit__, None, None, None)
+        self.tkapi = api.TradeKing('key', 'secret', 'token', 'secret',
+                                   base_url=self.server.url + '/v1',
+                                   chunk_size=3)
+        self.addCleanup(self.tkapi._api.close)
+
+    def test_single_request(self):
+        df = self.tkapi.market.quotes('IBM,F')
+
+        self.assertEqual(list(df.index), ['IBM', 'F'])
+        self.assertEqual(self.quotes.chunks, [['IBM', 'F']])
+
+    def test_chunks_keep_order(self):
+        symbols = ['S%02d' % i for i in range(10)][::-1]
+        df = self.tkapi.market.quotes(symbols)
+
+        self.assertEqual(list(df.index), symbols)
+        self.assertEqual(sorted(map(len, self.quotes.chunks)), [1, 3, 3, 3])
+        self.assertEqual(sorted(sum(self.quotes.chunks, [])),
+                         sorted(symbols))
+        self.assertEqual(df.loc['S05', 'last'],
+                         float(_quote('S05')['last']))
+
+    def test_chunk_size_argument(self):
+        symbols = ['S%02d' % i for i in range(4)]
+        df = self.tkapi.market.quotes(symbols, chunk_size=2)
+
+        self.assertEqual(list(df.index), symbols)
+        self.assertEqual(len(self.quotes.chunks), 2)
+
+    def test_lowercase_symbols(self):
+        symbols = ['ibm', 'f', 'aapl', 'msft']
+        df = self.tkapi.market.quotes(symbols)
+
+        self.assertEqual(list(df.index), ['IBM', 'F', 'AAPL', 'MSFT'])
+
+    def test_fields(self):
+        df = self.tkapi.market.quotes(['IBM', 'F', 'AAPL', 'MSFT'],
+                                      fields=['bid', 'ask'])
+
+        self.assertEqual(list(df.columns), ['bid', 'ask'])
+        self.assertEqual(list(df.index), ['IBM', 'F', 'AAPL', 'MSFT'])
+
+    def test_chunks_share_the_pool(self):
+        self.tkapi.market.quotes(['S%02d' % i for i in range(9)])
+        executor = self.tkapi._api.executor
+
+        self.tkapi.market.quotes(['S%02d' % i for i in range(9)])
+        self.assertIs(self.tkapi._api.executor, executor)
+        self.assertEqual(executor._max_workers, 10)
+
+        self.tkapi._api.close()
+        self.assertIsNone(self.tkapi._api._executor)
+
+
+class SchemaTest(unittest.TestCase):
+    def test_columns_typed(self):
+        df = api._quotes_to_df([
+            dict(_quote('IBM'), pchg='1.50%', timestamp='1389992340',
+                 name='IBM Corp', strikeprice='$1,180.00'),
+            dict(_quote('F'), pchg='-0.50%', timestamp='1389992400',
+                 name='Ford', strikeprice='15')])
+
+        self.assertEqual(list(df.index), ['IBM', 'F'])
+        self.assertEqual(df['vl'].dtype, np.int64)
+        np.testing.assert_array_equal(df['pchg'], [1.5, -0.5])
+        np.testing.assert_array_equal(df['strikeprice'], [1180.0, 15.0])
+        self.assertEqual(df['name'].tolist(), ['IBM Corp', 'Ford'])
+        self.assertEqual(df['timestamp'].iloc[0],
+                         pd.Timestamp('2014-01-17 20:59:00'))
+        self.assertEqual(df['datetime'].iloc[0],
+                         pd.Timestamp('2014-01-17T20:59:00Z'))
+
+    def test_unparsable_numbers(self):
+        df = api._quotes_to_df([dict(_quote('IBM'), last='n/a', vl=''),
+                                _quote('F')])
+
+        self.assertTrue(np.isnan(df.loc['IBM', 'last']))
+        self.assertTrue(np.isnan(df.loc['IBM', 'vl']))
+        self.assertEqual(df.loc['F', 'vl'], 1000)
+
+    def test_ragged_quotes(self):
+        df = api._quotes_to_df([{'symbol': 'IBM', 'last': '1'},
+                                {'symbol': 'F', 'bid': '2'}])
+
+        self.assertEqual(list(df.columns), ['last', 'bid'])
+        np.testing.assert_array_equal(df['last'], [1.0, np.nan])
+        np.testing.assert_array_equal(df['bid'], [np.nan, 2.0])
+
+    def test_single_quote(self):
+        df = api._quotes_to_df({'symbol': 'IBM', 'last': '187.50'})
+
+        self.assertEqual(list(df.index), ['IBM'])
+        self.assertEqual(df.loc['IBM', 'last'], 187.5)
+
+    def test_single_field(self):
+        df = api._quotes_to_df([{'symbol': 'IBM', 'bid': '1'},
+                                {'symbol': 'F', 'bid': '2'}])
+
+        np.testing.assert_array_equal(df['bid'], [1.0, 2.0])
+
+    def test_extract_fields(self):
+        records = api._quote_records(['bid', 'symbol', 'ask'])
+
+        self.assertEqual(records.fields, ('bid', 'symbol', 'ask'))
+        self.assertEqual(api._quote_records(['bid']).fields,
+                         ('bid', 'symbol'))
+        self.assertIsNone(api._quote_records().fields)
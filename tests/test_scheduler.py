@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+import random
+import threading
+import time
+import unittest
+
+import requests
+
+from tradeking import api
+from tradeking import scheduler
+from tradeking import transport
+
+from tests import stub
+
+
+def _response(status, headers=None):
+    return transport.response(status_code=status, content=b'{}',
+                              headers=headers)
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_refill(self):
+        clock = scheduler.FakeClock()
+        bucket = scheduler.TokenBucket(rate=1.0, capacity=2, clock=clock)
+
+        bucket.take()
+        bucket.take()
+        self.assertEqual(bucket.delay(), 1.0)
+
+        clock.sleep(0.25)
+        self.assertEqual(bucket.delay(), 0.75)
+
+        clock.sleep(10)
+        self.assertEqual(bucket.delay(), 0)
+        self.assertEqual(bucket.tokens, 2)
+
+    def test_drain(self):
+        bucket = scheduler.TokenBucket(rate=1.0, capacity=5,
+                                       clock=scheduler.FakeClock())
+        bucket.drain()
+        self.assertEqual(bucket.delay(), 1.0)
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = scheduler.FakeClock()
+
+    def _scheduler(self, **kwargs):
+        kwargs.setdefault('clock', self.clock)
+        kwargs.setdefault('rng', random.Random(0))
+        return scheduler.Scheduler(**kwargs)
+
+    def test_rate_limit(self):
+        tkscheduler = self._scheduler(limits={scheduler.MARKET: 2})
+
+        for _ in range(3):
+            tkscheduler.call(scheduler.MARKET, lambda: _response(200))
+
+        # NOTE(jkoelker) Two a minute, the third waits for a token.
+        self.assertEqual(self.clock.now, 30)
+        stats = tkscheduler.stats()[scheduler.MARKET]
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['wait_time'], 30)
+        self.assertEqual(stats['queued'], 0)
+
+    def test_classes_limited_independently(self):
+        tkscheduler = self._scheduler(limits={scheduler.MARKET: 1,
+                                              scheduler.ACCOUNT: 1})
+        tkscheduler.call(scheduler.MARKET, lambda: _response(200))
+        tkscheduler.call(scheduler.ACCOUNT, lambda: _response(200))
+        self.assertEqual(self.clock.now, 0)
+
+    def test_priorities(self):
+        tkscheduler = self._scheduler(max_concurrency=1, clock=None)
+        order = []
+
+        def call(kind):
+            tkscheduler.acquire(kind)
+            order.append(kind)
+            tkscheduler.release(kind)
+
+        tkscheduler.acquire(scheduler.MARKET)
+        threads = [threading.Thread(target=call, args=(kind,))
+                   for kind in (scheduler.MARKET, scheduler.ACCOUNT,
+                                scheduler.TRADE)]
+
+        for thread in threads:
+            thread.start()
+
+        deadline = time.monotonic() + 5
+
+        while (sum(stats['queued']
+                   for stats in tkscheduler.stats().values()) < 3 and
+               time.monotonic() < deadline):
+            time.sleep(0.01)
+
+        tkscheduler.release(scheduler.MARKET)
+
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(order, [scheduler.TRADE, scheduler.ACCOUNT,
+                                 scheduler.MARKET])
+
+    def test_retries_with_backoff(self):
+        tkscheduler = self._scheduler(max_retries=3)
+        responses = iter([_response(503), _response(502), _response(200)])
+
+        r = tkscheduler.call(scheduler.MARKET, lambda: next(responses))
+
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(tkscheduler.stats()[scheduler.MARKET]['retries'], 2)
+        # NOTE(jkoelker) Full jitter, at most 0.5 then 1 second.
+        self.assertTrue(0 < self.clock.now <= 1.5)
+
+    def test_gives_up_after_max_retries(self):
+        tkscheduler = self._scheduler(max_retries=2)
+        calls = []
+
+        def func():
+            calls.append(None)
+            return _response(500)
+
+        r = tkscheduler.call(scheduler.MARKET, func)
+        self.assertEqual(r.status_code, 500)
+        self.assertEqual(len(calls), 3)
+
+    def test_throttle_honors_retry_after(self):
+        tkscheduler = self._scheduler()
+        responses = iter([_response(429, {'Retry-After': '7'}),
+                          _response(200)])
+
+        r = tkscheduler.call(scheduler.ACCOUNT, lambda: next(responses))
+
+        self.assertEqual(r.status_code, 200)
+        self.assertGreaterEqual(self.clock.now, 7)
+        stats = tkscheduler.stats()[scheduler.ACCOUNT]
+        self.assertEqual(stats['throttled'], 1)
+        self.assertEqual(stats['retries'], 1)
+
+    def test_trade_not_retried_on_failure(self):
+        tkscheduler = self._scheduler()
+        calls = []
+
+        def func():
+            calls.append(None)
+            return _response(503)
+
+        r = tkscheduler.call(scheduler.TRADE, func)
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(len(calls), 1)
+
+    def test_connection_errors(self):
+        tkscheduler = self._scheduler()
+        errors = [requests.ConnectionError('reset')]
+
+        def func():
+            if errors:
+                raise errors.pop()
+            return _response(200)
+
+        r = tkscheduler.call(scheduler.MARKET, func)
+        self.assertEqual(r.status_code, 200)
+
+        errors.append(requests.ConnectionError('reset'))
+        self.assertRaises(requests.ConnectionError, tkscheduler.call,
+                          scheduler.TRADE, func)
+
+    def test_classify(self):
+        base = api.BASE_URL
+        self.assertEqual(scheduler.classify('GET', base + '/market/clock'),
+                         scheduler.MARKET)
+        self.assertEqual(scheduler.classify(
+            'GET', base + '/accounts/1/orders.json'), scheduler.ACCOUNT)
+        self.assertEqual(scheduler.classify(
+            'POST', base + '/accounts/1/orders.json'), scheduler.TRADE)
+
+
+class StubServerTest(unittest.TestCase):
+    def test_throttled_request_retried(self):
+        clock = {'date': '2014-01-17 09:30:00', 'status': {'current': 'open'},
+                 '@id': 'x'}
+        routes = {'/v1/market/clock': [
+            (429, {'response': {'error': 'Too many requests'}},
+             {'Retry-After': '3'}),
+            (200, {'response': clock}, {})]}
+        fake = scheduler.FakeClock()
+
+        with stub.StubServer(routes) as server:
+            tkapi = api.TradeKing('key', 'secret', 'token', 'secret',
+                                  base_url=server.url + '/v1',
+                                  scheduler=scheduler.Scheduler(
+                                      clock=fake, rng=random.Random(0)))
+            self.assertEqual(tkapi.market.clock['status'],
+                             {'current': 'open'})
+
+        self.assertEqual(len(server.requests), 2)
+        self.assertGreaterEqual(fake.now, 3)
+        stats = tkapi._api.scheduler.stats()[scheduler.MARKET]
+        self.assertEqual(stats['throttled'], 1)
+
+    def test_scheduler_is_opt_in(self):
+        tkapi = api.TradeKing('key', 'secret', 'token', 'secret')
+        self.assertIsNone(tkapi._api.scheduler)
+
+        tkapi = api.TradeKing('key', 'secret', 'token', 'secret',
+                              scheduler=True)
+        self.assertIsInstance(tkapi._api.scheduler, scheduler.Scheduler)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import time
+import unittest
+
+from tradeking import api
+from tradeking import stream
+
+from tests import stub
+
+
+PATH = '/v1/market/quotes'
+
+
+def _quote(i, symbol='IBM'):
+    return json.dumps({'quote': {'symbol': symbol, 'timestamp': str(i),
+                                 'bid': '%d.5' % i, 'ask': '%d.6' % i,
+                                 'bidsz': '1', 'asksz': '2'}}).encode()
+
+
+def _wait(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    return predicate()
+
+
+class DecodeTest(unittest.TestCase):
+    def test_split_messages(self):
+        wire = (_quote(1) + b'\n' + _quote(2) +
+                b'{"status": "connected"}' + '{"trade": {"symbol": "F", '
+                '"last": "15.4", "vl": "100"}}'.encode() + _quote(3))
+        chunks = [wire[i:i + 7] for i in range(0, len(wire), 7)]
+
+        parsed = list(stream.records(stream.decode(chunks)))
+
+        self.assertEqual([type(r).__name__ for r in parsed],
+                         ['Quote', 'Quote', 'Trade', 'Quote'])
+        self.assertEqual(parsed[1].bid, 2.5)
+        self.assertEqual(parsed[2].vl, 100)
+
+    def test_multibyte_split(self):
+        wire = json.dumps({'quote': {'symbol': 'É'}},
+                          ensure_ascii=False).encode()
+        split = wire.index(b'\xc3') + 1
+        messages = list(stream.decode([wire[:split], wire[split:]]))
+        self.assertEqual(messages, [{'quote': {'symbol': 'É'}}])
+
+
+class QuoteStreamTest(unittest.TestCase):
+    def _serve(self, responses):
+        server = stub.StubServer({PATH: responses})
+        server.__enter__()
+        self.addCleanup(server.__exit__, None, None, None)
+        tkapi = api.TradeKing('key', 'secret', 'token', 'secret',
+                              stream_url=server.url + '/v1')
+        return server, tkapi
+
+    def _stream(self, tkapi, symbols, **kwargs):
+        kwargs.setdefault('reconnect_wait', 0.01)
+        quotes = tkapi.market.stream(symbols, **kwargs)
+        self.addCleanup(quotes.stop, 5)
+        return quotes
+
+    def test_reconnects(self):
+        server, tkapi = self._serve([
+            (200, stub.Chunked([_quote(1), _quote(2)]), {}),
+            (503, {'response': {'error': 'Unavailable'}}, {}),
+            (200, stub.Chunked([_quote(3)], hold=True), {})])
+        quotes = self._stream(tkapi, ['IBM'])
+        received = []
+
+        for record in quotes:
+            received.append(record.timestamp)
+
+            if len(received) == 3:
+                break
+
+        self.assertEqual(received, [1.0, 2.0, 3.0])
+        self.assertEqual(quotes.reconnects, 2)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_backoff(self):
+        server, tkapi = self._serve([
+            (503, {'response': {'error': 'Unavailable'}}, {})])
+        quotes = self._stream(tkapi, ['IBM'], reconnect_wait=0.05,
+                              max_reconnect_wait=0.1)
+        quotes.start()
+
+        self.assertTrue(_wait(lambda: quotes.reconnects >= 3))
+        quotes.stop(5)
+
+        # NOTE(jkoelker) Waits of 0.05, 0.1 and then capped at 0.1.
+        self.assertLessEqual(len(server.requests), quotes.reconnects + 1)
+
+    def test_resubscribe(self):
+        server, tkapi = self._serve([
+            (200, stub.Chunked([_quote(1)], hold=True), {}),
+            (200, stub.Chunked([_quote(2, 'F')], hold=True), {})])
+        quotes = self._stream(tkapi, 'IBM')
+        received = []
+
+        for record in quotes:
+            received.append(record.symbol)
+
+            if len(received) == 1:
+                quotes.subscribe(['F', 'AAPL'])
+            else:
+                break
+
+        self.assertEqual(received, ['IBM', 'F'])
+        self.assertEqual(quotes.reconnects, 0)
+        self.assertEqual([query['symbols'] for _, _, query, _ in
+                          server.requests], [['IBM'], ['F,AAPL']])
+
+    def test_stop_quiet_stream(self):
+        server, tkapi = self._serve([
+            (200, stub.Chunked([_quote(1)], hold=True), {})])
+        quotes = self._stream(tkapi, ['IBM'])
+        received = []
+        quotes.start(callback=received.extend)
+
+        self.assertTrue(_wait(lambda: received))
+        started = time.monotonic()
+        quotes.stop(5)
+
+        # NOTE(jkoelker) The reader is blocked on a silent socket, stopping
+        #                must not wait for `read_timeout`.
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(quotes.reconnects, 0)
+
+    def test_slow_consumer_blocks(self):
+        wire = [b''.join(_quote(i) for i in range(50))]
+        server, tkapi = self._serve([(200, stub.Chunked(wire, hold=True),
+                                      {})])
+        quotes = self._stream(tkapi, ['IBM'], queue_size=5, batch_size=4,
+                              batch_wait=0.01)
+        received = []
+        batches = []
+        sizes = []
+
+        def consume(batch):
+            sizes.append(quotes._queue.qsize())
+            batches.append(len(batch))
+            received.extend(record.timestamp for record in batch)
+            time.sleep(0.005)
+
+        quotes.start(callback=consume)
+
+        self.assertTrue(_wait(lambda: len(received) == 50))
+        self.assertEqual(received, [float(i) for i in range(50)])
+        self.assertEqual(quotes.dropped, 0)
+        self.assertLessEqual(max(sizes), 5)
+        self.assertLessEqual(max(batches), 4)
+
+    def test_slow_consumer_drops(self):
+        wire = [b''.join(_quote(i) for i in range(50))]
+        server, tkapi = self._serve([(200, stub.Chunked(wire, hold=True),
+                                      {})])
+        quotes = self._stream(tkapi, ['IBM'], queue_size=2, batch_size=1,
+                              batch_wait=0.01, drop_when_full=True)
+        received = []
+        release = threading.Event()
+
+        def consume(batch):
+            release.wait(5)
+            received.extend(record.timestamp for record in batch)
+
+        quotes.start(callback=consume)
+
+        self.assertTrue(_wait(lambda: quotes.dropped + 3 >= 50))
+        release.set()
+        self.assertTrue(_wait(lambda: len(received) + quotes.dropped == 50))
+        self.assertGreater(quotes.dropped, 0)
+        self.assertEqual(received, sorted(received))
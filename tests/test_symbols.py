@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import itertools
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from tradeking import utils
+
+
+EXPIRATIONS = ['2014-02-22', datetime.date(2014, 3, 22),
+               pd.Timestamp('2015-01-17')]
+STRIKES = [0.5, 180, 182.5, 1000]
+
+
+class OptionSymbolsTest(unittest.TestCase):
+    def test_matches_option_symbol(self):
+        expected = [utils.option_symbol('IBM', expiration, call_put, strike)
+                    for expiration, call_put, strike in itertools.product(
+                        EXPIRATIONS, (utils.CALL, utils.PUT), STRIKES)]
+
+        self.assertEqual(utils.option_symbols('IBM', EXPIRATIONS, STRIKES),
+                         expected)
+
+    def test_symbol(self):
+        self.assertEqual(utils.option_symbol('IBM', '2014-02-22', 'c',
+                                             182.5), 'IBM140222C00182500')
+
+        with self.assertRaises(ValueError):
+            utils.option_symbol('IBM', '2014-02-22', 'X', 180)
+
+    def test_calls_or_puts(self):
+        calls = utils.option_symbols('IBM', EXPIRATIONS[:1], STRIKES,
+                                     puts=False)
+        puts = utils.option_symbols('IBM', EXPIRATIONS[:1], STRIKES,
+                                    calls=False)
+
+        self.assertTrue(all(s[9] == utils.CALL for s in calls))
+        self.assertTrue(all(s[9] == utils.PUT for s in puts))
+        self.assertEqual(len(calls + puts), 2 * len(STRIKES))
+
+        with self.assertRaises(ValueError):
+            utils.option_symbols('IBM', EXPIRATIONS, STRIKES, calls=False,
+                                 puts=False)
+
+    def test_format_strikes(self):
+        np.testing.assert_array_equal(
+            utils.format_strikes(STRIKES),
+            ['00000500', '00180000', '00182500', '01000000'])
+        np.testing.assert_array_equal(utils.format_strikes(7.95),
+                                      ['00007950'])
+
+
+class ParseOptionSymbolsTest(unittest.TestCase):
+    def test_matches_parse_option_symbol(self):
+        symbols = utils.option_symbols('IBM', EXPIRATIONS, STRIKES)
+        symbols.append('brkb140222p00182500')
+        df = utils.parse_option_symbols(symbols)
+
+        for row, symbol in zip(df.itertuples(index=False), symbols):
+            underlying, expiration, call_put, strike = (
+                utils.parse_option_symbol(symbol))
+
+            self.assertEqual(row.underlying, underlying)
+            self.assertEqual(row.expiration, expiration)
+            self.assertEqual(row.call_put, call_put)
+            self.assertEqual(row.strike, utils.Price.encode(strike))
+
+    def test_columns(self):
+        df = utils.parse_option_symbols(['IBM140222C00180000',
+                                         'ibm140222p00182500'])
+
+        self.assertEqual(list(df.columns),
+                         ['underlying', 'expiration', 'call_put', 'strike'])
+        self.assertEqual(df['underlying'].tolist(), ['IBM', 'IBM'])
+        self.assertEqual(df['call_put'].tolist(), ['C', 'P'])
+        self.assertEqual(df['strike'].dtype, np.int64)
+        self.assertEqual(df['strike'].tolist(), [180000, 182500])
+        self.assertTrue(pd.api.types.is_datetime64_dtype(df['expiration']))
+
+    def test_round_trip(self):
+        df = utils.parse_option_symbols(
+            utils.option_symbols('F', EXPIRATIONS, STRIKES))
+
+        self.assertEqual(sorted(set(df['expiration'].dt.date)),
+                         [pd.Timestamp(e).date() for e in EXPIRATIONS])
+        np.testing.assert_array_equal(
+            utils.PriceArray(np.unique(df['strike'].to_numpy())).decode(),
+            STRIKES)
+
+    def test_empty(self):
+        self.assertEqual(len(utils.parse_option_symbols([])), 0)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from tradeking import api
+from tradeking import timesales
+
+from tests import stub
+
+
+BARS = {'response': {'quotes': {'quote': [
+    {'timestamp': '1388999400', 'opn': '187.0', 'hi': '188.0', 'lo': '186.5',
+     'last': '187.5', 'vl': '1000', 'incr_vl': '1000'},
+    {'timestamp': '1388999700', 'opn': '187.5', 'hi': '188.5', 'lo': '187.0',
+     'last': '188.0', 'vl': '2000', 'incr_vl': '1000'}]}}}
+
+
+def _mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+
+        array = array.base
+
+    return False
+
+
+class TimesalesTest(unittest.TestCase):
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.store = timesales.Store(path)
+
+    def test_cached_day_is_memory_mapped(self):
+        routes = {'/v1/market/timesales': [(200, BARS, {})]}
+
+        with stub.StubServer(routes) as server:
+            tkapi = api.TradeKing('key', 'secret', 'token', 'secret',
+                                  base_url=server.url + '/v1')
+            tkapi.market.timesales_store = self.store
+            fetched = tkapi.market.timesales('IBM', '2014-01-06')
+            cached = tkapi.market.timesales('IBM', '2014-01-06')
+            both = tkapi.market.timesales('IBM', '2014-01-06', '2014-01-07')
+
+        self.assertEqual(len(server.requests), 2)
+        self.assertTrue(cached.equals(fetched))
+        self.assertEqual(len(both), 4)
+
+        self.assertTrue(_mapped(cached['last'].to_numpy()))
+        self.assertFalse(_mapped(both['last'].to_numpy()))
+
+        with self.assertRaises(ValueError):
+            cached.iloc[0, 0] = 1.0
+
+        writable = cached.copy()
+        writable.iloc[0, 0] = 1.0
+        both.iloc[0, 0] = 1.0
+        self.assertEqual(writable.iloc[0, 0], both.iloc[0, 0])
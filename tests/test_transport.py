@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from tradeking import api
+from tradeking import transport
+
+from tests import stub
+
+
+CLOCK = {'response': {'@id': 'x', 'date': '2014-01-17 16:00:00',
+                      'status': {'current': 'close'}}}
+QUOTES = {'response': {'quotes': {'quote': [
+    {'symbol': 'IBM', 'bid': '187.73', 'ask': '187.75', 'last': '187.74'},
+    {'symbol': 'F', 'bid': '15.43', 'ask': '15.45', 'last': '15.44'}]}}}
+
+
+class KeyTest(unittest.TestCase):
+    def test_host_dropped(self):
+        self.assertEqual(
+            transport.key('get', 'https://api.tradeking.com/v1/x.json'),
+            transport.key('GET', 'http://127.0.0.1:8080/v1/x.json'))
+
+    def test_params_and_data(self):
+        url = 'https://api.tradeking.com/v1/x.json'
+
+        self.assertEqual(
+            transport.key('POST', url, data={'b': 1, 'a': 'x'}),
+            transport.key('POST', url, data={'a': 'x', 'b': '1'}))
+        self.assertEqual(transport.key('POST', url, data=b'a=x'),
+                         transport.key('POST', url, data='a=x'))
+        self.assertNotEqual(transport.key('GET', url, params={'a': 1}),
+                            transport.key('GET', url, data={'a': 1}))
+        self.assertEqual(transport.key('GET', url, timeout=5),
+                         transport.key('GET', url))
+        self.assertNotEqual(transport.key('GET', url + '?a=1'),
+                            transport.key('GET', url))
+
+
+class ReplayTest(unittest.TestCase):
+    def _replay(self, **kwargs):
+        url = 'https://api.tradeking.com/v1/x.json'
+        interactions = {transport.key('GET', url): [
+            {'status_code': 200, 'headers': {'X-N': '1'},
+             'body': {'text': '1'}},
+            {'status_code': 429, 'headers': {}, 'body': {'text': '2'}}]}
+        return url, transport.Replay(interactions=interactions, **kwargs)
+
+    def test_in_order_then_last(self):
+        url, replay = self._replay()
+        responses = [replay.request('GET', url) for _ in range(3)]
+
+        self.assertEqual([r.status_code for r in responses],
+                         [200, 429, 429])
+        self.assertEqual([r.content for r in responses], [b'1', b'2', b'2'])
+        self.assertEqual(responses[0].headers['x-n'], '1')
+        self.assertEqual(replay.requests, 3)
+
+    def test_missing(self):
+        url, replay = self._replay()
+
+        with self.assertRaises(KeyError):
+            replay.request('GET', url, params={'a': 1})
+
+    def test_latency(self):
+        sleeps = []
+        url, replay = self._replay(latency=0.05, jitter=0.01,
+                                   sleep=sleeps.append)
+        replay.request('GET', url)
+        replay.request('GET', url)
+
+        self.assertEqual(len(sleeps), 2)
+        self.assertTrue(all(0.05 <= s <= 0.06 for s in sleeps))
+
+    def test_no_latency(self):
+        sleeps = []
+        url, replay = self._replay(sleep=sleeps.append)
+        replay.request('GET', url)
+
+        self.assertEqual(sleeps, [])
+
+    def test_streamed(self):
+        r = transport.response(content=b'{"a": 1}')
+
+        self.assertEqual(b''.join(r.iter_content(3)), b'{"a": 1}')
+        self.assertEqual(r.json(), {'a': 1})
+
+
+class CassetteTest(unittest.TestCase):
+    def setUp(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.path = os.path.join(path, 'cassette.json.gz')
+        self.routes = {'/v1/market/clock': [(200, CLOCK, {})],
+                       '/v1/market/ext/quotes': [(200, QUOTES, {})],
+                       '/v1/binary': [(200, b'\xff\x00', {})]}
+
+    def test_record_and_replay(self):
+        with stub.StubServer(self.routes) as server:
+            with transport.Recorder(self.path) as recorder:
+                tkapi = api.TradeKing('key', 'secret', 'token', 'secret',
+                                      base_url=server.url + '/v1',
+                                      transport=recorder)
+                clock = tkapi.market.clock
+                quotes = tkapi.market.quotes(['IBM', 'F'])
+                binary = tkapi._api.get(server.url + '/v1/binary',
+                                        format=None, decode=False)
+
+        self.assertIs(recorder.transport, tkapi._api._api)
+        self.assertEqual(len(recorder.interactions), 3)
+        self.assertTrue(all(set(i) == set(('key', 'status_code',
+                                           'headers', 'body'))
+                            for i in recorder.interactions))
+
+        replay = transport.Replay(self.path)
+        tkapi = api.TradeKing('', '', '', '', base_url='http://replayed/v1',
+                              transport=replay)
+
+        self.assertEqual(tkapi.market.clock, clock)
+        pd.testing.assert_frame_equal(tkapi.market.quotes(['IBM', 'F']),
+                                      quotes)
+        self.assertEqual(tkapi._api.get('http://replayed/v1/binary',
+                                        format=None, decode=False).content,
+                         binary.content)
+        self.assertEqual(replay.requests, 3)
+
+        with self.assertRaises(KeyError):
+            tkapi.market.quotes(['AAPL'])
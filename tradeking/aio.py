@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+'''
+Asyncio client mirroring `tradeking.TradeKing`.
+
+The request builders (`_quotes`, `_strikes`, ...) are shared with the sync
+classes; here `AsyncAPI.get`/`AsyncAPI.post` return coroutines so the public
+methods only await them and parse the result with the same helpers. Sync
+properties (`balances`, `accounts`, ...) are coroutine methods here. Quote
+streaming and quote batching have no asyncio equivalent and raise
+NotImplementedError.
+
+Requires `aiohttp`.
+'''
+
+import asyncio
+import time
+import urllib.parse
+
+from oauthlib import oauth1
+import pandas as pd
+
+from tradeking import api
+from tradeking import decoders
+from tradeking import history as tkhistory
+from tradeking import snapshot as tksnapshot
+from tradeking import timesales
+from tradeking import utils
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncAPI(object):
+    def __init__(self, consumer_key, consumer_secret,
+                 oauth_token, oauth_secret, pool_size=10,
+                 base_url=api.BASE_URL, cache=None, decoder=None):
+        if aiohttp is None:
+            raise ImportError('aiohttp is required for the asyncio client')
+
+        if decoder is None or isinstance(decoder, str):
+            decoder = decoders.get(decoder)
+
+        self.base_url = base_url
+        self.cache = cache
+        self.decoder = decoder
+        self._client = oauth1.Client(consumer_key,
+                                     client_secret=consumer_secret,
+                                     resource_owner_key=oauth_token,
+                                     resource_owner_secret=oauth_secret)
+        self._pool_size = pool_size
+        self._semaphore = None
+        self._session = None
+
+    join = api.API.join
+
+    @property
+    def semaphore(self):
+        '''Bounds the requests in flight, created in the running loop.'''
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._pool_size)
+        return self._semaphore
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._pool_size)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def memoize(self, endpoint, key, func):
+        '''Return `await func()` through the cache, if the API has one.'''
+        if self.cache is None:
+            return await func()
+
+        return await self.cache.amemoize(endpoint, key, func)
+
+    def sign(self, method, url, params=None, data=None, headers=None):
+        '''Return the OAuth1 signed (url, headers, body) for a request.'''
+        headers = dict(headers or {})
+        body = None
+
+        if params:
+            url = '?'.join((url, urllib.parse.urlencode(params)))
+
+        if isinstance(data, dict):
+            body = urllib.parse.urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif data is not None:
+            body = data
+
+        return self._client.sign(url, http_method=method, body=body,
+                                 headers=headers)
+
+    async def request(self, method, url, format='json', decode=True,
+                      params=None, data=None, headers=None, **kwargs):
+        if format:
+            url = '.'.join((url, format))
+
+        url, headers, body = self.sign(method, url, params=params, data=data,
+                                       headers=headers)
+
+        async with self.semaphore:
+            async with self.session.request(method, url, headers=headers,
+                                            data=body, **kwargs) as r:
+                if decode:
+                    return decoders.decode(self.decoder, await r.read(),
+                                           decode)
+
+                await r.read()
+                return r
+
+    def get(self, url, format='json', decode=True, **kwargs):
+        return self.request('GET', url=url, format=format, decode=decode,
+                            **kwargs)
+
+    def post(self, url, format='json', decode=True, **kwargs):
+        return self.request('POST', url=url, format=format, decode=decode,
+                            **kwargs)
+
+
+class Account(api.Account):
+    async def balances(self):
+        r = await self._balances()
+        return r['response']['accountbalance']
+
+    async def history(self, date_range='all', transactions='all'):
+        r = await self._history(date_range=date_range,
+                                transactions=transactions)
+        return r['response']['transactions']['transaction']
+
+    async def holdings(self):
+        r = await self._holdings()
+        return r['response']['accountholdings']['holding']
+
+    async def orders(self):
+        r = await self._orders()
+        return r['response']['orderstatus']
+
+    async def iter_history(self, transactions='all', since=None,
+                           ranges=None):
+        '''Asynchronously yield transactions, see Account.iter_history.'''
+        seen = set()
+
+        for date_range in tkhistory._plan(since, ranges, None):
+            r = await self._history(date_range=date_range,
+                                    transactions=transactions)
+
+            for transaction in tkhistory._unseen(r, seen, since):
+                yield transaction
+
+    async def order(self, order, preview=True):
+        r = await self._order(order, preview=preview)
+        return r['response']
+
+    async def _timed_order(self, order, preview):
+        start = time.perf_counter()
+
+        try:
+            response = await self.order(order, preview=preview)
+        except Exception as e:
+            return None, time.perf_counter() - start, str(e)
+
+        elapsed = time.perf_counter() - start
+        return response, elapsed, api._order_error(response)
+
+    async def _run(self, orders, preview, fail_fast=True, max_workers=None):
+        semaphore = asyncio.Semaphore(max_workers or len(orders) or 1)
+
+        async def run(order):
+            async with semaphore:
+                return await self._timed_order(order, preview)
+
+        tasks = [asyncio.ensure_future(run(order)) for order in orders]
+
+        for next_done in (asyncio.as_completed(tasks) if fail_fast else ()):
+            if (await next_done)[2] is not None:
+                for task in tasks:
+                    task.cancel()
+                break
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return [(None, None, 'Cancelled') if task.cancelled()
+                else task.result()
+                for task in tasks]
+
+    async def basket(self, orders, submit=True, max_workers=None):
+        '''
+        Preview a basket of orders concurrently, then place them.
+
+        See Account.basket; `max_workers` bounds the orders in flight at
+            once, on top of the API's connection limit.
+        '''
+        orders = api._basket_orders(orders)
+        results = api._previewed(orders, await self._run(
+            orders, True, max_workers=max_workers))
+
+        if not submit:
+            return results
+
+        submits = await self._run(orders, False, fail_fast=False,
+                                  max_workers=max_workers)
+        return api._submitted(results, submits)
+
+
+class News(api.News):
+    async def article(self, article_id):
+        r = await self._article(article_id=article_id)
+        return r['response']['article']
+
+    async def search(self, keywords=None, symbols=None, maxhits=None,
+                     startdate=None, enddate=None):
+        r = await self._search(keywords=keywords, symbols=symbols,
+                               maxhits=maxhits, startdate=startdate,
+                               enddate=enddate)
+        return r['response']['articles']['article']
+
+
+class Options(api.Options):
+    async def expirations(self, symbol):
+        async def fetch():
+            r = await self._expirations(symbol=symbol)
+            return r['response']['expirationdates']['date']
+
+        expirations = await self._api.memoize('expirations', (symbol,), fetch)
+        return pd.to_datetime(pd.Series(expirations))
+
+    async def search(self, symbol, query, fields=None):
+        quotes = await self._search(symbol=symbol, query=query,
+                                    fields=fields,
+                                    decode=api._quote_records(fields))
+        return api._quotes_to_df(quotes)
+
+    async def strikes(self, symbol):
+        async def fetch():
+            r = await self._strikes(symbol=symbol)
+            return r['response']['prices']['price']
+
+        strikes = await self._api.memoize('strikes', (symbol,), fetch)
+        return pd.Series(strikes, dtype=float)
+
+    async def quote(self, symbol, strikes=None, expirations=None, calls=True,
+                    puts=True, fields=None):
+        if strikes is None and expirations is None:
+            strikes, expirations = await asyncio.gather(
+                self.strikes(symbol), self.expirations(symbol))
+
+        elif strikes is None:
+            strikes = await self.strikes(symbol)
+
+        elif expirations is None:
+            expirations = await self.expirations(symbol)
+
+        symbols = utils.option_symbols(symbol, expirations, strikes, calls,
+                                       puts)
+        return await self._market.quotes(symbols=symbols, fields=fields)
+
+
+class Market(api.Market):
+    def __init__(self, api, chunk_size=500, timesales_store=None):
+        self._api = api
+        self.chunk_size = chunk_size
+        self.timesales_store = timesales_store
+        self.news = News(self._api)
+        self.options = Options(self._api, self)
+
+    @property
+    def batch_window(self):
+        return 0
+
+    @batch_window.setter
+    def batch_window(self, batch_window):
+        if batch_window:
+            raise NotImplementedError('Quote batching is not supported by '
+                                      'the asyncio client')
+
+    def stream(self, symbols, **kwargs):
+        raise NotImplementedError('Quote streaming is not supported by the '
+                                  'asyncio client, use '
+                                  'tradeking.TradeKing.market.stream')
+
+    async def clock(self):
+        async def fetch():
+            r = await self._clock()
+            r = dict(r['response'])
+            del r['@id']
+            return r
+
+        return dict(await self._api.memoize('clock', (), fetch))
+
+    async def _quotes_df(self, symbols, fields=None):
+        quotes = await self._quotes(symbols=symbols, fields=fields,
+                                    decode=api._quote_records(fields))
+        return api._quotes_to_df(quotes)
+
+    async def quotes(self, symbols, fields=None, chunk_size=None):
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+
+        chunks = api._chunks(symbols, chunk_size or self.chunk_size)
+
+        if len(chunks) <= 1:
+            return await self._quotes_df(symbols=symbols, fields=fields)
+
+        frames = await asyncio.gather(*[self._quotes_df(chunk, fields)
+                                        for chunk in chunks])
+        return api._merge_chunks(frames, symbols)
+
+    async def toplist(self, list_type='toppctgainers'):
+        quotes = await self._toplist(list_type=list_type,
+                                     decode=api._quote_records())
+        return api._quotes_to_df(quotes)
+
+    async def _timesales_day(self, symbol, interval, day, rpp=1000):
+        day = day.strftime('%Y-%m-%d')
+        quotes = []
+        index = 0
+
+        while True:
+            r = await self._timesales(symbol, interval=interval,
+                                      startdate=day, enddate=day, rpp=rpp,
+                                      index=index)
+            page = api._timesales_page(r)
+            quotes.extend(page)
+
+            if len(page) < rpp:
+                return timesales.to_array(quotes)
+
+            index = index + 1
+
+    async def timesales(self, symbol, startdate, enddate=None,
+                        interval='5min', store=None):
+        '''Intraday bars for `symbol`, see Market.timesales.'''
+        if store is None:
+            store = self.timesales_store
+
+        days, bars = self._cached_bars(symbol, startdate, enddate, interval,
+                                       store)
+        missing = [day for day in days if day not in bars]
+        fetched = await asyncio.gather(*[
+            self._timesales_day(symbol, interval, day) for day in missing])
+        return self._bars_frame(symbol, interval, days, bars,
+                                zip(missing, fetched), store)
+
+
+async def _fetch(account, resource):
+    method, path = tksnapshot._REQUESTS[resource]
+    return tksnapshot._records(await getattr(account, method)(), *path)
+
+
+async def fetch(accounts, resources=tksnapshot.RESOURCES):
+    '''Fetch `resources` for every account concurrently, see snapshot.fetch.'''
+    tasks = tksnapshot._tasks(accounts, resources)
+    results = await asyncio.gather(*[_fetch(account, resource)
+                                     for account, resource in tasks])
+    return tksnapshot._collect(tasks, results, resources)
+
+
+class SnapshotWatcher(tksnapshot.SnapshotWatcher):
+    async def poll(self):
+        '''
+        Snapshot of the accounts that changed since the last poll, see
+            snapshot.SnapshotWatcher.poll.
+        '''
+        timestamp = pd.Timestamp.now(tz='UTC')
+        fetched = await fetch(self.accounts,
+                              resources=(tksnapshot.HOLDINGS,
+                                         tksnapshot.ORDERS))
+        changed = self._changed(fetched)
+
+        if not changed:
+            return None
+
+        balances = await fetch(changed, resources=(tksnapshot.BALANCES,))
+        return self._changes(fetched, changed, balances, timestamp)
+
+
+class TradeKing(api.TradeKing):
+    '''
+    Asyncio sibling of `tradeking.TradeKing`.
+
+    Every request shares one aiohttp connection pool of `pool_size`
+        connections, which also bounds the number of requests in flight.
+
+    A `cache` memoizes option strikes, expirations and the clock as it does
+        for the sync client.
+
+        async with aio.TradeKing(...) as tkapi:
+            quotes = await tkapi.market.quotes(['IBM', 'F'])
+    '''
+    def __init__(self, consumer_key, consumer_secret,
+                 oauth_token, oauth_secret, pool_size=10, chunk_size=500,
+                 base_url=api.BASE_URL, cache=None, decoder=None):
+        self._api = AsyncAPI(consumer_key=consumer_key,
+                             consumer_secret=consumer_secret,
+                             oauth_token=oauth_token,
+                             oauth_secret=oauth_secret,
+                             pool_size=pool_size,
+                             base_url=base_url,
+                             cache=cache,
+                             decoder=decoder)
+        self.market = Market(self._api, chunk_size=chunk_size)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self._api.close()
+
+    def account(self, account_id):
+        return Account(self._api, account_id)
+
+    async def accounts(self):
+        '''Ids of the accounts the OAuth token has access to.'''
+        r = await self._accounts()
+        summaries = tksnapshot._records(r, 'accounts', 'accountsummary')
+        return [summary['account'] for summary in summaries]
+
+    async def _account_list(self, account_ids):
+        if account_ids is None:
+            account_ids = await self.accounts()
+
+        return [self.account(account_id) for account_id in account_ids]
+
+    async def snapshot(self, account_ids=None,
+                       resources=tksnapshot.RESOURCES):
+        '''
+        Balances, holdings and orders of many accounts at once, see
+            tradeking.TradeKing.snapshot.
+        '''
+        accounts = await self._account_list(account_ids)
+        timestamp = pd.Timestamp.now(tz='UTC')
+        fetched = await fetch(accounts, resources=resources)
+        return tksnapshot._snapshot(fetched, timestamp)
+
+    async def watch(self, account_ids=None,
+                    holding_fields=tksnapshot.HOLDING_FIELDS):
+        '''A SnapshotWatcher polling accounts, see TradeKing.watch.'''
+        return SnapshotWatcher(self._api,
+                               await self._account_list(account_ids),
+                               holding_fields=holding_fields)
@@ -1,10 +1,28 @@
 # -*- coding: utf-8 -*-
 
+import collections
+import copy
+import concurrent.futures
+import functools
+import operator
+import threading
+import time
 import urllib.parse
 
+from requests import adapters
 import requests_oauthlib as roauth
+import numpy as np
 import pandas as pd
 
+from tradeking import decoders
+from tradeking import flight
+from tradeking import history as tkhistory
+from tradeking import metrics as tkmetrics
+from tradeking import orders as tkorders
+from tradeking import scheduler as tkscheduler
+from tradeking import snapshot as tksnapshot
+from tradeking import stream
+from tradeking import timesales
 from tradeking import utils
 
 
@@ -22,30 +40,133 @@ _INT_KEYS = ('asksz', 'basis', 'bidsz', 'bidtick', 'days_to_expiration',
              'sho', 'tr_num', 'vl', 'xday', 'xmonth', 'xyear')
 
 
+_CLEAN = str.maketrans('', '', '$,%')
+
+
+def _to_numeric(values, dtype):
+    # NOTE(jkoelker) Most columns are either already numbers or clean
+    #                numeric strings, so only strip '$,%' when that fails.
+    try:
+        return np.array(values, dtype=dtype)
+    except (TypeError, ValueError):
+        pass
+
+    cleaned = [v.translate(_CLEAN) if isinstance(v, str) else v
+               for v in values]
+
+    try:
+        return np.array(cleaned, dtype=dtype)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(cleaned), errors='coerce').to_numpy()
+
+
+def _to_datetime(values, **kwargs):
+    try:
+        return pd.to_datetime(values, **kwargs)
+    except (TypeError, ValueError):
+        return values
+
+
+def _to_timestamp(values):
+    return _to_datetime(_to_numeric(values, np.float64), unit='s')
+
+
+_SCHEMA = {}
+_SCHEMA.update((key, _to_datetime) for key in _DATE_KEYS)
+_SCHEMA.update((key, functools.partial(_to_numeric, dtype=np.float64))
+               for key in _FLOAT_KEYS)
+_SCHEMA.update((key, functools.partial(_to_numeric, dtype=np.int64))
+               for key in _INT_KEYS)
+_SCHEMA['timestamp'] = _to_timestamp
+
+
+def _columns(quotes):
+    '''Transpose a list of quote dicts into a dict of column tuples.'''
+    keys = list(quotes[0])
+
+    # NOTE(jkoelker) Quotes almost always share the same keys, in which case
+    #                itemgetter and zip transpose them without a per cell
+    #                Python call.
+    if all(len(quote) == len(keys) for quote in quotes):
+        try:
+            rows = list(map(operator.itemgetter(*keys), quotes))
+        except KeyError:
+            pass
+        else:
+            if len(keys) == 1:
+                rows = [(row,) for row in rows]
+            return dict(zip(keys, zip(*rows)))
+
+    keys = dict.fromkeys(key for quote in quotes for key in quote)
+    return dict((key, [quote.get(key) for quote in quotes]) for key in keys)
+
+
 def _quotes_to_df(quotes):
     if not isinstance(quotes, list):
         quotes = [quotes]
-    df = pd.DataFrame.from_records(quotes, index='symbol')
 
-    for col in df.keys().intersection(_DATE_KEYS):
-        kwargs = {}
-        if col == 'timestamp':
-            kwargs['unit'] = 's'
+    columns = _columns(quotes)
+    index = pd.Index(columns.pop('symbol'), name='symbol')
 
-        try:
-            df[col] = pd.to_datetime(df[col], **kwargs)
-        except ValueError:
-            pass
+    for key, values in columns.items():
+        convert = _SCHEMA.get(key)
+        if convert is not None:
+            columns[key] = convert(values)
+
+    return pd.DataFrame(columns, index=index)
+
+
+def _quote_records(fields=None):
+    '''
+    Extract of the quote records of a response, only `fields` (and the
+        symbol) of each when given.
+    '''
+    if fields is not None:
+        fields = tuple(dict.fromkeys(tuple(fields) + ('symbol',)))
+
+    return decoders.Extract(('response', 'quotes', 'quote'), fields)
+
+
+def _timesales_page(response):
+    page = (response['response'].get('quotes') or {}).get('quote') or []
+
+    if isinstance(page, dict):
+        page = [page]
 
-    for col in df.keys().intersection(_INT_KEYS):
-        cleaned = df[col].str.replace(r'[$,%]', '')
-        df[col] = cleaned.astype('int', errors='ignore')
+    return page
 
-    for col in df.keys().intersection(_FLOAT_KEYS):
-        cleaned = df[col].str.replace(r'[$,%]', '')
-        df[col] = cleaned.astype('float', errors='ignore')
 
-    return df
+def _chunks(symbols, chunk_size):
+    return [symbols[i:i + chunk_size]
+            for i in range(0, len(symbols), chunk_size)]
+
+
+def _order(df, symbols, select=False):
+    '''
+    Order the rows of a quote frame as in `symbols`.
+
+    Rows for symbols not in `symbols` are kept at the end unless `select` is
+        True, in which case they are dropped.
+    '''
+    order = {}
+    for i, symbol in enumerate(symbols):
+        order.setdefault(symbol.upper(), i)
+
+    positions = np.array([order.get(symbol.upper(), -1)
+                          for symbol in df.index], dtype=np.int64)
+
+    if select:
+        df = df.iloc[positions >= 0]
+        positions = positions[positions >= 0]
+    else:
+        positions[positions < 0] = len(symbols)
+
+    return df.iloc[np.argsort(positions, kind='stable')]
+
+
+def _merge_chunks(frames, symbols):
+    '''Concatenate quote frames, ordering the rows as in `symbols`.'''
+    return _order(pd.concat(frames), symbols)
 
 
 # TODO(jkoelker) Would be nice to do a proper DSL
@@ -80,14 +201,126 @@ class OptionQuery(object):
                              for field, op, value in self._query])
 
 
+class _TimedAuth(object):
+    '''Auth adding the time it spends signing to the thread's timings.'''
+    def __init__(self, auth, timings):
+        self._auth = auth
+        self._timings = timings
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        request = self._auth(request)
+        timings = getattr(self._timings, 'current', None)
+
+        if timings is not None:
+            timings['sign'] += time.perf_counter() - start
+
+        return request
+
+
 class API(object):
+    '''
+    Signed access to the TradeKing REST API.
+
+    Requests are sent immediately unless a `scheduler` is given. With
+        `scheduler=True` every request goes through a scheduler.Scheduler
+        limiting each request class to TradeKing's per minute quotas, with
+        at most `pool_size` requests in flight; pass a configured Scheduler
+        to change the limits.
+
+    With `coalesce` identical market data requests (the same method, url,
+        params and data) issued while one is in flight share that request's
+        response instead of sending their own; each waiting caller gets its
+        own deep copy of the decoded response. Account and trade requests
+        are always sent.
+
+    Requests are sent by `transport`, the OAuth1 session by default. See the
+        transport module for recording and replaying responses.
+
+    Every request's stage timings, payload sizes and status are reported to
+        `metrics` (see the metrics module). The default, metrics.NOOP, costs
+        nothing.
+
+    Responses are decoded by `decoder`, decoders.default() unless given a
+        decoder or the name of one. A request's `decode` is True to decode
+        the whole body or a decoders.Extract to decode only the records and
+        fields it names.
+    '''
     def __init__(self, consumer_key, consumer_secret,
-                 oauth_token, oauth_secret):
+                 oauth_token, oauth_secret, pool_size=10, base_url=BASE_URL,
+                 stream_url=stream.STREAM_URL, cache=None, scheduler=None,
+                 coalesce=True, transport=None, metrics=tkmetrics.NOOP,
+                 decoder=None):
+        if scheduler is True:
+            scheduler = tkscheduler.Scheduler(max_concurrency=pool_size)
+
+        self.base_url = base_url
+        self.stream_url = stream_url
+        self.cache = cache
+        self.scheduler = scheduler or None
+        self.coalesce = coalesce
+        self._flight = flight.SingleFlight()
         self._api = roauth.OAuth1Session(client_key=consumer_key,
                                          client_secret=consumer_secret,
                                          resource_owner_key=oauth_token,
                                          resource_owner_secret=oauth_secret)
 
+        adapter = adapters.HTTPAdapter(pool_connections=pool_size,
+                                       pool_maxsize=pool_size)
+        self._api.mount('https://', adapter)
+        self._api.mount('http://', adapter)
+
+        if transport is None:
+            transport = self._api
+        elif hasattr(transport, 'bind'):
+            transport = transport.bind(self._api)
+
+        if decoder is None or isinstance(decoder, str):
+            decoder = decoders.get(decoder)
+
+        self.transport = transport
+        self.decoder = decoder
+        self.metrics = metrics
+        self._timings = threading.local()
+
+        # NOTE(jkoelker) Signing happens inside the session, time it by
+        #                wrapping the session's auth.
+        if metrics.enabled:
+            self._api.auth = _TimedAuth(self._api.auth, self._timings)
+
+        self._pool_size = pool_size
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def executor(self):
+        '''Thread pool sized to the connection pool, created on first use.'''
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self._pool_size,
+                    thread_name_prefix='tradeking')
+            return self._executor
+
+    def map(self, func, *iterables):
+        '''Run `func` concurrently over `iterables`, keeping their order.'''
+        return list(self.executor.map(func, *iterables))
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+        self._api.close()
+
+    def memoize(self, endpoint, key, func):
+        '''Return `func()` through the cache, if the API has one.'''
+        if self.cache is None:
+            return func()
+
+        return self.cache.memoize(endpoint, key, func)
+
     def join(self, *paths, **kwargs):
         if len(paths) == 1:
             paths = paths[0]
@@ -97,14 +330,129 @@ class API(object):
 
         return '/'.join(paths)
 
-    def request(self, method, url, format='json', decode=True, **kwargs):
+    def _flight_key(self, method, url, decode, kwargs):
+        if not self.coalesce or set(kwargs) - set(('params', 'data')):
+            return None
+
+        if tkscheduler.classify(method, url) != tkscheduler.MARKET:
+            return None
+
+        key = [method.upper(), url, decode]
+
+        for name in ('params', 'data'):
+            value = kwargs.get(name)
+
+            if isinstance(value, dict):
+                value = tuple(sorted(value.items()))
+
+            key.append(value)
+
+        key = tuple(key)
+
+        try:
+            hash(key)
+        except TypeError:
+            return None
+
+        return key
+
+    def request(self, method, url, format='json', decode=True,
+                priority=None, **kwargs):
         if format:
             url = '.'.join((url, format))
 
-        r = self._api.request(method, url, **kwargs)
+        key = self._flight_key(method, url, decode, kwargs)
+
+        if key is None:
+            return self._request(method, url, decode=decode,
+                                 priority=priority, **kwargs)
+
+        return self._flight.do(key, functools.partial(self._request, method,
+                                                      url, decode=decode,
+                                                      priority=priority,
+                                                      **kwargs),
+                               copy=copy.deepcopy if decode else None)
+
+    def timed(self, endpoint, stage, func, *args, **kwargs):
+        '''Call `func`, reporting its duration to the metrics as `stage`.'''
+        if not self.metrics.enabled:
+            return func(*args, **kwargs)
+
+        start = time.perf_counter()
+
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.metrics.observe(endpoint, stage,
+                                 time.perf_counter() - start)
+
+    def _send(self, timings, method, url, **kwargs):
+        start = time.perf_counter()
+
+        try:
+            return self.transport.request(method, url, **kwargs)
+        finally:
+            timings['transport'] += time.perf_counter() - start
+
+    def _timed_request(self, method, url, decode=True, priority=None,
+                       **kwargs):
+        timings = self._timings.current = {'sign': 0.0, 'transport': 0.0}
+        start = time.perf_counter()
+
+        try:
+            if self.scheduler is None:
+                r = self._send(timings, method, url, **kwargs)
+            else:
+                kind = tkscheduler.classify(method, url)
+                send = functools.partial(self._send, timings, method, url,
+                                         **kwargs)
+                r = self.scheduler.call(kind, send, priority=priority)
+        finally:
+            self._timings.current = None
+
+        sent = time.perf_counter()
+        transport = timings.pop('transport')
+        timings['queue'] = sent - start - transport
+        timings['network'] = transport - timings['sign']
+        status = r.status_code
+        response_bytes = None
+
+        if not kwargs.get('stream'):
+            response_bytes = len(r.content)
+
+        if decode:
+            r = decoders.decode(self.decoder, r.content, decode)
+            timings['decode'] = time.perf_counter() - sent
+
+        timings['total'] = time.perf_counter() - start
+        data = kwargs.get('data')
+
+        if isinstance(data, dict):
+            data = urllib.parse.urlencode(data)
+
+        self.metrics.record(tkmetrics.Sample(
+            endpoint=tkmetrics.endpoint(url, self.base_url),
+            method=method.upper(), status=status, timings=timings,
+            request_bytes=len(data) if data is not None else 0,
+            response_bytes=response_bytes))
+
+        return r
+
+    def _request(self, method, url, decode=True, priority=None, **kwargs):
+        if self.metrics.enabled:
+            return self._timed_request(method, url, decode=decode,
+                                       priority=priority, **kwargs)
+
+        if self.scheduler is None:
+            r = self.transport.request(method, url, **kwargs)
+        else:
+            kind = tkscheduler.classify(method, url)
+            send = functools.partial(self.transport.request, method, url,
+                                     **kwargs)
+            r = self.scheduler.call(kind, send, priority=priority)
 
         if decode:
-            r = r.json()
+            r = decoders.decode(self.decoder, r.content, decode)
 
         return r
 
@@ -117,19 +465,78 @@ class API(object):
                             **kwargs)
 
 
+OrderResult = collections.namedtuple('OrderResult',
+                                     ('order', 'preview', 'response',
+                                      'preview_time', 'submit_time',
+                                      'error'))
+
+
+class OrderError(Exception):
+    '''An order in a basket was rejected; `results` holds every result.'''
+    def __init__(self, message, results):
+        super(OrderError, self).__init__(message)
+        self.results = results
+
+
+def _order_error(response):
+    error = response.get('error')
+
+    if error and error != 'Success':
+        return error
+
+
+def _basket_orders(orders):
+    '''Serialized FIXML of a basket's orders.'''
+    if hasattr(orders, 'to_dict') or (len(orders) and
+                                      isinstance(orders[0], dict)):
+        orders = tkorders.serialize(orders)
+
+    return [tkorders.tostring(order) for order in orders]
+
+
+def _previewed(orders, previews):
+    '''OrderResults of a basket's previews, raising if any was rejected.'''
+    results = [OrderResult(order=order, preview=response, response=None,
+                           preview_time=elapsed, submit_time=None,
+                           error=error)
+               for order, (response, elapsed, error) in zip(orders, previews)]
+
+    if any(result.error for result in results):
+        raise OrderError('Order preview rejected', results)
+
+    return results
+
+
+def _submitted(results, submits):
+    '''`results` with the basket's submits, raising if any was rejected.'''
+    results = [result._replace(response=response, submit_time=elapsed,
+                               error=error)
+               for result, (response, elapsed, error) in zip(results, submits)]
+
+    if any(result.error for result in results):
+        raise OrderError('Order rejected', results)
+
+    return results
+
+
 class Account(object):
     def __init__(self, api, account_id):
         self._api = api
         self.account_id = account_id
 
-    def _get(self, what=None, **kwargs):
-        params = [BASE_URL, 'accounts', self.account_id]
+    def _path(self, what=None):
+        params = [self._api.base_url, 'accounts', self.account_id]
 
         if what is not None:
             params.append(what)
 
-        path = self._api.join(params)
-        return self._api.get(path, **kwargs)
+        return self._api.join(params)
+
+    def _get(self, what=None, **kwargs):
+        return self._api.get(self._path(what), **kwargs)
+
+    def _post(self, what=None, **kwargs):
+        return self._api.post(self._path(what), **kwargs)
 
     def _balances(self, **kwargs):
         return self._get('balances', **kwargs)
@@ -141,6 +548,12 @@ class Account(object):
     def _holdings(self, **kwargs):
         return self._get('holdings', **kwargs)
 
+    def _order(self, order, preview=True, **kwargs):
+        what = 'orders/preview' if preview else 'orders'
+        headers = {'Content-Type': 'text/xml'}
+        return self._post(what, data=tkorders.tostring(order),
+                          headers=headers, **kwargs)
+
     def _orders(self, **kwargs):
         return self._get('orders', **kwargs)
 
@@ -153,14 +566,90 @@ class Account(object):
         r = self._history(date_range=date_range, transactions=transactions)
         return r['response']['transactions']['transaction']
 
+    def iter_history(self, transactions='all', since=None, ranges=None):
+        '''
+        Yield transactions dated `since` or later from the narrowest range
+            covering it.
+
+        See history.iter_transactions; history.HistorySync syncs
+            incrementally.
+        '''
+        return tkhistory.iter_transactions(self, transactions=transactions,
+                                           since=since, ranges=ranges)
+
     @property
     def holdings(self):
         r = self._holdings()
         return r['response']['accountholdings']['holding']
 
-    # TODO(jkoelker)
     def order(self, order, preview=True):
-        pass
+        '''
+        Preview or place `order`.
+
+        `order` is an element built by the `orders` module or its serialized
+            FIXML. returns the response, whose `error` is 'Success' unless
+            the order was rejected.
+        '''
+        r = self._order(order, preview=preview)
+        return r['response']
+
+    def _timed_order(self, order, preview):
+        start = time.perf_counter()
+
+        try:
+            response = self.order(order, preview=preview)
+        except Exception as e:
+            return None, time.perf_counter() - start, str(e)
+
+        elapsed = time.perf_counter() - start
+        return response, elapsed, _order_error(response)
+
+    def basket(self, orders, submit=True, max_workers=None):
+        '''
+        Preview a basket of orders concurrently, then place them.
+
+        `orders` is a list of order elements or serialized FIXML, or a table
+            of orders as accepted by `orders.serialize`. Previews run on at
+            most `max_workers` threads (the API's pool by default). The
+            first rejected preview cancels the previews not yet started and
+            nothing is placed. With `submit` False only the previews run.
+
+        returns a list of OrderResult in the order of `orders`, with the
+            preview and submit responses and latencies in seconds. Raises
+            OrderError, carrying the results, if any order was rejected.
+        '''
+        orders = _basket_orders(orders)
+        executor = self._api.executor
+
+        if max_workers is not None:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+
+        try:
+            results = _previewed(orders, self._run(executor, orders, True))
+
+            if not submit:
+                return results
+
+            submits = self._run(executor, orders, False, fail_fast=False)
+        finally:
+            if max_workers is not None:
+                executor.shutdown(wait=False)
+
+        return _submitted(results, submits)
+
+    def _run(self, executor, orders, preview, fail_fast=True):
+        futures = [executor.submit(self._timed_order, order, preview)
+                   for order in orders]
+
+        for future in concurrent.futures.as_completed(futures):
+            if fail_fast and future.result()[2] is not None:
+                for pending in futures:
+                    pending.cancel()
+                break
+
+        return [(None, None, 'Cancelled') if future.cancelled()
+                else future.result()
+                for future in futures]
 
     @property
     def orders(self):
@@ -173,7 +662,7 @@ class News(object):
         self._api = api
 
     def _article(self, article_id, **kwargs):
-        path = self._api.join(BASE_URL, 'market', 'news', article_id)
+        path = self._api.join(self._api.base_url, 'market', 'news', article_id)
         return self._api.get(path, **kwargs)
 
     def _search(self, keywords=None, symbols=None, maxhits=None,
@@ -207,7 +696,7 @@ class News(object):
             data['startdate'] = startdate
             data['enddate'] = enddate
 
-        path = self._api.join(BASE_URL, 'market', 'news', 'search')
+        path = self._api.join(self._api.base_url, 'market', 'news', 'search')
         return self._api.post(path, data=data, **kwargs)
 
     def article(self, article_id):
@@ -232,7 +721,8 @@ class Options(object):
 
     def _expirations(self, symbol, **kwargs):
         params = {'symbol': symbol}
-        path = self._api.join(BASE_URL, 'market', 'options', 'expirations')
+        path = self._api.join(self._api.base_url, 'market', 'options',
+                              'expirations')
         return self._api.get(path, params=params, **kwargs)
 
     def _search(self, symbol, query, fields=None, query_is_prepared=False,
@@ -245,26 +735,36 @@ class Options(object):
         if fields is not None:
             data['fids'] = ','.join(fields)
 
-        path = self._api.join(BASE_URL, 'market', 'options', 'search')
+        path = self._api.join(self._api.base_url, 'market', 'options',
+                              'search')
         return self._api.post(path, data=data, **kwargs)
 
     def _strikes(self, symbol, **kwargs):
         params = {'symbol': symbol}
-        path = self._api.join(BASE_URL, 'market', 'options', 'strikes')
+        path = self._api.join(self._api.base_url, 'market', 'options',
+                              'strikes')
         return self._api.get(path, params=params, **kwargs)
 
     def expirations(self, symbol):
-        r = self._expirations(symbol=symbol)
-        expirations = r['response']['expirationdates']['date']
+        def fetch():
+            r = self._expirations(symbol=symbol)
+            return r['response']['expirationdates']['date']
+
+        expirations = self._api.memoize('expirations', (symbol,), fetch)
         return pd.to_datetime(pd.Series(expirations))
 
     def search(self, symbol, query, fields=None):
-        r = self._search(symbol=symbol, query=query, fields=fields)
-        return _quotes_to_df(r['response']['quotes']['quote'])
+        quotes = self._search(symbol=symbol, query=query, fields=fields,
+                              decode=_quote_records(fields))
+        return self._api.timed('market/options/search', 'dataframe',
+                               _quotes_to_df, quotes)
 
     def strikes(self, symbol):
-        r = self._strikes(symbol=symbol)
-        strikes = r['response']['prices']['price']
+        def fetch():
+            r = self._strikes(symbol=symbol)
+            return r['response']['prices']['price']
+
+        strikes = self._api.memoize('strikes', (symbol,), fetch)
         return pd.Series(strikes, dtype=float)
 
     def quote(self, symbol, strikes=None, expirations=None, calls=True,
@@ -281,13 +781,27 @@ class Options(object):
 
 
 class Market(object):
-    def __init__(self, api):
+    def __init__(self, api, chunk_size=500, timesales_store=None,
+                 batch_window=0):
         self._api = api
+        self.chunk_size = chunk_size
+        self.timesales_store = timesales_store
+        self._batcher = flight.Batcher(self._batch_quotes,
+                                       functools.partial(_order, select=True),
+                                       batch_window)
         self.news = News(self._api)
         self.options = Options(self._api, self)
 
+    @property
+    def batch_window(self):
+        return self._batcher.window
+
+    @batch_window.setter
+    def batch_window(self, batch_window):
+        self._batcher.window = batch_window
+
     def _clock(self, **kwargs):
-        path = self._api.join(BASE_URL, 'market', 'clock')
+        path = self._api.join(self._api.base_url, 'market', 'clock')
         return self._api.get(path, **kwargs)
 
     def _quotes(self, symbols, fields=None, **kwargs):
@@ -299,48 +813,255 @@ class Market(object):
         if fields is not None:
             params['fids'] = ','.join(fields)
 
-        path = self._api.join(BASE_URL, 'market', 'ext', 'quotes')
+        path = self._api.join(self._api.base_url, 'market', 'ext', 'quotes')
         return self._api.post(path, data=params, **kwargs)
 
+    def _timesales(self, symbol, interval='5min', startdate=None,
+                   enddate=None, rpp=None, index=None, **kwargs):
+        params = {'symbols': symbol, 'interval': interval}
+
+        if startdate is not None:
+            params['startdate'] = startdate
+
+        if enddate is not None:
+            params['enddate'] = enddate
+
+        if rpp is not None:
+            params['rpp'] = rpp
+
+        if index is not None:
+            params['index'] = index
+
+        path = self._api.join(self._api.base_url, 'market', 'timesales')
+        return self._api.get(path, params=params, **kwargs)
+
+    def _timesales_day(self, symbol, interval, day, rpp=1000):
+        day = day.strftime('%Y-%m-%d')
+        quotes = []
+        index = 0
+
+        while True:
+            r = self._timesales(symbol, interval=interval, startdate=day,
+                                enddate=day, rpp=rpp, index=index)
+            page = _timesales_page(r)
+            quotes.extend(page)
+
+            if len(page) < rpp:
+                return timesales.to_array(quotes)
+
+            index = index + 1
+
     def _toplist(self, list_type='toppctgainers', **kwargs):
-        path = self._api.join(BASE_URL, 'market', 'toplists', list_type)
+        path = self._api.join(self._api.base_url, 'market', 'toplists',
+                              list_type)
         return self._api.get(path, **kwargs)
 
     @property
     def clock(self):
-        r = self._clock()
-        r = r['response']
-        del r['@id']
-        return r
-
-    def quotes(self, symbols, fields=None):
-        r = self._quotes(symbols=symbols, fields=fields)
-        return _quotes_to_df(r['response']['quotes']['quote'])
+        def fetch():
+            r = self._clock()
+            r = dict(r['response'])
+            del r['@id']
+            return r
+
+        return dict(self._api.memoize('clock', (), fetch))
+
+    def _quotes_df(self, symbols, fields=None):
+        quotes = self._quotes(symbols=symbols, fields=fields,
+                              decode=_quote_records(fields))
+        return self._api.timed('market/ext/quotes', 'dataframe',
+                               _quotes_to_df, quotes)
+
+    def quotes(self, symbols, fields=None, chunk_size=None):
+        '''
+        Quote `symbols`, returning a DataFrame indexed by symbol.
+
+        Symbol lists longer than `chunk_size` (defaulting to the Market's
+            `chunk_size`) are split into chunks that are requested
+            concurrently over the API's connection pool. The rows are
+            returned in the order of `symbols`.
+
+        With a `batch_window` (in seconds) on the Market, calls made within
+            the window of each other are merged into one request for the
+            union of their symbols and each caller gets its own rows back.
+        '''
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+
+        if self.batch_window and chunk_size is None:
+            # NOTE(jkoelker) The batch's rows are split between callers by
+            #                upper-cased symbol, so 'b' and 'B' from two
+            #                callers must be one key or both get two rows.
+            symbols = [symbol.strip().upper() for symbol in symbols]
+            group = tuple(fields) if fields is not None else None
+            return self._batcher.submit(symbols, group)
+
+        return self._quotes_chunked(symbols, fields=fields,
+                                    chunk_size=chunk_size)
+
+    def _batch_quotes(self, symbols, fields):
+        return self._quotes_chunked(symbols, fields=fields)
+
+    def _quotes_chunked(self, symbols, fields=None, chunk_size=None):
+        chunks = _chunks(symbols, chunk_size or self.chunk_size)
+
+        if len(chunks) <= 1:
+            return self._quotes_df(symbols=symbols, fields=fields)
+
+        frames = self._api.map(lambda chunk: self._quotes_df(chunk, fields),
+                               chunks)
+        return _merge_chunks(frames, symbols)
+
+    def stream(self, symbols, **kwargs):
+        '''
+        Subscribe to streaming quotes and trades for `symbols`.
+
+        returns a stream.QuoteStream, see it for the keyword arguments.
+        '''
+        return stream.QuoteStream(self._api, symbols, **kwargs)
+
+    def timesales(self, symbol, startdate, enddate=None, interval='5min',
+                  store=None):
+        '''
+        Intraday bars for `symbol` from `startdate` through `enddate`.
+
+        The range is split into one request per business day and the days
+            are fetched concurrently. With a timesales.Store (`store` or the
+            Market's `timesales_store`) only days missing from the store are
+            fetched, and every completed day is written back to it.
+
+        returns a DataFrame indexed by datetime. A single day read from the
+            store is a read-only view of its memory mapped file, so in place
+            writes raise; `copy()` it to modify it. Longer ranges copy their
+            days once into a new frame.
+        '''
+        if store is None:
+            store = self.timesales_store
+
+        days, bars = self._cached_bars(symbol, startdate, enddate, interval,
+                                       store)
+        missing = [day for day in days if day not in bars]
+        fetched = self._api.map(
+            lambda day: self._timesales_day(symbol, interval, day), missing)
+        return self._bars_frame(symbol, interval, days, bars,
+                                zip(missing, fetched), store)
+
+    def _cached_bars(self, symbol, startdate, enddate, interval, store):
+        '''The business days of a range and the bars `store` has of them.'''
+        if interval not in timesales.INTERVALS:
+            raise ValueError("interval not one of %s: %s" %
+                             (timesales.INTERVALS, interval))
+
+        days = pd.bdate_range(startdate, enddate or startdate)
+        bars = {}
+
+        if store is not None:
+            for day in days:
+                cached = store.read(symbol, interval, day)
+
+                if cached is not None:
+                    bars[day] = cached
+
+        return days, bars
+
+    def _bars_frame(self, symbol, interval, days, bars, fetched, store):
+        '''Store the `fetched` (day, bars) and frame every day's bars.'''
+        today = pd.Timestamp.now().normalize()
+
+        for day, day_bars in fetched:
+            # NOTE(jkoelker) Today's bars are still growing, never cache them
+            if store is not None and day < today:
+                store.write(symbol, interval, day, day_bars)
+
+            bars[day] = day_bars
+
+        if not bars:
+            return timesales.to_frame(np.empty(0, dtype=timesales.DTYPE))
+
+        # NOTE(jkoelker) A single day is framed straight from its memory map.
+        #                Days live in separate files, so a longer range is
+        #                one contiguous copy; the frame itself adds none.
+        if len(days) == 1:
+            return timesales.to_frame(bars[days[0]])
+
+        return timesales.to_frame(np.concatenate([bars[day]
+                                                  for day in days]))
 
     def toplist(self, list_type='toppctgainers'):
-        r = self._toplist(list_type=list_type)
-        return _quotes_to_df(r['response']['quotes']['quote'])
-
-    # TODO(jkoelker) market/timesales
-    # TODO(jkoelker) market/quotes (iterator)
+        quotes = self._toplist(list_type=list_type, decode=_quote_records())
+        return self._api.timed('market/toplists/%s' % list_type, 'dataframe',
+                               _quotes_to_df, quotes)
 
 
 class TradeKing(object):
     def __init__(self, consumer_key, consumer_secret,
-                 oauth_token, oauth_secret):
+                 oauth_token, oauth_secret, pool_size=10, chunk_size=500,
+                 base_url=BASE_URL, stream_url=stream.STREAM_URL,
+                 cache=None, scheduler=None, coalesce=True, batch_window=0,
+                 transport=None, metrics=tkmetrics.NOOP, decoder=None):
         self._api = API(consumer_key=consumer_key,
                         consumer_secret=consumer_secret,
                         oauth_token=oauth_token,
-                        oauth_secret=oauth_secret)
-        self.market = Market(self._api)
+                        oauth_secret=oauth_secret,
+                        pool_size=pool_size,
+                        base_url=base_url,
+                        stream_url=stream_url,
+                        cache=cache,
+                        scheduler=scheduler,
+                        coalesce=coalesce,
+                        transport=transport,
+                        metrics=metrics,
+                        decoder=decoder)
+        self.market = Market(self._api, chunk_size=chunk_size,
+                             batch_window=batch_window)
+        # NOTE(jkoelker) option.tradeking_premium's QuotePremium for each
+        #                price function, shared by every leg quoted with
+        #                this client.
+        self._premiums = {}
 
     def _accounts(self, **kwargs):
-        path = urllib.parse.urljoin(BASE_URL, 'accounts')
+        path = self._api.join(self._api.base_url, 'accounts')
         return self._api.get(path, **kwargs)
 
     def account(self, account_id):
         return Account(self._api, account_id)
 
+    @property
+    def accounts(self):
+        '''Ids of the accounts the OAuth token has access to.'''
+        r = self._accounts()
+        summaries = tksnapshot._records(r, 'accounts', 'accountsummary')
+        return [summary['account'] for summary in summaries]
+
+    def _account_list(self, account_ids):
+        if account_ids is None:
+            account_ids = self.accounts
+
+        return [self.account(account_id) for account_id in account_ids]
+
+    def snapshot(self, account_ids=None, resources=tksnapshot.RESOURCES):
+        '''
+        Balances, holdings and orders of many accounts at once.
+
+        Every account's resources are requested concurrently over the
+            connection pool. `account_ids` defaults to every account.
+
+        returns a snapshot.Snapshot of DataFrames stacked by account id.
+        '''
+        return tksnapshot.snapshot(self._api,
+                                   self._account_list(account_ids),
+                                   resources=resources)
+
+    def watch(self, account_ids=None,
+              holding_fields=tksnapshot.HOLDING_FIELDS):
+        '''
+        snapshot.SnapshotWatcher whose `poll` returns only the accounts
+            whose holdings or orders changed since the previous poll.
+        '''
+        return tksnapshot.SnapshotWatcher(self._api,
+                                          self._account_list(account_ids),
+                                          holding_fields=holding_fields)
+
     # TODO(jkoelker) member/profile
     # TODO(jkoelker) utility/status
     # TODO(jkoelker) utility/version
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from tradeking import option
+from tradeking import utils
+
+
+Result = collections.namedtuple('Result', ('payoffs', 'max_profit',
+                                           'max_loss', 'breakevens'))
+
+
+def _legs(strategy, underlying, expiration, legs):
+    '''Build the rows of one strategy from (long_short, call_put, strike).'''
+    symbols = [utils.option_symbol(underlying, expiration, call_put, strike)
+               for _long_short, call_put, strike in legs]
+    strategy = '%s %s' % (strategy, ','.join(symbols))
+
+    return [{'strategy': strategy, 'symbol': symbol,
+             'underlying': underlying, 'expiration': expiration,
+             'long_short': long_short, 'call_put': call_put,
+             'strike': strike}
+            for symbol, (long_short, call_put, strike) in zip(symbols, legs)]
+
+
+def _table(rows):
+    return pd.DataFrame.from_records(list(itertools.chain(*rows)),
+                                     columns=('strategy', 'symbol',
+                                              'underlying', 'expiration',
+                                              'long_short', 'call_put',
+                                              'strike'))
+
+
+def straddles(symbol, expirations, strikes, long_short=utils.LONG):
+    '''Leg table of a Straddle for every expiration and strike.'''
+    return _table(_legs('straddle', symbol, expiration,
+                        ((long_short, utils.PUT, strike),
+                         (long_short, utils.CALL, strike)))
+                  for expiration, strike in
+                  itertools.product(expirations, strikes))
+
+
+def strangles(symbol, expirations, put_strikes, call_strikes,
+              long_short=utils.LONG):
+    '''Leg table of a Strangle for every expiration and strike pair.'''
+    return _table(_legs('strangle', symbol, expiration,
+                        ((long_short, utils.PUT, put_strike),
+                         (long_short, utils.CALL, call_strike)))
+                  for expiration, put_strike, call_strike in
+                  itertools.product(expirations, put_strikes, call_strikes)
+                  if put_strike < call_strike)
+
+
+def collars(symbol, expirations, put_strikes, call_strikes):
+    '''Leg table of a Collar for every expiration and strike pair.'''
+    return _table(_legs('collar', symbol, expiration,
+                        ((utils.LONG, utils.PUT, put_strike),
+                         (utils.SHORT, utils.CALL, call_strike)))
+                  for expiration, put_strike, call_strike in
+                  itertools.product(expirations, put_strikes, call_strikes)
+                  if put_strike < call_strike)
+
+
+def _encode(values):
+    return utils.PriceArray.encode(values)
+
+
+def _breakevens(prices, payoffs, index):
+    signs = np.sign(payoffs)
+    left = signs[:, :-1]
+    right = signs[:, 1:]
+
+    # NOTE(jkoelker) Payoffs crossing zero between two prices are
+    #                interpolated, runs of zero payoff break even at each
+    #                end where the payoff leaves zero. A single zero price
+    #                is both ends and counted once.
+    rows, cols = np.nonzero(left * right < 0)
+    y0 = payoffs[rows, cols].astype(float)
+    y1 = payoffs[rows, cols + 1].astype(float)
+    x0 = prices[cols].astype(float)
+    x1 = prices[cols + 1].astype(float)
+    crossings = x0 + (x1 - x0) * y0 / (y0 - y1)
+
+    starts = (left != 0) & (right == 0)
+    ends = (left == 0) & (right != 0)
+    ends[:, 1:] &= ~starts[:, :-1]
+    start_rows, start_cols = np.nonzero(starts)
+    end_rows, end_cols = np.nonzero(ends)
+
+    rows = np.concatenate((rows, start_rows, end_rows))
+    points = np.concatenate((crossings,
+                             prices[start_cols + 1].astype(float),
+                             prices[end_cols].astype(float)))
+    order = np.lexsort((points, rows))
+    rows = rows[order]
+    points = points[order]
+
+    splits = np.searchsorted(rows, np.arange(1, len(index)))
+    return pd.Series([tuple(p) for p in np.split(points, splits)],
+                     index=index, dtype=object)
+
+
+def evaluate(legs, prices=None, price_range=20, tick_size=0.01,
+             include_cost=True, include_premium=True,
+             cost_func=option.tradeking_cost):
+    '''
+    Evaluate the expiry payoff of many strategies at once.
+
+    `legs` is a DataFrame with one row per leg and the columns `strategy`,
+        `long_short`, `call_put` and `strike` (see `straddles`, `strangles`
+        and `collars`). Optional columns are `quantity` (defaults to 1) and
+        `premium`, the per leg premium as a float as returned by
+        `option.bid_ask_avg` (defaults to 0).
+
+    `prices` is the decimal shifted int price grid to evaluate on. If it is
+        not given the grid spans every strike +/- `price_range` in steps of
+        `tick_size`, as `Leg` does.
+
+    Payoffs include cost and premium like `option.plot` does unless
+        `include_cost` or `include_premium` are False.
+
+    returns a Result of the (strategy x price) payoffs DataFrame and the
+        max_profit, max_loss and breakevens Series, all indexed by strategy
+        and in decimal shifted units.
+    '''
+    codes, index = pd.factorize(legs['strategy'])
+
+    if not len(index):
+        empty = pd.Series([], index=index, dtype=np.int64)
+        return Result(payoffs=pd.DataFrame(index=index), max_profit=empty,
+                      max_loss=empty, breakevens=empty.astype(object))
+
+    strikes = _encode(legs['strike'])
+    puts = (legs['call_put'].str.upper() == utils.PUT).to_numpy()
+
+    signs = np.where(legs['long_short'].str.upper() == utils.SHORT, -1, 1)
+    if 'quantity' in legs:
+        signs = signs * legs['quantity'].to_numpy(dtype=np.int64)
+
+    if prices is None:
+        price_range = utils.Price(price_range)
+        prices = np.arange(strikes.min() - price_range,
+                           strikes.max() + price_range + 1,
+                           utils.Price(tick_size), dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.int64)
+
+    # NOTE(jkoelker) A strategy has at most one leg in each slot so every
+    #                slot can be accumulated with a single fancy index.
+    slots = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+    payoffs = np.zeros((len(index), len(prices)), dtype=np.int64)
+
+    for slot in range(slots.max() + 1 if len(slots) else 0):
+        mask = slots == slot
+        strike = strikes[mask, np.newaxis]
+        intrinsic = np.where(puts[mask, np.newaxis],
+                             strike - prices, prices - strike)
+        np.maximum(intrinsic, 0, out=intrinsic)
+        intrinsic *= signs[mask, np.newaxis]
+        payoffs[codes[mask]] += intrinsic
+
+    if include_cost:
+        num_legs = np.bincount(codes, minlength=len(index))
+        costs = {n: int(cost_func(n)) for n in np.unique(num_legs)}
+        payoffs -= np.array([costs[n] for n in num_legs],
+                            dtype=np.int64)[:, np.newaxis]
+
+    if include_premium and 'premium' in legs:
+        # NOTE(jkoelker) Summed in place so premiums never go through float.
+        premiums = np.zeros(len(index), dtype=np.int64)
+        np.add.at(premiums, codes, _encode(legs['premium']) * signs)
+        payoffs -= premiums[:, np.newaxis]
+
+    return Result(payoffs=pd.DataFrame(payoffs, index=index, columns=prices),
+                  max_profit=pd.Series(payoffs.max(axis=1), index=index),
+                  max_loss=pd.Series(payoffs.min(axis=1), index=index),
+                  breakevens=_breakevens(prices, payoffs, index))
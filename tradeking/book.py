@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import threading
+
+import numpy as np
+import pandas as pd
+
+from tradeking import api
+
+
+FIELDS = ('bid', 'ask', 'bidsz', 'asksz', 'last', 'vl', 'timestamp')
+
+
+class QuoteBook(object):
+    '''
+    Latest quote values for a set of symbols kept in columnar arrays.
+
+    Every field is a preallocated float64 array with one row per symbol.
+        Updates write into the arrays in place and flag the rows they touch;
+        `changed` returns (and clears) only those rows while `snapshot`
+        returns every row. Neither is built until it is asked for.
+
+    Updates are accepted as the quote dicts of a `market/ext/quotes`
+        response, stream.Quote/stream.Trade records or a DataFrame as
+        returned by `Market.quotes`. Missing and NaN values never overwrite
+        what is already in the book.
+
+        book = QuoteBook(fields=('bid', 'ask', 'last'))
+        stream = tkapi.market.stream(symbols)
+        stream.start(callback=book.update)
+        ...
+        moved = book.changed()
+    '''
+    def __init__(self, symbols=(), fields=FIELDS, capacity=1024):
+        self.fields = tuple(fields)
+        self._rows = {}
+        self._symbols = []
+        self._columns = dict((field, np.full(capacity, np.nan))
+                             for field in self.fields)
+        self._changed = np.zeros(capacity, dtype=bool)
+        self._lock = threading.RLock()
+
+        self.add(symbols)
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __contains__(self, symbol):
+        return symbol in self._rows
+
+    @property
+    def capacity(self):
+        return len(self._changed)
+
+    def _grow(self, size):
+        capacity = self.capacity
+
+        while capacity < size:
+            capacity = capacity * 2
+
+        for field, column in self._columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[:len(column)] = column
+            self._columns[field] = grown
+
+        changed = np.zeros(capacity, dtype=bool)
+        changed[:len(self._changed)] = self._changed
+        self._changed = changed
+
+    def _row(self, symbol):
+        row = self._rows.get(symbol)
+
+        if row is None:
+            row = self._rows[symbol] = len(self._symbols)
+            self._symbols.append(symbol)
+
+            if row >= self.capacity:
+                self._grow(row + 1)
+
+        return row
+
+    def add(self, symbols):
+        '''Reserve rows for `symbols` without marking them changed.'''
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+
+        with self._lock:
+            for symbol in symbols:
+                self._row(symbol)
+
+    def _write(self, field, rows, values):
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        rows = rows[valid]
+
+        self._columns[field][rows] = values[valid]
+        self._changed[rows] = True
+
+    def _update_frame(self, df):
+        rows = np.array([self._row(symbol) for symbol in df.index],
+                        dtype=np.intp)
+
+        for field in df.columns.intersection(self.fields):
+            self._write(field, rows,
+                        pd.to_numeric(df[field], errors='coerce'))
+
+    def _update_records(self, records):
+        # NOTE(jkoelker) Keep only the last value per symbol and field so a
+        #                batch with repeated symbols applies in order.
+        latest = dict((field, {}) for field in self.fields)
+
+        for record in records:
+            if isinstance(record, dict):
+                get = record.get
+            else:
+                get = functools.partial(getattr, record)
+
+            row = self._row(get('symbol'))
+
+            for field, values in latest.items():
+                value = get(field, None)
+
+                if value is not None:
+                    values[row] = value
+
+        for field, values in latest.items():
+            if not values:
+                continue
+
+            rows = np.fromiter(values.keys(), dtype=np.intp,
+                               count=len(values))
+            self._write(field, rows,
+                        api._to_numeric(list(values.values()), np.float64))
+
+    def update(self, records):
+        '''Apply quote updates in place, flagging the updated symbols.'''
+        with self._lock:
+            if isinstance(records, pd.DataFrame):
+                self._update_frame(records)
+                return
+
+            if isinstance(records, dict) or hasattr(records, '_fields'):
+                records = [records]
+
+            self._update_records(records)
+
+    def poll(self, market, symbols=None, chunk_size=None):
+        '''
+        Update the book from `market/ext/quotes` for `symbols`.
+
+        The raw quote dicts are applied directly, without building the
+            DataFrame `Market.quotes` would. `symbols` defaults to every
+            symbol in the book.
+        '''
+        if symbols is None:
+            symbols = list(self._symbols)
+
+        chunks = api._chunks(symbols, chunk_size or market.chunk_size)
+
+        def fetch(chunk):
+            return market._quotes(symbols=chunk, fields=self.fields,
+                                  decode=api._quote_records(self.fields))
+
+        for quotes in market._api.map(fetch, chunks):
+            self.update(quotes)
+
+    def view(self, field):
+        '''Read-only view of `field` in row order, without copying.'''
+        with self._lock:
+            column = self._columns[field][:len(self._symbols)]
+            column.flags.writeable = False
+            return column
+
+    def _frame(self, rows):
+        index = pd.Index([self._symbols[row] for row in rows],
+                         name='symbol')
+        return pd.DataFrame(dict((field, self._columns[field][rows])
+                                 for field in self.fields), index=index)
+
+    def snapshot(self):
+        '''Copy of every row as a DataFrame indexed by symbol.'''
+        with self._lock:
+            return self._frame(np.arange(len(self._symbols)))
+
+    def changed(self, clear=True):
+        '''Copy of the rows updated since the last call as a DataFrame.'''
+        with self._lock:
+            rows = np.flatnonzero(self._changed[:len(self._symbols)])
+
+            if clear:
+                self._changed[rows] = False
+
+            return self._frame(rows)
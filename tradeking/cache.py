@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+
+# NOTE(jkoelker) Seconds each endpoint's results stay fresh. The option chain
+#                skeleton changes at most daily, the clock every second.
+TTLS = {'strikes': 3600,
+        'expirations': 3600,
+        'clock': 5}
+
+_MISSING = object()
+
+
+def _normalize(key):
+    # NOTE(jkoelker) Symbols are case-insensitive, 'ibm' and 'IBM' share an
+    #                entry.
+    return tuple(part.upper() if isinstance(part, str) else part
+                 for part in key)
+
+
+class Cache(object):
+    '''
+    Base for the metadata caches used by `API.memoize`.
+
+    Keys are tuples whose first item is the endpoint name, e.g.
+        ('strikes', 'IBM'); `memoize` and `invalidate` upper-case the string
+        parts after the endpoint, so symbols match in any case. `ttls`
+        overrides the per endpoint TTLs in TTLS; endpoints missing from both
+        use `default_ttl`.
+    '''
+    def __init__(self, ttls=None, default_ttl=300):
+        self.ttls = dict(TTLS)
+        self.ttls.update(ttls or {})
+        self.default_ttl = default_ttl
+
+    def get(self, key, default=None):
+        raise NotImplementedError()
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError()
+
+    def invalidate(self, *prefix):
+        '''Drop every key starting with `prefix`, or everything if empty.'''
+        raise NotImplementedError()
+
+    def memoize(self, endpoint, key, func):
+        key = (endpoint,) + _normalize(key)
+        value = self.get(key, _MISSING)
+
+        if value is _MISSING:
+            value = func()
+            self.set(key, value, ttl=self.ttls.get(endpoint,
+                                                   self.default_ttl))
+
+        return value
+
+    async def amemoize(self, endpoint, key, func):
+        '''`memoize` for a coroutine function `func`.'''
+        key = (endpoint,) + _normalize(key)
+        value = self.get(key, _MISSING)
+
+        if value is _MISSING:
+            value = await func()
+            self.set(key, value, ttl=self.ttls.get(endpoint,
+                                                   self.default_ttl))
+
+        return value
+
+
+class MemoryCache(Cache):
+    '''In process LRU cache of at most `maxsize` entries.'''
+    def __init__(self, maxsize=1024, ttls=None, default_ttl=300,
+                 clock=time.monotonic):
+        super(MemoryCache, self).__init__(ttls=ttls, default_ttl=default_ttl)
+        self.maxsize = maxsize
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._entries[key]
+            except KeyError:
+                return default
+
+            if expires is not None and self._clock() >= expires:
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = None
+
+        if ttl:
+            expires = self._clock() + ttl
+
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *prefix):
+        prefix = prefix[:1] + _normalize(prefix[1:])
+
+        with self._lock:
+            if not prefix:
+                self._entries.clear()
+                return
+
+            for key in [key for key in self._entries
+                        if key[:len(prefix)] == prefix]:
+                del self._entries[key]
+
+
+class DiskCache(Cache):
+    '''
+    SQLite backed cache shared by every process using the same `path`.
+
+    Values are pickled, expiry uses wall clock time and the least recently
+        used entries beyond `maxsize` are evicted on write.
+    '''
+    def __init__(self, path, maxsize=100000, ttls=None, default_ttl=300):
+        super(DiskCache, self).__init__(ttls=ttls, default_ttl=default_ttl)
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS cache ('
+                             'key TEXT PRIMARY KEY, value BLOB, '
+                             'expires REAL, accessed REAL)')
+
+    @property
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=30)
+
+        return db
+
+    @staticmethod
+    def _key(key):
+        return '\x1f'.join(str(part) for part in key)
+
+    def get(self, key, default=None):
+        now = time.time()
+
+        with self._db as db:
+            row = db.execute('SELECT value, expires FROM cache WHERE key = ?',
+                             (self._key(key),)).fetchone()
+
+            if row is None:
+                return default
+
+            value, expires = row
+
+            if expires is not None and now >= expires:
+                db.execute('DELETE FROM cache WHERE key = ?',
+                           (self._key(key),))
+                return default
+
+            db.execute('UPDATE cache SET accessed = ? WHERE key = ?',
+                       (now, self._key(key)))
+
+        return pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires = None
+
+        if ttl:
+            expires = now + ttl
+
+        with self._db as db:
+            db.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                       (self._key(key), pickle.dumps(value), expires, now))
+            db.execute('DELETE FROM cache WHERE key IN (SELECT key FROM '
+                       'cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                       (self.maxsize,))
+
+    def invalidate(self, *prefix):
+        with self._db as db:
+            if not prefix:
+                db.execute('DELETE FROM cache')
+                return
+
+            prefix = self._key(prefix[:1] + _normalize(prefix[1:]))
+            db.execute('DELETE FROM cache WHERE key = ? OR '
+                       'substr(key, 1, ?) = ?',
+                       (prefix, len(prefix) + 1, prefix + '\x1f'))
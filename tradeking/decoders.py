@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+'''
+JSON decoders for API responses.
+
+A decoder has `loads(content)`, decoding a whole response body, and
+    `extract(content, path, fields=None)`, returning only the subtree at
+    `path` (a tuple of keys) and, when `fields` is given, only those keys of
+    each record in it. Endpoint methods ask for what they use with an
+    Extract passed as the request's `decode`:
+
+    r = tkapi._api.get(url, decode=decoders.Extract(('response', 'quotes',
+                                                     'quote')))
+
+`default` is `orjson` when it is installed (`pip install
+    tradeking[orjson]`) and `json`, the standard library, otherwise.
+    `simdjson` (pysimdjson, `tradeking[simdjson]`) parses lazily so
+    `extract` with `fields` only builds Python objects for those. That only
+    pays off on large responses made without `fids`, it is slower than
+    `json` at everything else, so it is never picked by default.
+
+An Extract whose path is missing from the response raises MissingPath,
+    with the API's error message when the response carries one.
+'''
+
+import collections
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:  # pragma: no cover
+    simdjson = None
+
+
+Extract = collections.namedtuple('Extract', ('path', 'fields'))
+Extract.__new__.__defaults__ = (None,)
+
+
+class MissingPath(KeyError):
+    def __init__(self, path, error=None):
+        super(MissingPath, self).__init__(path, error)
+        self.path = path
+        self.error = error
+
+    def __str__(self):
+        message = 'Response has no %s' % '/'.join(self.path)
+
+        if self.error:
+            message = '%s: %s' % (message, self.error)
+
+        return message
+
+
+def _select(records, fields):
+    if fields is None or records is None:
+        return records
+
+    if isinstance(records, dict):
+        return _select([records], fields)[0]
+
+    # NOTE(jkoelker) Records of a request made with `fids` usually hold
+    #                nothing else already, keep those as they are.
+    wanted = frozenset(fields)
+    return [record if wanted.issuperset(record)
+            else dict((k, record[k]) for k in fields if k in record)
+            for record in records]
+
+
+def _walk(document, path):
+    for key in path:
+        if not isinstance(document, dict):
+            return None
+
+        document = document.get(key)
+
+    return document
+
+
+class JSONDecoder(object):
+    '''The standard library decoder.'''
+    name = 'json'
+
+    def loads(self, content):
+        return json.loads(content)
+
+    def extract(self, content, path, fields=None):
+        return _select(_walk(self.loads(content), path), fields)
+
+
+class OrjsonDecoder(JSONDecoder):
+    name = 'orjson'
+
+    def loads(self, content):
+        return orjson.loads(content)
+
+
+def _pointer(path):
+    return ''.join('/' + key.replace('~', '~0').replace('/', '~1')
+                   for key in path)
+
+
+class SimdjsonDecoder(JSONDecoder):
+    '''
+    pysimdjson decoder. `extract` converts only the records (and fields) at
+        `path` into Python objects.
+    '''
+    name = 'simdjson'
+
+    def __init__(self):
+        # NOTE(jkoelker) A parser's documents are only valid until it parses
+        #                the next one, so every thread gets its own.
+        self._local = threading.local()
+
+    @property
+    def _parser(self):
+        parser = getattr(self._local, 'parser', None)
+
+        if parser is None:
+            parser = self._local.parser = simdjson.Parser()
+
+        return parser
+
+    def loads(self, content):
+        return simdjson.loads(content)
+
+    def extract(self, content, path, fields=None):
+        document = self._parser.parse(content)
+
+        try:
+            node = document.at_pointer(_pointer(path))
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+
+        if isinstance(node, simdjson.Object):
+            if fields is None:
+                return node.as_dict()
+
+            return dict((k, _value(node[k])) for k in fields if k in node)
+
+        if isinstance(node, simdjson.Array):
+            if fields is None:
+                return node.as_list()
+
+            return [_select_node(record, fields) for record in node]
+
+        return node
+
+
+def _value(node):
+    if isinstance(node, simdjson.Object):
+        return node.as_dict()
+
+    if isinstance(node, simdjson.Array):
+        return node.as_list()
+
+    return node
+
+
+def _select_node(node, fields):
+    if not isinstance(node, simdjson.Object):
+        return _value(node)
+
+    return dict((k, _value(node[k])) for k in fields if k in node)
+
+
+DECODERS = collections.OrderedDict()
+
+if orjson is not None:
+    DECODERS[OrjsonDecoder.name] = OrjsonDecoder
+
+DECODERS[JSONDecoder.name] = JSONDecoder
+
+if simdjson is not None:
+    DECODERS[SimdjsonDecoder.name] = SimdjsonDecoder
+
+
+def get(name=None):
+    '''
+    A decoder by `name` ('orjson', 'json' or 'simdjson'), or the default
+        when `name` is None.
+    '''
+    if name is None:
+        name = next(iter(DECODERS))
+
+    if name not in DECODERS:
+        raise ValueError("decoder not one of %s: %s" % (tuple(DECODERS),
+                                                        name))
+
+    return DECODERS[name]()
+
+
+def default():
+    return get()
+
+
+def _error(decoder, content):
+    '''The error message of an API error response, if it is one.'''
+    try:
+        response = decoder.loads(content).get('response')
+    except (AttributeError, ValueError):
+        return None
+
+    if isinstance(response, dict):
+        return response.get('error')
+
+    return None
+
+
+def decode(decoder, content, how=True):
+    '''Decode `content` as `how` asks: True for all of it or an Extract.'''
+    if not isinstance(how, Extract):
+        return decoder.loads(content)
+
+    extracted = decoder.extract(content, how.path, how.fields)
+
+    if extracted is None:
+        raise MissingPath(how.path, _error(decoder, content))
+
+    return extracted
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import concurrent.futures
+import threading
+import time
+
+
+class SingleFlight(object):
+    '''
+    Share one call between every caller asking for the same key at once.
+
+    The first caller for a key runs the call; callers arriving while it is
+        in flight wait for and receive the same result (or exception). Pass
+        `copy` to give each waiting caller `copy(result)` instead, so no
+        caller sees another's changes to a mutable result.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, copy=None):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+
+            if leader:
+                future = self._calls[key] = concurrent.futures.Future()
+
+        if not leader:
+            result = future.result()
+
+            if copy is not None:
+                result = copy(result)
+
+            return result
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+        return result
+
+
+class _Batch(object):
+    def __init__(self):
+        self.keys = {}
+        self.future = concurrent.futures.Future()
+
+
+class Batcher(object):
+    '''
+    Merge calls made within `window` seconds of each other into one.
+
+    `fetch(keys, group)` is called once per window with the union of the
+        keys every caller in the same `group` asked for, and
+        `split(result, keys)` picks each caller's share out of the result.
+    '''
+    def __init__(self, fetch, split, window):
+        self._fetch = fetch
+        self._split = split
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def submit(self, keys, group=None):
+        with self._lock:
+            batch = self._pending.get(group)
+            leader = batch is None
+
+            if leader:
+                batch = self._pending[group] = _Batch()
+
+            batch.keys.update(dict.fromkeys(keys))
+
+        if leader:
+            time.sleep(self.window)
+
+            with self._lock:
+                del self._pending[group]
+
+            try:
+                batch.future.set_result(self._fetch(list(batch.keys),
+                                                    group))
+            except BaseException as e:
+                batch.future.set_exception(e)
+
+        return self._split(batch.future.result(), keys)
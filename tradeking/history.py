@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import hashlib
+import itertools
+import json
+import os
+
+import pandas as pd
+
+
+TODAY = 'today'
+CURRENT_WEEK = 'current_week'
+CURRENT_MONTH = 'current_month'
+LAST_MONTH = 'last_month'
+ALL = 'all'
+
+# NOTE(jkoelker) Narrowest first; each range contains the ones before it.
+#                LAST_MONTH is left out, it may be the previous calendar
+#                month alone and so not contain CURRENT_MONTH.
+RANGES = (TODAY, CURRENT_WEEK, CURRENT_MONTH, ALL)
+
+_FLOAT_KEYS = ('amount', 'transaction.commission', 'transaction.fee',
+               'transaction.price', 'transaction.quantity',
+               'transaction.secfee')
+_DATE_KEYS = ('date', 'transaction.settlementdate', 'transaction.tradedate')
+
+
+def _transactions(response):
+    transactions = (response['response'].get('transactions') or {})
+    transactions = transactions.get('transaction') or []
+
+    if isinstance(transactions, dict):
+        transactions = [transactions]
+
+    return transactions
+
+
+def _date(transaction):
+    return pd.Timestamp(transaction['date']).date()
+
+
+def keys(transactions):
+    '''
+    Stable keys identifying each transaction across history responses.
+
+    Identical transactions are told apart by how many times the same
+        transaction was seen before it in the response.
+    '''
+    counts = {}
+
+    for transaction in transactions:
+        digest = hashlib.sha1(json.dumps(transaction, sort_keys=True)
+                              .encode('utf-8')).hexdigest()
+        counts[digest] = counts.get(digest, -1) + 1
+        yield '%s-%d' % (digest, counts[digest])
+
+
+def covering_range(since, today=None):
+    '''The narrowest history range including every day from `since` on.'''
+    today = today or datetime.date.today()
+
+    if since >= today:
+        return TODAY
+
+    if since >= today - datetime.timedelta(days=today.weekday()):
+        return CURRENT_WEEK
+
+    if since >= today.replace(day=1):
+        return CURRENT_MONTH
+
+    return ALL
+
+
+def iter_transactions(account, transactions='all', since=None, ranges=None,
+                      today=None):
+    '''
+    Yield an account's transactions dated `since` or later (every one when
+        `since` is None).
+
+    Only the narrowest range covering `since` is requested, one request as
+        large as it needs to be. With `ranges` (a subset of RANGES) the
+        narrower of them are requested first, each only once the previous
+        one is consumed, so a consumer stopping early never downloads the
+        wider ranges; one reading everything downloads the narrower ranges
+        again inside the wider ones. Each transaction is yielded once.
+    '''
+    seen = set()
+
+    for date_range in _plan(since, ranges, today):
+        r = account._history(date_range=date_range,
+                             transactions=transactions)
+
+        for transaction in _unseen(r, seen, since):
+            yield transaction
+
+
+def _plan(since, ranges, today):
+    '''The ranges iter_transactions requests, in order.'''
+    needed = ALL if since is None else covering_range(since, today=today)
+    order = RANGES.index(needed)
+    return [date_range for date_range in (ranges or ())
+            if RANGES.index(date_range) < order] + [needed]
+
+
+def _unseen(response, seen, since):
+    page = _transactions(response)
+
+    for key, transaction in zip(keys(page), page):
+        if key in seen:
+            continue
+
+        seen.add(key)
+
+        if since is None or _date(transaction) >= since:
+            yield transaction
+
+
+def to_frame(transactions):
+    '''Typed DataFrame of transactions with nested fields flattened.'''
+    df = pd.json_normalize(list(transactions))
+
+    for col in df.columns.intersection(_FLOAT_KEYS):
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    for col in df.columns.intersection(_DATE_KEYS):
+        df[col] = pd.to_datetime(df[col], errors='coerce', utc=True)
+
+    return df
+
+
+class HistorySync(object):
+    '''
+    Incrementally sync an account's history.
+
+    The date of the newest transaction seen and the keys of the
+        transactions on that date are kept in the JSON file `state_path`, so
+        each `sync` only requests the narrowest range covering that date and
+        returns just the new transactions. With `log_path` new transactions
+        are also appended to that file, one JSON object per line.
+
+    New transactions are yielded oldest first, a date at a time. The state
+        is saved and the log appended once per date, after its transactions
+        are yielded or when the consumer stops early, and covers only the
+        transactions yielded, so the next sync picks up at the next one and
+        the log never gets a transaction twice.
+    '''
+    def __init__(self, account, state_path, log_path=None,
+                 transactions='all'):
+        self.account = account
+        self.state_path = state_path
+        self.log_path = log_path
+        self.transactions = transactions
+
+    def _load(self):
+        if not os.path.exists(self.state_path):
+            return None, set()
+
+        with open(self.state_path) as f:
+            state = json.load(f)
+
+        since = datetime.date.fromisoformat(state['date'])
+        return since, set(state['keys'])
+
+    def _save(self, since, seen):
+        tmp = '%s.tmp' % self.state_path
+
+        with open(tmp, 'w') as f:
+            json.dump({'date': since.isoformat(), 'keys': sorted(seen)}, f)
+
+        os.replace(tmp, self.state_path)
+
+    def _log(self, transactions):
+        with open(self.log_path, 'a') as f:
+            f.writelines('%s\n' % json.dumps(transaction, sort_keys=True)
+                         for transaction in transactions)
+
+    def _commit(self, since, seen, done):
+        if not done:
+            return
+
+        if self.log_path is not None:
+            self._log(transaction for key, transaction in done)
+
+        seen.update(key for key, transaction in done)
+        self._save(since, seen)
+
+    def iter_new(self):
+        '''Yield the transactions not returned by a previous sync.'''
+        since, seen = self._load()
+        date_range = ALL if since is None else covering_range(since)
+
+        r = self.account._history(date_range=date_range,
+                                  transactions=self.transactions)
+        page = _transactions(r)
+        new = []
+
+        for key, transaction in zip(keys(page), page):
+            date = _date(transaction)
+
+            if since is not None and (date < since or
+                                      (date == since and key in seen)):
+                continue
+
+            new.append((date, key, transaction))
+
+        # NOTE(jkoelker) Oldest first so the saved date never passes a
+        #                transaction that has not been yielded yet.
+        new.sort(key=lambda item: item[0])
+
+        for date, batch in itertools.groupby(new, key=lambda item: item[0]):
+            if since is None or date > since:
+                since, seen = date, set()
+
+            done = []
+
+            # NOTE(jkoelker) A transaction counts as done once handed to the
+            #                consumer; closing the generator at the yield
+            #                still commits it.
+            try:
+                for _, key, transaction in batch:
+                    done.append((key, transaction))
+                    yield transaction
+            finally:
+                self._commit(since, seen, done)
+
+    def sync(self):
+        '''Fetch new transactions, returning them as a typed DataFrame.'''
+        return to_frame(self.iter_new())
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+'''
+Request metrics.
+
+API reports every request it sends to its `metrics` as a Sample with the
+    time spent in each stage, labeled by endpoint:
+
+    queue     waiting on the scheduler (including retry backoff)
+    sign      OAuth signing
+    network   sending the request and reading the response
+    decode    JSON decoding
+    total     all of the above
+
+and, through `observe`, the time spent building DataFrames from responses
+    (stage `dataframe`).
+
+The default, NOOP, is disabled and the API skips all timing for it.
+    Histograms keeps in-process histograms that can be read with `summary`
+    or scraped in the Prometheus text format with `exposition`.
+
+    histograms = metrics.Histograms()
+    tkapi = TradeKing(..., metrics=histograms)
+    ...
+    histograms.summary()
+'''
+
+import bisect
+import collections
+import re
+import threading
+
+import pandas as pd
+
+
+STAGES = ('queue', 'sign', 'network', 'decode', 'total')
+
+# NOTE(jkoelker) Seconds, from 100us to a minute.
+TIME_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# NOTE(jkoelker) Bytes, from 256B to 64MB.
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(10))
+
+Sample = collections.namedtuple('Sample', ('endpoint', 'method', 'status',
+                                           'timings', 'request_bytes',
+                                           'response_bytes'))
+
+# NOTE(jkoelker) Account and news article ids would give every account and
+#                article its own label; collapse them into one.
+_IDS = re.compile(r'(?<=accounts/)[^/]+|(?<=market/news/)(?!search$)[^/]+')
+
+
+def endpoint(url, base_url):
+    '''
+    The label of `url`: its path under `base_url` without the format, with
+        account and news article ids replaced by `{id}`.
+    '''
+    if url.startswith(base_url):
+        url = url[len(base_url):]
+
+    path = url.split('?')[0].strip('/').rsplit('.', 1)[0]
+    return _IDS.sub('{id}', path)
+
+
+class Metrics(object):
+    '''No-op metrics; subclass and set `enabled` to collect.'''
+    enabled = False
+
+    def record(self, sample):
+        '''Record the Sample of one request.'''
+
+    def observe(self, endpoint, stage, seconds):
+        '''Record the time spent in `stage` outside a request.'''
+
+
+NOOP = Metrics()
+
+
+class Histogram(object):
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count = self.count + 1
+        self.sum = self.sum + value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        '''Upper bound of the bucket holding the `q` quantile.'''
+        if not self.count:
+            return float('nan')
+
+        rank = q * self.count
+        seen = 0
+
+        for bound, count in zip(self.buckets, self.counts):
+            seen = seen + count
+
+            if seen >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+
+class Histograms(Metrics):
+    '''
+    In-process histograms of stage timings and payload sizes per endpoint,
+        and counts of status codes.
+    '''
+    enabled = True
+
+    def __init__(self, time_buckets=TIME_BUCKETS, size_buckets=SIZE_BUCKETS):
+        self.time_buckets = tuple(time_buckets)
+        self.size_buckets = tuple(size_buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.timings = {}
+            self.sizes = {}
+            self.statuses = collections.Counter()
+
+    def _histogram(self, histograms, key, buckets):
+        histogram = histograms.get(key)
+
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+
+        return histogram
+
+    def record(self, sample):
+        with self._lock:
+            for stage, seconds in sample.timings.items():
+                self._histogram(self.timings, (sample.endpoint, stage),
+                                self.time_buckets).observe(seconds)
+
+            for direction, size in (('request', sample.request_bytes),
+                                    ('response', sample.response_bytes)):
+                if size is not None:
+                    self._histogram(self.sizes,
+                                    (sample.endpoint, direction),
+                                    self.size_buckets).observe(size)
+
+            self.statuses[(sample.endpoint, sample.status)] += 1
+
+    def observe(self, endpoint, stage, seconds):
+        with self._lock:
+            self._histogram(self.timings, (endpoint, stage),
+                            self.time_buckets).observe(seconds)
+
+    def summary(self):
+        '''
+        DataFrame of count, mean, p50, p90, p99 and max seconds indexed by
+            endpoint and stage.
+        '''
+        with self._lock:
+            rows = [(endpoint, stage, h.count, h.sum / h.count,
+                     h.quantile(0.5), h.quantile(0.9), h.quantile(0.99),
+                     h.max)
+                    for (endpoint, stage), h in sorted(self.timings.items())]
+
+        df = pd.DataFrame(rows, columns=('endpoint', 'stage', 'count', 'mean',
+                                         'p50', 'p90', 'p99', 'max'))
+        return df.set_index(['endpoint', 'stage'])
+
+    def _exposition(self, name, histograms, labels):
+        lines = ['# TYPE %s histogram' % name]
+
+        for key, h in sorted(histograms.items()):
+            label = ','.join('%s="%s"' % pair for pair in zip(labels, key))
+            seen = 0
+
+            for bound, count in zip(h.buckets, h.counts):
+                seen = seen + count
+                lines.append('%s_bucket{%s,le="%g"} %d' % (name, label,
+                                                           bound, seen))
+
+            lines.append('%s_bucket{%s,le="+Inf"} %d' % (name, label,
+                                                         h.count))
+            lines.append('%s_sum{%s} %r' % (name, label, h.sum))
+            lines.append('%s_count{%s} %d' % (name, label, h.count))
+
+        return lines
+
+    def exposition(self):
+        '''The histograms and counters in the Prometheus text format.'''
+        with self._lock:
+            lines = self._exposition('tradeking_request_seconds',
+                                     self.timings, ('endpoint', 'stage'))
+            lines.extend(self._exposition('tradeking_payload_bytes',
+                                          self.sizes,
+                                          ('endpoint', 'direction')))
+            lines.append('# TYPE tradeking_responses_total counter')
+            lines.extend('tradeking_responses_total{endpoint="%s",'
+                         'status="%s"} %d' % (endpoint, status, count)
+                         for (endpoint, status), count
+                         in sorted(self.statuses.items(), key=str))
+
+        return '\n'.join(lines) + '\n'
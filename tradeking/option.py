@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 
+import functools
 import logging
+import threading
+import time
 
+import numpy as np
 import pandas as pd
 
 from tradeking import api
@@ -12,8 +16,19 @@ LOG = logging.getLogger(__name__)
 
 
 def bid_ask_avg(symbol, quotes):
-    mean = quotes[['bid', 'ask']].T.mean()
-    return utils.Price(mean[symbol])
+    # NOTE(jkoelker) Only average the symbol's own row, `quotes` may be a
+    #                snapshot of every symbol in a batch.
+    return utils.Price(quotes.loc[symbol, ['bid', 'ask']].mean())
+
+
+def _bid_ask_avgs(symbols, quotes):
+    return quotes.loc[symbols, ['bid', 'ask']].mean(axis=1).to_numpy()
+
+
+# NOTE(jkoelker) A price function with a `batch(symbols, quotes)` attribute,
+#                returning float prices, prices many symbols at once. See
+#                QuotePremium.premiums.
+bid_ask_avg.batch = _bid_ask_avgs
 
 
 def tradeking_cost(num_legs, *args, **kwargs):
@@ -22,7 +37,147 @@ def tradeking_cost(num_legs, *args, **kwargs):
     return base_fee + per_leg * num_legs
 
 
+class QuotePremium(object):
+    '''
+    Premium provider sharing one quote snapshot between many legs.
+
+    Legs register their symbols when they are built. The first premium
+        asked for quotes every registered symbol not already in the
+        snapshot with one `market.quotes` call (chunked by the Market as
+        usual), so building hundreds of strategies costs a few requests
+        instead of one per leg. Symbols are only pending until they are
+        quoted; after `ttl` seconds the snapshot expires and the next fetch
+        quotes just the symbols asked for and any registered since.
+
+        premium = QuotePremium(tkapi)
+        strategies = [option.Straddle(symbol, premium_func=premium)
+                      for symbol in symbols]
+        premiums = [s.premium for s in strategies]
+    '''
+    def __init__(self, tkapi, price_func=bid_ask_avg, ttl=5,
+                 clock=time.monotonic):
+        self._tkapi = tkapi
+        self._price_func = price_func
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._pending = {}
+        self._quotes = None
+        self._expires = None
+
+    def register(self, *symbols):
+        '''Add `symbols` to the next batch.'''
+        with self._lock:
+            self._pending.update(dict.fromkeys(symbols))
+
+    def _snapshot(self):
+        if self._expires is not None and self._clock() >= self._expires:
+            self._quotes = None
+            self._expires = None
+
+        return self._quotes
+
+    def fetch(self, *symbols):
+        '''Quote pending symbols and `symbols` missing from the snapshot.'''
+        self.register(*symbols)
+
+        # NOTE(jkoelker) Fetches are serialized so concurrent callers wait
+        #                for one batch instead of each sending their own, but
+        #                the request is made without holding `_lock` so
+        #                premiums already in the snapshot are not blocked.
+        with self._fetch_lock:
+            with self._lock:
+                quotes = self._snapshot()
+                missing = [symbol for symbol in self._pending
+                           if quotes is None or symbol not in quotes.index]
+
+            if not missing:
+                return quotes
+
+            fetched = self._tkapi.market.quotes(missing)
+
+            with self._lock:
+                # NOTE(jkoelker) Symbols the API has no quote for are
+                #                dropped too, asking again will not help.
+                for symbol in missing:
+                    self._pending.pop(symbol, None)
+
+                quotes = self._snapshot()
+
+                if quotes is None:
+                    self._expires = self._clock() + self.ttl
+                    quotes = fetched
+                else:
+                    quotes = pd.concat((quotes, fetched))
+
+                self._quotes = quotes
+                return quotes
+
+    def premiums(self, symbols):
+        '''
+        Premiums of `symbols` from one snapshot, as a utils.PriceArray.
+
+        Raises KeyError for symbols without a quote and ValueError for
+            quotes without a price, rather than returning a bogus premium.
+        '''
+        symbols = list(symbols)
+        quotes = self.fetch(*symbols)
+        missing = [symbol for symbol in symbols
+                   if symbol not in quotes.index]
+
+        if missing:
+            raise KeyError('No quotes for %s' % ', '.join(missing))
+
+        batch = getattr(self._price_func, 'batch', None)
+
+        if batch is None:
+            return utils.PriceArray(np.fromiter(
+                (self._price_func(symbol, quotes) for symbol in symbols),
+                dtype=np.int64, count=len(symbols)))
+
+        # NOTE(jkoelker) Encoding a NaN price silently gives INT64_MIN.
+        prices = np.asarray(batch(symbols, quotes), dtype=np.float64)
+        unpriced = np.isnan(prices)
+
+        if unpriced.any():
+            raise ValueError('No price for %s' % ', '.join(
+                symbol for symbol, nan in zip(symbols, unpriced) if nan))
+
+        return utils.PriceArray.encode(prices)
+
+    def __call__(self, symbol, *args, **kwargs):
+        with self._lock:
+            quotes = self._snapshot()
+
+        if quotes is None or symbol not in quotes.index:
+            quotes = self.fetch(symbol)
+
+        return self._price_func(symbol, quotes)
+
+
+_PREMIUMS_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def _token_client(consumer_key, consumer_secret, oauth_token, oauth_secret):
+    # NOTE(jkoelker) One client per set of tokens, so legs built from tokens
+    #                share its QuotePremium and are quoted in one batch.
+    return api.TradeKing(consumer_key=consumer_key,
+                         consumer_secret=consumer_secret,
+                         oauth_token=oauth_token,
+                         oauth_secret=oauth_secret)
+
+
 def tradeking_premium(tkapi=None, price_func=bid_ask_avg, **kwargs):
+    '''
+    A QuotePremium for `tkapi`, or for a TradeKing built from the OAuth
+        tokens in `kwargs`.
+
+    The provider for a TradeKing instance is kept on it, so every leg built
+        with the same `tkapi` is quoted in the same batch and the provider
+        lives exactly as long as the client.
+    '''
     if tkapi is None:
         consumer_key = kwargs.get('consumer_key')
         consumer_secret = kwargs.get('consumer_secret')
@@ -37,18 +192,36 @@ def tradeking_premium(tkapi=None, price_func=bid_ask_avg, **kwargs):
 
             return zero
 
-        tkapi = api.TradeKing(consumer_key=consumer_key,
-                              consumer_secret=consumer_secret,
-                              oauth_token=oauth_token,
-                              oauth_secret=oauth_secret)
+        tkapi = _token_client(consumer_key, consumer_secret, oauth_token,
+                              oauth_secret)
+
+    premiums = getattr(tkapi, '_premiums', None)
+
+    if premiums is None:
+        return QuotePremium(tkapi, price_func=price_func)
 
-    def premium(symbol, *args, **kwargs):
-        quotes = tkapi.market.quotes(symbol)
-        return price_func(symbol, quotes)
+    with _PREMIUMS_LOCK:
+        premium = premiums.get(price_func)
+
+        if premium is None:
+            premium = premiums[price_func] = QuotePremium(
+                tkapi, price_func=price_func)
 
     return premium
 
 
+def _shared_premium(leg_kwargs):
+    '''
+    `leg_kwargs` with one premium_func for every leg of a strategy, so legs
+        built from tokens rather than a `tkapi` still share a batch.
+    '''
+    if leg_kwargs.get('premium_func') is None:
+        leg_kwargs = dict(leg_kwargs)
+        leg_kwargs['premium_func'] = tradeking_premium(**leg_kwargs)
+
+    return leg_kwargs
+
+
 class Leg(object):
     def __init__(self, symbol, long_short=utils.LONG, expiration=None,
                  call_put=None, strike=None, price_range=20, tick_size=0.01,
@@ -68,6 +241,9 @@ class Leg(object):
 
         self._symbol = utils.option_symbol(symbol, expiration, call_put,
                                            strike)
+
+        if hasattr(premium_func, 'register'):
+            premium_func.register(self._symbol)
         self._underlying = symbol
         self._expiration = expiration
         self._call_put = call_put.upper()
@@ -82,9 +258,6 @@ class Leg(object):
             self._payoff_func = lambda x: max(x - self._strike, 0)
 
     def reset_start_stop(self, start, stop):
-        if hasattr(self, '_cache') and 'payoffs' in self._cache:
-            del self._cache['payoffs']
-
         self._start = start
         self._stop = stop
 
@@ -117,18 +290,35 @@ class Leg(object):
 
         return payoff
 
-    @utils.cached_property()
-    def payoffs(self):
-        prices = pd.Series(range(self._start, self._stop, self._tick_size))
+    def _prices(self):
+        return utils.PriceArray(np.arange(self._start, self._stop,
+                                          self._tick_size, dtype=np.int64))
+
+    def _payoffs(self, prices):
+        '''
+        Evaluate the payoff for the leg over an array of prices at once.
+
+        `prices` is an array of decimal shifted ints as in `payoff`. Returns
+            a utils.PriceArray of the same shape.
+        '''
+        strike = int(self._strike)
 
-        payoffs = prices.apply(self._payoff_func)
-        payoffs.index = prices
+        if self._call_put == utils.PUT:
+            payoffs = np.maximum(strike - prices, 0)
+        else:
+            payoffs = np.maximum(prices - strike, 0)
 
         if self._long_short == utils.SHORT:
-            payoffs = payoffs * -1
-        return payoffs
+            payoffs = -payoffs
 
-    @utils.cached_property()
+        return payoffs.view(utils.PriceArray)
+
+    @utils.cached_property(ttl=0, depends=('_start', '_stop', '_tick_size'))
+    def payoffs(self):
+        prices = self._prices()
+        return pd.Series(self._payoffs(prices), index=prices)
+
+    @utils.cached_property(ttl=0)
     def cost(self):
         return self._cost_func(1)
 
@@ -159,13 +349,15 @@ class MultiLeg(object):
             an option symbol then either **leg_kwargs or the leg_kwargs to
             MultiLeg is used to construct the Leg, preferring **leg_kwargs.
         '''
-        if not isinstance(leg, Leg):
+        if not isinstance(leg, (Leg, LegView)):
             if not leg_kwargs:
-                leg_kwargs = self.__leg_kwargs
+                leg_kwargs = self.__leg_kwargs = _shared_premium(
+                    self.__leg_kwargs)
 
             leg = Leg(leg, **leg_kwargs)
 
         self._legs.append(leg)
+        utils.invalidate(self, 'payoffs', 'cost', 'premium')
 
     def payoff(self, price):
         '''
@@ -191,19 +383,28 @@ class MultiLeg(object):
         '''
         return sum([leg.payoff(price)for leg in self._legs])
 
-    @utils.cached_property()
-    def payoffs(self):
+    def _prices(self):
         start = min([leg._start for leg in self._legs])
         stop = max([leg._stop for leg in self._legs])
+        tick_size = min([leg._tick_size for leg in self._legs])
+        return utils.PriceArray(np.arange(start, stop, tick_size,
+                                          dtype=np.int64))
 
-        for leg in self._legs:
-            leg.reset_start_stop(start, stop)
+    def _payoffs(self, prices):
+        payoffs = utils.PriceArray(np.zeros(len(prices), dtype=np.int64))
 
-        payoffs = pd.Series()
         for leg in self._legs:
-            payoffs = payoffs.add(leg.payoffs, fill_value=0)
+            payoffs += leg._payoffs(prices)
+
         return payoffs
 
+    @utils.cached_property()
+    def payoffs(self):
+        # NOTE(jkoelker) Every leg is evaluated on the same grid so the sum
+        #                needs no index alignment.
+        prices = self._prices()
+        return pd.Series(self._payoffs(prices), index=prices)
+
     @utils.cached_property()
     def cost(self):
         return self._cost_func(len(self._legs))
@@ -213,6 +414,253 @@ class MultiLeg(object):
         return sum([leg.premium for leg in self._legs])
 
 
+class LegView(object):
+    '''
+    A leg of a LegStore with the Leg API.
+
+    Views hold only their store and row, every attribute is read from the
+        store's columns and nothing is cached on the view.
+    '''
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    def __repr__(self):
+        return '<LegView %s %s>' % (self._long_short, self._symbol)
+
+    @property
+    def _symbol(self):
+        return utils.option_symbol(self._underlying, self._expiration,
+                                   self._call_put,
+                                   utils.Price.decode(self._strike))
+
+    @property
+    def _underlying(self):
+        store = self._store
+        return store.underlyings[store.underlying_codes[self._row]]
+
+    @property
+    def _expiration(self):
+        return pd.Timestamp(self._store.expirations[self._row])
+
+    @property
+    def _call_put(self):
+        return utils.PUT if self._store.puts[self._row] else utils.CALL
+
+    @property
+    def _long_short(self):
+        return utils.SHORT if self._store.sides[self._row] < 0 else utils.LONG
+
+    @property
+    def _strike(self):
+        return int(self._store.strikes[self._row])
+
+    @property
+    def _start(self):
+        return self._strike - self._store.price_range
+
+    @property
+    def _stop(self):
+        return self._strike + self._store.price_range + 1
+
+    @property
+    def _tick_size(self):
+        return self._store.tick_size
+
+    def payoff(self, price):
+        '''Evaluate the payoff for the leg at price, see Leg.payoff.'''
+        store = self._store
+        strike = self._strike
+
+        if store.puts[self._row]:
+            payoff = max(strike - price, 0)
+        else:
+            payoff = max(price - strike, 0)
+
+        return payoff * int(store.sides[self._row])
+
+    def _prices(self):
+        return utils.PriceArray(np.arange(self._start, self._stop,
+                                          self._tick_size, dtype=np.int64))
+
+    def _payoffs(self, prices):
+        return self._store._payoffs(prices, rows=[self._row])[0]
+
+    @property
+    def payoffs(self):
+        prices = self._prices()
+        return pd.Series(self._payoffs(prices), index=prices)
+
+    @property
+    def cost(self):
+        return self._store.cost_func(1)
+
+    @property
+    def premium(self):
+        return self._store.premiums()[self._row]
+
+
+class LegStore(object):
+    '''
+    Many option legs kept as a structure of arrays.
+
+    Each leg costs a few dozen bytes across the columns `underlying_codes`
+        (into `underlyings`), `expirations` (datetime64), `puts` (bool),
+        `sides` (+1 long, -1 short), `strikes` (decimal shifted int64) and,
+        once fetched, `premiums`. Indexing returns a LegView with the Leg
+        API, created only when asked for; whole store operations such as
+        `payoffs` work on the columns directly.
+
+    `price_range`, `tick_size`, `cost_func` and `premium_func` are shared by
+        every leg. A `premium_func` with a `premiums(symbols)` method (a
+        QuotePremium) prices every leg in one batch.
+
+        store = LegStore.from_symbols(symbols, premium_func=premium)
+        store[10].premium
+        store.payoffs(prices)
+    '''
+    def __init__(self, underlyings, expirations, call_puts, strikes,
+                 long_shorts=utils.LONG, price_range=20, tick_size=0.01,
+                 cost_func=tradeking_cost, premium_func=None, **kwargs):
+        if premium_func is None:
+            premium_func = tradeking_premium(**kwargs)
+
+        codes, self.underlyings = pd.factorize(
+            pd.Series(np.asarray(underlyings, dtype=object)).str.upper())
+        size = len(codes)
+
+        self.underlying_codes = codes.astype(np.int32)
+        self.underlyings = list(self.underlyings)
+        self.expirations = np.asarray(pd.to_datetime(expirations),
+                                      dtype='datetime64[D]')
+        self.puts = (pd.Series(np.asarray(call_puts, dtype=object))
+                     .str.upper().to_numpy() == utils.PUT)
+        self.strikes = np.asarray(strikes, dtype=np.int64)
+        self.sides = np.where(np.broadcast_to(
+            np.asarray(long_shorts, dtype=object), (size,)) == utils.SHORT,
+            -1, 1).astype(np.int8)
+
+        self.price_range = utils.Price(price_range)
+        self.tick_size = utils.Price(tick_size)
+        self.cost_func = cost_func
+        self.premium_func = premium_func
+        self._premiums = None
+
+    @classmethod
+    def from_symbols(cls, symbols, long_shorts=utils.LONG, **kwargs):
+        '''Build a store from option symbols, see LegStore for kwargs.'''
+        parsed = utils.parse_option_symbols(symbols)
+        return cls(parsed['underlying'], parsed['expiration'],
+                   parsed['call_put'], parsed['strike'],
+                   long_shorts=long_shorts, **kwargs)
+
+    @classmethod
+    def from_frame(cls, legs, **kwargs):
+        '''
+        Build a store from a leg table as built by the batch module, with
+            the columns underlying, expiration, long_short, call_put and
+            strike (as a float).
+        '''
+        return cls(legs['underlying'], legs['expiration'], legs['call_put'],
+                   utils.Price.encode(legs['strike'].to_numpy(dtype=float)),
+                   long_shorts=legs['long_short'].to_numpy(), **kwargs)
+
+    def __len__(self):
+        return len(self.strikes)
+
+    def __getitem__(self, row):
+        if row < 0:
+            row = row + len(self)
+
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+
+        return LegView(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield LegView(self, row)
+
+    @property
+    def nbytes(self):
+        '''Bytes held by the store's columns.'''
+        columns = (self.underlying_codes, self.expirations, self.puts,
+                   self.strikes, self.sides)
+
+        if self._premiums is not None:
+            columns = columns + (self._premiums,)
+
+        return sum(column.nbytes for column in columns)
+
+    def symbols(self):
+        '''Option symbols of every leg.'''
+        underlyings = np.asarray(self.underlyings,
+                                 dtype=object)[self.underlying_codes]
+        expirations = pd.to_datetime(self.expirations).strftime('%y%m%d')
+        call_puts = np.where(self.puts, utils.PUT, utils.CALL)
+        strikes = np.char.zfill(self.strikes.astype(str), 8)
+        return (underlyings + np.asarray(expirations, dtype=object) +
+                call_puts.astype(object) + strikes.astype(object)).tolist()
+
+    def to_frame(self):
+        return pd.DataFrame({
+            'symbol': self.symbols(),
+            'underlying': np.asarray(self.underlyings,
+                                     dtype=object)[self.underlying_codes],
+            'expiration': self.expirations,
+            'long_short': np.where(self.sides < 0, utils.SHORT, utils.LONG),
+            'call_put': np.where(self.puts, utils.PUT, utils.CALL),
+            'strike': utils.Price.decode(self.strikes),
+        })
+
+    def _payoffs(self, prices, rows=None):
+        strikes = self.strikes
+        puts = self.puts
+        sides = self.sides
+
+        if rows is not None:
+            strikes = strikes[rows]
+            puts = puts[rows]
+            sides = sides[rows]
+
+        prices = np.asarray(prices, dtype=np.int64)
+        strikes = strikes[:, np.newaxis]
+        payoffs = np.where(puts[:, np.newaxis], strikes - prices,
+                           prices - strikes)
+        np.maximum(payoffs, 0, out=payoffs)
+        payoffs *= sides[:, np.newaxis]
+        return payoffs.view(utils.PriceArray)
+
+    def payoffs(self, prices):
+        '''
+        Payoff of every leg over `prices` (decimal shifted ints).
+
+        returns a utils.PriceArray of shape (legs, prices).
+        '''
+        return self._payoffs(prices)
+
+    def premiums(self):
+        '''
+        Signed premium of every leg as a utils.PriceArray, quoting every
+            symbol in one batch with the store's `premium_func` on first use.
+        '''
+        if self._premiums is None:
+            symbols = self.symbols()
+            func = self.premium_func
+
+            if hasattr(func, 'premiums'):
+                premiums = func.premiums(symbols)
+            else:
+                premiums = np.fromiter((func(symbol) for symbol in symbols),
+                                       dtype=np.int64, count=len(symbols))
+
+            self._premiums = utils.PriceArray(premiums * self.sides)
+
+        return self._premiums
+
+
 def _leg(symbol, long_short, call_put, expiration=None, strike=None,
          **leg_kwargs):
 
@@ -226,6 +674,8 @@ def _leg(symbol, long_short, call_put, expiration=None, strike=None,
 
 def Call(symbol, long_short=utils.LONG, expiration=None, strike=None,
          **leg_kwargs):
+    leg_kwargs = _shared_premium(leg_kwargs)
+
     # NOTE(jkoelker) Ignore anything that was parsed, this is a Call
     call_put = utils.CALL
     return MultiLeg(_leg(symbol, long_short, call_put, expiration=expiration,
@@ -234,6 +684,8 @@ def Call(symbol, long_short=utils.LONG, expiration=None, strike=None,
 
 def Put(symbol, long_short=utils.LONG, expiration=None, strike=None,
         **leg_kwargs):
+    leg_kwargs = _shared_premium(leg_kwargs)
+
     # NOTE(jkoelker) Ignore anything that was parsed, this is a Put
     call_put = utils.PUT
     return MultiLeg(_leg(symbol, long_short, call_put, expiration=expiration,
@@ -242,6 +694,8 @@ def Put(symbol, long_short=utils.LONG, expiration=None, strike=None,
 
 def Straddle(symbol, long_short=utils.LONG, expiration=None, strike=None,
              **leg_kwargs):
+    leg_kwargs = _shared_premium(leg_kwargs)
+
     put = _leg(symbol, long_short=long_short, call_put=utils.PUT,
                expiration=expiration, strike=strike, **leg_kwargs)
     call = _leg(symbol, long_short=long_short, call_put=utils.CALL,
@@ -251,6 +705,8 @@ def Straddle(symbol, long_short=utils.LONG, expiration=None, strike=None,
 
 def Strangle(symbol, call_strike, put_strike, long_short=utils.LONG,
              expiration=None,  **leg_kwargs):
+    leg_kwargs = _shared_premium(leg_kwargs)
+
     if not expiration:
         (symbol, expiration,
          _call_put, _strike) = utils.parse_option_symbol(symbol)
@@ -263,6 +719,7 @@ def Strangle(symbol, call_strike, put_strike, long_short=utils.LONG,
 
 
 def Collar(symbol, put_strike, call_strike, expiration=None, **leg_kwargs):
+    leg_kwargs = _shared_premium(leg_kwargs)
 
     if not expiration:
         (symbol, expiration,
@@ -279,7 +736,6 @@ def Collar(symbol, put_strike, call_strike, expiration=None, **leg_kwargs):
 def plot(option, ypad=5, ylim=None, include_cost=True, include_premium=True,
          **kwargs):
     payoffs = option.payoffs
-    index = [utils.Price.decode(i) for i in payoffs.index]
 
     if include_cost:
         payoffs = payoffs - option.cost
@@ -287,13 +743,13 @@ def plot(option, ypad=5, ylim=None, include_cost=True, include_premium=True,
     if include_premium:
         payoffs = payoffs - option.premium
 
-    payoffs = pd.Series([utils.Price.decode(i) for i in payoffs],
-                        index=index)
+    payoffs = pd.Series(utils.Price.decode(payoffs.to_numpy()),
+                        index=utils.Price.decode(payoffs.index.to_numpy()))
 
     if ylim is None:
         ylim = (payoffs.min() - ypad, payoffs.max() + ypad)
 
-    return pd.tools.plotting.plot_series(payoffs, ylim=ylim, **kwargs)
+    return payoffs.plot(ylim=ylim, **kwargs)
 
 
 Leg.plot = plot
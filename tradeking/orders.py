@@ -3,6 +3,9 @@
 import functools
 
 from lxml import etree
+import pandas as pd
+
+from tradeking import utils
 
 
 BUY_TO_COVER = '5'
@@ -33,12 +36,37 @@ TRAILING_STOP = 'P'
 PRICE = '0'
 BASIS = '1'
 
+NAMESPACE = 'http://www.fixprotocol.org/FIXML-5-0-SP2'
+
+_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;',
+                          '"': '&quot;', '\n': '&#10;', '\r': '&#13;',
+                          '\t': '&#9;'})
+
+# NOTE(jkoelker) The templates produce exactly what etree.tostring does for
+#                the elements built below, attribute order included.
+_ORDER = ('<FIXML xmlns="%s"><Order TmInForce="{time_in_force}" '
+          'Typ="{order_type}" Side="{side}" Acct="{account}"{exec_inst}>'
+          '{peg_instruction}<Instrmt SecTyp="{security_type}" '
+          'Sym="{security}"/><OrdQty Qty="{quantity}"/></Order></FIXML>'
+          % NAMESPACE)
+_EXEC_INST = ' ExecInst="a"'
+_PEG_INSTRUCTION = ('<PegInstr OfstTyp="{trailing_stop_offset_type}" '
+                    'PegPxType="{trailing_stop_peg_type}" '
+                    'OfstVal="{trailing_stop_offset}"/>')
+_MULTILEG = ('<FIXML xmlns="%s"><NewOrdMleg TmInForce="{time_in_force}"'
+             '{price} OrdTyp="{order_type}" Acct="{account}">{legs}'
+             '</NewOrdMleg></FIXML>' % NAMESPACE)
+_MULTILEG_PRICE = ' Px="{price}"'
+_MULTILEG_LEG = ('<Ord OrdQty="{quantity}" PosEfct="{position_effect}">'
+                 '<Leg Side="{side}" Strk="{strike}" Mat="{maturity}" '
+                 'MMY="{month_year}" SecTyp="%s" CFI="{cfi}" '
+                 'Sym="{underlying}"/></Ord>' % OPTION)
+
 
 def Order(account, security_type, security, quantity, time_in_force=GTC,
           order_type=MARKET, side=BUY, trailing_stop_offset=None,
           trailing_stop_offset_type=PRICE, trailing_stop_peg_type='1'):
-    fixml = etree.Element("FIXML",
-                          xmlns="http://www.fixprotocol.org/FIXML-5-0-SP2")
+    fixml = etree.Element("FIXML", xmlns=NAMESPACE)
     order = etree.Element("Order",
                           TmInForce=str(time_in_force),
                           Typ=str(order_type),
@@ -53,7 +81,7 @@ def Order(account, security_type, security, quantity, time_in_force=GTC,
                                    Qty=str(quantity))
 
     if trailing_stop_offset is not None:
-        order.set('ExecInst' 'a')
+        order.set('ExecInst', 'a')
         peg_instruction = etree.Element('PegInstr',
                                         OfstTyp=str(trailing_stop_offset_type),
                                         PegPxType=str(trailing_stop_peg_type),
@@ -68,10 +96,175 @@ def Order(account, security_type, security, quantity, time_in_force=GTC,
     return fixml
 
 
+def _format_price(price):
+    return ('%.4f' % float(price)).rstrip('0').rstrip('.')
+
+
+@functools.lru_cache(maxsize=4096)
+def _option_leg(symbol, side=BUY, quantity=1, position_effect=OPEN):
+    (underlying, expiration,
+     call_put, strike) = utils.parse_option_symbol(symbol)
+
+    return {'side': str(side),
+            'quantity': str(quantity),
+            'position_effect': str(position_effect),
+            'strike': _format_price(strike),
+            'maturity': expiration.strftime('%Y-%m-%dT00:00:00.000-05:00'),
+            'month_year': expiration.strftime('%Y%m'),
+            'cfi': OPTION_CALL if call_put == utils.CALL else OPTION_PUT,
+            'underlying': underlying}
+
+
+def _legs(legs):
+    return [_option_leg(**leg) if isinstance(leg, dict) else _option_leg(*leg)
+            for leg in legs]
+
+
+def MultiLegOrder(account, legs, price=None, time_in_force=DAY,
+                  order_type=LIMIT):
+    '''
+    Build a multileg option order.
+
+    `legs` is a list of (symbol, side, quantity, position_effect) tuples or
+        dicts with those keys, `symbol` being an option symbol. `price` is
+        the net price of the spread, negative for a credit.
+    '''
+    fixml = etree.Element("FIXML", xmlns=NAMESPACE)
+    order = etree.Element("NewOrdMleg", TmInForce=str(time_in_force))
+
+    if price is not None:
+        order.set('Px', '%.2f' % price)
+
+    order.set('OrdTyp', str(order_type))
+    order.set('Acct', str(account))
+
+    for leg in _legs(legs):
+        ord_ = etree.Element("Ord",
+                             OrdQty=leg['quantity'],
+                             PosEfct=leg['position_effect'])
+        ord_.append(etree.Element("Leg",
+                                  Side=leg['side'],
+                                  Strk=leg['strike'],
+                                  Mat=leg['maturity'],
+                                  MMY=leg['month_year'],
+                                  SecTyp=OPTION,
+                                  CFI=leg['cfi'],
+                                  Sym=leg['underlying']))
+        order.append(ord_)
+
+    fixml.append(order)
+
+    return fixml
+
+
 Buy = functools.partial(Order, side=BUY)
 Sell = functools.partial(Order, side=SELL)
 Short = functools.partial(Order, side=SELL_SHORT)
 
+
+def tostring(fixml):
+    '''Serialize an order element, passing serialized orders through.'''
+    if isinstance(fixml, bytes):
+        return fixml
+
+    return etree.tostring(fixml)
+
+
+def _quote(value):
+    return str(value).translate(_ESCAPES)
+
+
+def _serialize_order(account, security_type, security, quantity,
+                     time_in_force=GTC, order_type=MARKET, side=BUY,
+                     trailing_stop_offset=None,
+                     trailing_stop_offset_type=PRICE,
+                     trailing_stop_peg_type='1'):
+    exec_inst = peg_instruction = ''
+
+    if trailing_stop_offset is not None:
+        exec_inst = _EXEC_INST
+        peg_instruction = _PEG_INSTRUCTION.format(
+            trailing_stop_offset_type=_quote(trailing_stop_offset_type),
+            trailing_stop_peg_type=_quote(trailing_stop_peg_type),
+            trailing_stop_offset=_quote(trailing_stop_offset))
+
+    return _ORDER.format(time_in_force=_quote(time_in_force),
+                         order_type=_quote(order_type),
+                         side=_quote(side),
+                         account=_quote(account),
+                         exec_inst=exec_inst,
+                         peg_instruction=peg_instruction,
+                         security_type=_quote(security_type),
+                         security=_quote(security),
+                         quantity=_quote(quantity))
+
+
+def _serialize_multileg(account, legs, price=None, time_in_force=DAY,
+                        order_type=LIMIT):
+    legs = ''.join(_MULTILEG_LEG.format(**dict((key, _quote(value))
+                                               for key, value in leg.items()))
+                   for leg in _legs(legs))
+
+    if price is not None:
+        price = _MULTILEG_PRICE.format(price='%.2f' % price)
+
+    return _MULTILEG.format(time_in_force=_quote(time_in_force),
+                            price=price or '',
+                            order_type=_quote(order_type),
+                            account=_quote(account),
+                            legs=legs)
+
+
+def _missing(value):
+    if value is None or isinstance(value, str):
+        return value is None
+
+    # NOTE(jkoelker) Only scalars are null checked, `legs` is a list.
+    return pd.api.types.is_scalar(value) and bool(pd.isna(value))
+
+
+def _integral(value):
+    # NOTE(jkoelker) A column with nulls, e.g. the `quantity` of multileg
+    #                rows, is upcast to float by pandas. Its whole numbers
+    #                are written as the ints they were given as.
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+
+    return value
+
+
+def serialize(orders):
+    '''
+    Serialize many orders to FIXML from precompiled templates.
+
+    `orders` is a DataFrame with one row per order or an iterable of dicts,
+        using the keyword arguments of `Order` or, for rows with `legs`, of
+        `MultiLegOrder`. Missing or null values take the same defaults and
+        whole numbers in a DataFrame's float columns are written as ints.
+
+    returns a list of bytes, each identical to `etree.tostring` of the
+        element `Order`/`MultiLegOrder` would build.
+    '''
+    frame = hasattr(orders, 'to_dict')
+
+    if frame:
+        orders = orders.to_dict('records')
+
+    serialized = []
+
+    for order in orders:
+        order = dict((key, _integral(value) if frame else value)
+                     for key, value in order.items() if not _missing(value))
+
+        if 'legs' in order:
+            fixml = _serialize_multileg(**order)
+        else:
+            fixml = _serialize_order(**order)
+
+        serialized.append(fixml.encode('ascii', 'xmlcharrefreplace'))
+
+    return serialized
+
 #<FIXML xmlns="http://www.fixprotocol.org/FIXML-5-0-SP2">
 #  <Order TmInForce="0" Typ="1" Side="1" Acct="12345678">
 #    <Instrmt SecTyp="CS" Sym="F"/>
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+'''
+Vectorized option pricing, Greeks and implied volatility.
+
+Every function takes scalars or arrays (broadcast together) so whole option
+    chains are priced at once. `T` is in years, `r` the continuously
+    compounded risk free rate, `q` the continuous dividend yield and `sigma`
+    the annualized volatility. `call_put` is utils.CALL/utils.PUT (or the
+    'call'/'put' of a quote's `put_call`), an array of them or a boolean
+    array that is True for calls.
+
+European options are priced with Black-Scholes-Merton and American options
+    with the Bjerksund-Stensland (1993) approximation.
+'''
+
+import numpy as np
+import pandas as pd
+
+from tradeking import utils
+
+try:
+    from scipy.special import ndtr as _ndtr
+except ImportError:  # pragma: no cover
+    _ndtr = None
+
+
+EUROPEAN = 'european'
+AMERICAN = 'american'
+
+GREEKS = ('delta', 'gamma', 'theta', 'vega', 'rho')
+
+# NOTE(jkoelker) Options expire at the close, 16:00 New York.
+MARKET_TZ = 'America/New_York'
+MARKET_CLOSE = pd.Timedelta(hours=16)
+
+NEWTON = 'newton'
+BISECTION = 'bisection'
+
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 5.0
+
+_SQRT_2PI = np.sqrt(2 * np.pi)
+
+# NOTE(jkoelker) Abramowitz and Stegun 7.1.26, |error| < 1.5e-7.
+_ERF_P = 0.3275911
+_ERF_A = (0.254829592, -0.284496736, 1.421413741, -1.453152027,
+          1.061405429)
+
+
+def norm_cdf(x):
+    '''Standard normal CDF, scipy's ndtr when installed.'''
+    x = np.asarray(x, dtype=np.float64)
+
+    if _ndtr is not None:
+        return _ndtr(x)
+
+    z = np.abs(x) / np.sqrt(2)
+    t = 1 / (1 + _ERF_P * z)
+    poly = t * (_ERF_A[0] + t * (_ERF_A[1] + t * (_ERF_A[2] + t *
+                                                   (_ERF_A[3] +
+                                                    t * _ERF_A[4]))))
+    erfc = poly * np.exp(-z * z)
+    return np.where(x >= 0, 1 - 0.5 * erfc, 0.5 * erfc)
+
+
+def norm_pdf(x):
+    x = np.asarray(x, dtype=np.float64)
+    return np.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def is_call(call_put):
+    '''Boolean array that is True where `call_put` is a call.'''
+    call_put = np.asarray(call_put)
+
+    if call_put.dtype == bool:
+        return call_put
+
+    return np.char.upper(call_put.astype(str)).astype('U1') == utils.CALL
+
+
+def _d1_d2(S, K, T, r, sigma, q):
+    vol = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (r - q + 0.5 * sigma * sigma) * T) / vol
+    return d1, d1 - vol
+
+
+def black_scholes(S, K, T, r, sigma, call_put, q=0.0):
+    '''Black-Scholes-Merton value of European options.'''
+    S, K, T, r, sigma, q = np.broadcast_arrays(
+        *[np.asarray(v, dtype=np.float64) for v in (S, K, T, r, sigma, q)])
+    calls = is_call(call_put)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2 = _d1_d2(S, K, T, r, sigma, q)
+        sign = np.where(calls, 1.0, -1.0)
+        value = sign * (S * np.exp(-q * T) * norm_cdf(sign * d1) -
+                        K * np.exp(-r * T) * norm_cdf(sign * d2))
+
+    # NOTE(jkoelker) Expired or zero volatility options are worth their
+    #                discounted intrinsic value.
+    forward = sign * (S * np.exp(-q * T) - K * np.exp(-r * T))
+    return np.where((T > 0) & (sigma > 0), value, np.maximum(forward, 0))
+
+
+def greeks(S, K, T, r, sigma, call_put, q=0.0):
+    '''
+    Black-Scholes-Merton Greeks of European options.
+
+    returns a dict of arrays keyed by GREEKS. `theta` is per year and `vega`
+        and `rho` are per 1.0 (100%) change in volatility and rate.
+    '''
+    S, K, T, r, sigma, q = np.broadcast_arrays(
+        *[np.asarray(v, dtype=np.float64) for v in (S, K, T, r, sigma, q)])
+    sign = np.where(is_call(call_put), 1.0, -1.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2 = _d1_d2(S, K, T, r, sigma, q)
+        sqrt_t = np.sqrt(T)
+        dq = np.exp(-q * T)
+        dr = np.exp(-r * T)
+        pdf = norm_pdf(d1)
+        nd1 = norm_cdf(sign * d1)
+        nd2 = norm_cdf(sign * d2)
+
+        return {'delta': sign * dq * nd1,
+                'gamma': dq * pdf / (S * sigma * sqrt_t),
+                'theta': (-S * dq * pdf * sigma / (2 * sqrt_t) +
+                          sign * (q * S * dq * nd1 - r * K * dr * nd2)),
+                'vega': S * dq * pdf * sqrt_t,
+                'rho': sign * K * T * dr * nd2}
+
+
+def _phi(S, T, gamma, H, I, r, b, sigma):
+    vol = sigma * np.sqrt(T)
+    lam = (-r + gamma * b + 0.5 * gamma * (gamma - 1) * sigma * sigma) * T
+    d = -(np.log(S / H) + (b + (gamma - 0.5) * sigma * sigma) * T) / vol
+    kappa = 2 * b / (sigma * sigma) + (2 * gamma - 1)
+    return (np.exp(lam) * S ** gamma *
+            (norm_cdf(d) - (I / S) ** kappa *
+             norm_cdf(d - 2 * np.log(I / S) / vol)))
+
+
+def _bjerksund_stensland_call(S, K, T, r, b, sigma):
+    sigma2 = sigma * sigma
+    beta = ((0.5 - b / sigma2) +
+            np.sqrt((b / sigma2 - 0.5) ** 2 + 2 * r / sigma2))
+    b_inf = beta / (beta - 1) * K
+    b_0 = np.where(r - b > 0, np.maximum(K, r / (r - b) * K), K)
+    h = -(b * T + 2 * sigma * np.sqrt(T)) * b_0 / (b_inf - b_0)
+    I = b_0 + (b_inf - b_0) * (1 - np.exp(h))
+    alpha = (I - K) * I ** -beta
+
+    value = (alpha * S ** beta -
+             alpha * _phi(S, T, beta, I, I, r, b, sigma) +
+             _phi(S, T, 1, I, I, r, b, sigma) -
+             _phi(S, T, 1, K, I, r, b, sigma) -
+             K * _phi(S, T, 0, I, I, r, b, sigma) +
+             K * _phi(S, T, 0, K, I, r, b, sigma))
+    value = np.where(S >= I, S - K, value)
+
+    # NOTE(jkoelker) Without a dividend early exercise is never optimal and
+    #                the call is worth its European value. fmax also falls
+    #                back to it where the approximation overflows at tiny
+    #                volatilities.
+    european = black_scholes(S, K, T, r, sigma, True, q=r - b)
+    return np.where(b >= r, european, np.fmax(value, european))
+
+
+def bjerksund_stensland(S, K, T, r, sigma, call_put, q=0.0):
+    '''Bjerksund-Stensland (1993) value of American options.'''
+    S, K, T, r, sigma, q = np.broadcast_arrays(
+        *[np.asarray(v, dtype=np.float64) for v in (S, K, T, r, sigma, q)])
+    calls = is_call(call_put)
+    b = r - q
+
+    # NOTE(jkoelker) Puts are priced as calls with the put-call
+    #                transformation P(S, K, r, b) = C(K, S, r - b, -b).
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        value = _bjerksund_stensland_call(np.where(calls, S, K),
+                                          np.where(calls, K, S), T,
+                                          np.where(calls, r, r - b),
+                                          np.where(calls, b, -b), sigma)
+
+    intrinsic = np.maximum(np.where(calls, S - K, K - S), 0)
+    value = np.where((T > 0) & (sigma > 0), value, intrinsic)
+    return np.maximum(value, intrinsic)
+
+
+MODELS = {EUROPEAN: black_scholes,
+          AMERICAN: bjerksund_stensland}
+
+
+def price(S, K, T, r, sigma, call_put, q=0.0, model=EUROPEAN):
+    '''Theoretical value with the pricing `model` (EUROPEAN or AMERICAN).'''
+    return MODELS[model](S, K, T, r, sigma, call_put, q=q)
+
+
+def implied_volatility(value, S, K, T, r, call_put, q=0.0, model=EUROPEAN,
+                       tol=1e-6, max_iter=100, method=NEWTON):
+    '''
+    Volatility at which `model` prices each option at `value`.
+
+    Solved for every option at once with Newton steps, using the
+        Black-Scholes vega, kept inside a bisection bracket of
+        [MIN_VOLATILITY, MAX_VOLATILITY] so every option converges. With
+        `method` BISECTION only the bracket is halved, slower but needing
+        no vega. Options whose value is outside what the bracket can
+        produce are NaN.
+    '''
+    if method not in (NEWTON, BISECTION):
+        raise ValueError("method not one of ('%s', '%s'): %s" %
+                         (NEWTON, BISECTION, method))
+
+    arrays = np.broadcast_arrays(
+        *[np.asarray(v, dtype=np.float64) for v in (value, S, K, T, r, q)] +
+        [is_call(call_put)])
+    shape = arrays[0].shape
+    value, S, K, T, r, q, calls = [np.ravel(a) for a in arrays]
+    func = MODELS[model]
+
+    lo = np.full(value.shape, MIN_VOLATILITY)
+    hi = np.full(value.shape, MAX_VOLATILITY)
+    low_value = func(S, K, T, r, lo, calls, q=q)
+    high_value = func(S, K, T, r, hi, calls, q=q)
+    valid = (value >= low_value - tol) & (value <= high_value + tol) & (T > 0)
+
+    sigma = np.full(value.shape, 0.3)
+    active = valid.copy()
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+
+        args = [a[active] for a in (S, K, T, r, q)]
+        s = sigma[active]
+        diff = func(args[0], args[1], args[2], args[3], s, calls[active],
+                    q=args[4]) - value[active]
+
+        converged = np.abs(diff) < tol
+        lo[active] = np.where(diff < 0, s, lo[active])
+        hi[active] = np.where(diff > 0, s, hi[active])
+
+        bisect = 0.5 * (lo[active] + hi[active])
+
+        if method == BISECTION:
+            step = bisect
+            inside = np.zeros(len(s), dtype=bool)
+        else:
+            vega = greeks(args[0], args[1], args[2], args[3], s,
+                          calls[active], q=args[4])['vega']
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                step = s - diff / vega
+
+            inside = (step > lo[active]) & (step < hi[active])
+        sigma[active] = np.where(converged, s,
+                                 np.where(inside, step, bisect))
+
+        idx = np.flatnonzero(active)
+        active[idx[converged]] = False
+
+    return np.where(valid, sigma, np.nan).reshape(shape)
+
+
+def _market_time(now):
+    if now is None:
+        return pd.Timestamp.now(tz=MARKET_TZ)
+
+    now = pd.Timestamp(now)
+
+    if now.tz is None:
+        return now.tz_localize(MARKET_TZ)
+
+    return now.tz_convert(MARKET_TZ)
+
+
+def years_to_expiration(expirations, now=None):
+    '''
+    Years from `now` until the 16:00 New York close on each of
+        `expirations`.
+
+    `now` defaults to the current time; a naive `now` is New York time.
+    '''
+    expirations = pd.to_datetime(pd.Series(np.ravel(expirations)))
+
+    if expirations.dt.tz is not None:
+        expirations = expirations.dt.tz_convert(MARKET_TZ)
+
+    closes = expirations.dt.tz_localize(None).dt.normalize() + MARKET_CLOSE
+    closes = closes.dt.tz_localize(MARKET_TZ)
+    seconds = (closes - _market_time(now)).dt.total_seconds()
+    return np.maximum(seconds.to_numpy() / (365 * 86400.0), 0)
+
+
+def _years(df, now):
+    if 'xdate' in df:
+        return years_to_expiration(df['xdate'], now=now)
+
+    return df['days_to_expiration'].to_numpy(dtype=np.float64) / 365.0
+
+
+def _spots(df, spot):
+    if isinstance(spot, (dict, pd.Series)):
+        return df['undersymbol'].map(spot).to_numpy(dtype=np.float64)
+
+    return np.broadcast_to(np.asarray(spot, dtype=np.float64), len(df))
+
+
+def chain(df, spot, r, q=0.0, sigma=None, now=None, model=EUROPEAN,
+          spot_shift=0.0, vol_shift=0.0):
+    '''
+    Theoretical values, Greeks and implied volatilities of an option chain.
+
+    `df` is a frame of option quotes as returned by `Options.search` or
+        `Options.quote`. `spot` is the underlying price, a scalar, an array
+        or a dict/Series keyed by `undersymbol`.
+
+    Implied volatilities are solved from the bid, ask and their mid. The
+        options are then valued at `sigma` (by default the mid implied
+        volatility, falling back to the quote's `imp_volatility`) with
+        `spot_shift` (relative) and `vol_shift` (absolute) applied, so the
+        chain can be scenario shocked without requesting it again.
+
+    returns a DataFrame with the index of `df` and columns iv_bid, iv_ask,
+        iv_mid, theo and GREEKS (see `greeks`, which are the Black-Scholes
+        Greeks for both models).
+    '''
+    S = _spots(df, spot)
+    K = df['strikeprice'].to_numpy(dtype=np.float64)
+    T = _years(df, now)
+    calls = is_call(df['put_call'].to_numpy())
+
+    bid = df['bid'].to_numpy(dtype=np.float64)
+    ask = df['ask'].to_numpy(dtype=np.float64)
+    mid = 0.5 * (bid + ask)
+
+    values = np.concatenate((bid, ask, mid))
+    ivs = implied_volatility(values, np.tile(S, 3), np.tile(K, 3),
+                             np.tile(T, 3), r, np.tile(calls, 3), q=q,
+                             model=model)
+    iv_bid, iv_ask, iv_mid = np.split(ivs, 3)
+
+    if sigma is None:
+        sigma = iv_mid
+
+        if 'imp_volatility' in df:
+            quoted = df['imp_volatility'].to_numpy(dtype=np.float64)
+            sigma = np.where(np.isnan(sigma), quoted, sigma)
+
+    S = S * (1 + spot_shift)
+    sigma = np.maximum(np.asarray(sigma, dtype=np.float64) + vol_shift,
+                       MIN_VOLATILITY)
+
+    result = {'iv_bid': iv_bid, 'iv_ask': iv_ask, 'iv_mid': iv_mid,
+              'theo': price(S, K, T, r, sigma, calls, q=q, model=model)}
+    result.update(greeks(S, K, T, r, sigma, calls, q=q))
+
+    return pd.DataFrame(result, index=df.index)
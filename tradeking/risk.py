@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from tradeking import pricing
+from tradeking import utils
+
+
+STOCK = 'stock'
+OPTION = 'option'
+
+MULTIPLIER = 100
+
+PRICE_SHOCKS = np.linspace(-0.2, 0.2, 9)
+VOL_SHOCKS = np.array([-0.1, -0.05, 0.0, 0.05, 0.1])
+
+# NOTE(jkoelker) The default valuation time is floored to this so repeated
+#                calls within it share the cache.
+NOW_RESOLUTION = pd.Timedelta(minutes=1)
+
+_Row = collections.namedtuple('_Row', ('position', 'kind', 'expiration',
+                                       'call_put', 'strike', 'quantity',
+                                       'multiplier', 'sigma'))
+
+
+def _leg_row(position, leg, quantity, multiplier, sigma):
+    if leg._long_short == utils.SHORT:
+        quantity = -quantity
+
+    return _Row(position=position, kind=OPTION,
+                expiration=pd.Timestamp(leg._expiration),
+                call_put=leg._call_put,
+                strike=utils.Price.decode(leg._strike),
+                quantity=quantity, multiplier=multiplier, sigma=sigma)
+
+
+def _holding_rows(position, holding, sigma):
+    '''Rows of an `Account.holdings` record.'''
+    instrument = holding['instrument']
+    quantity = float(holding['qty'])
+
+    if instrument.get('sectyp') != 'OPT':
+        return instrument['sym'], [_Row(position=position, kind=STOCK,
+                                        expiration=None, call_put=None,
+                                        strike=np.nan, quantity=quantity,
+                                        multiplier=1, sigma=sigma)]
+
+    # NOTE(jkoelker) FIX PutOrCall, 0 is a put and 1 a call.
+    call_put = utils.CALL if str(instrument['putcall']) == '1' else utils.PUT
+    multiplier = float(instrument.get('mult') or MULTIPLIER)
+
+    return instrument['sym'], [_Row(position=position, kind=OPTION,
+                                    expiration=pd.Timestamp(
+                                        instrument['matdt']),
+                                    call_put=call_put,
+                                    strike=float(instrument['strkpx']),
+                                    quantity=quantity,
+                                    multiplier=multiplier, sigma=sigma)]
+
+
+class Cube(object):
+    '''
+    Scenario P&L of a portfolio.
+
+    `pnl` is an array of shape (positions, price shocks, vol shocks) with
+        the change in value of every position when its underlying moves by
+        each of `price_shocks` (relative) and its volatility by each of
+        `vol_shocks` (absolute). `positions` is indexed by position id in
+        the order of `pnl`'s first axis.
+    '''
+    def __init__(self, pnl, positions, price_shocks, vol_shocks):
+        self.pnl = pnl
+        self.positions = positions
+        self.price_shocks = price_shocks
+        self.vol_shocks = vol_shocks
+
+    def _frame(self, pnl):
+        return pd.DataFrame(pnl,
+                            index=pd.Index(self.price_shocks,
+                                           name='price_shock'),
+                            columns=pd.Index(self.vol_shocks,
+                                             name='vol_shock'))
+
+    @property
+    def total(self):
+        '''P&L of the whole portfolio, price shocks by vol shocks.'''
+        return self._frame(self.pnl.sum(axis=0))
+
+    def underlying(self, symbol):
+        '''P&L of the positions in `symbol`, price shocks by vol shocks.'''
+        mask = (self.positions['underlying'] == symbol).to_numpy()
+        return self._frame(self.pnl[mask].sum(axis=0))
+
+    def position(self, position_id):
+        return self._frame(self.pnl[self.positions.index.get_loc(
+            position_id)])
+
+    @property
+    def worst(self):
+        '''Worst scenario P&L of each position.'''
+        return pd.Series(self.pnl.reshape(len(self.pnl), -1).min(axis=1),
+                         index=self.positions.index, name='worst')
+
+
+class Portfolio(object):
+    '''
+    Positions across underlyings valued under a grid of scenarios.
+
+    Positions are option.Leg or option.MultiLeg instances or
+        `Account.holdings` records, each with a quantity (in contracts for
+        options). `scenarios` revalues every position at every combination
+        of price and volatility shock with the pricing module and returns a
+        Cube.
+
+    Each underlying's block of the cube is cached; adding or removing a
+        position, or changing the spot or volatility of an underlying, only
+        recomputes the positions in that underlying.
+
+        book = Portfolio(r=0.01)
+        book.add(option.Straddle('IBM140118C00190000'), quantity=10)
+        book.add_holdings(account.holdings)
+
+        cube = book.scenarios(spots={'IBM': 185.0}, vols={'IBM': 0.22})
+        cube.total
+    '''
+    def __init__(self, positions=(), r=0.0, q=0.0, model=pricing.EUROPEAN,
+                 multiplier=MULTIPLIER):
+        self.r = r
+        self.q = q
+        self.model = model
+        self.multiplier = multiplier
+        self._ids = itertools.count()
+        self._rows = collections.defaultdict(list)
+        self._position_underlyings = {}
+        self._cache = {}
+
+        for position in positions:
+            self.add(position)
+
+    def __len__(self):
+        return len(self._position_underlyings)
+
+    @property
+    def underlyings(self):
+        return sorted(self._rows)
+
+    def _add_rows(self, underlying, rows):
+        self._rows[underlying].extend(rows)
+        self._position_underlyings[rows[0].position] = underlying
+        return rows[0].position
+
+    def add(self, position, quantity=1, sigma=None):
+        '''
+        Add a Leg or MultiLeg, returning its position id.
+
+        `sigma` is the volatility of its options, the underlying's entry in
+            the `vols` given to `scenarios` by default.
+        '''
+        if isinstance(position, dict):
+            return self.add_holding(position, sigma=sigma)
+
+        legs = getattr(position, '_legs', [position])
+        position_id = next(self._ids)
+        rows = [_leg_row(position_id, leg, quantity, self.multiplier, sigma)
+                for leg in legs]
+
+        for underlying in set(leg._underlying for leg in legs):
+            if underlying != legs[0]._underlying:
+                raise ValueError('Legs of a position must share an '
+                                 'underlying: %s' % underlying)
+
+        return self._add_rows(legs[0]._underlying, rows)
+
+    def add_holding(self, holding, sigma=None):
+        '''Add an `Account.holdings` record, returning its position id.'''
+        underlying, rows = _holding_rows(next(self._ids), holding, sigma)
+        return self._add_rows(underlying, rows)
+
+    def add_holdings(self, holdings, sigma=None):
+        if isinstance(holdings, dict):
+            holdings = [holdings]
+
+        return [self.add_holding(holding, sigma=sigma)
+                for holding in holdings]
+
+    def remove(self, position_id):
+        underlying = self._position_underlyings.pop(position_id)
+        rows = [row for row in self._rows[underlying]
+                if row.position != position_id]
+
+        if rows:
+            self._rows[underlying] = rows
+        else:
+            del self._rows[underlying]
+            self._cache.pop(underlying, None)
+
+    @property
+    def positions(self):
+        '''Every leg of every position, indexed by position id.'''
+        rows = [(underlying,) + row for underlying in self.underlyings
+                for row in self._rows[underlying]]
+        df = pd.DataFrame(rows, columns=('underlying',) + _Row._fields)
+        return df.set_index('position')
+
+    def _compute(self, rows, spot, vol, price_shocks, vol_shocks, now):
+        columns = dict(zip(_Row._fields, zip(*rows)))
+
+        quantity = (np.array(columns['quantity'], dtype=np.float64) *
+                    np.array(columns['multiplier'], dtype=np.float64))
+        options = np.array(columns['kind']) == OPTION
+        spots = spot * (1 + price_shocks)
+
+        # NOTE(jkoelker) Stock moves one for one whatever the volatility.
+        pnl = np.broadcast_to(((spots - spot)[None, :, None] *
+                               quantity[:, None, None]),
+                              (len(rows), len(price_shocks),
+                               len(vol_shocks))).copy()
+
+        if options.any():
+            K = np.array(columns['strike'], dtype=np.float64)[options]
+            T = pricing.years_to_expiration(
+                [e for e, o in zip(columns['expiration'], options) if o],
+                now=now)
+            calls = pricing.is_call(np.array(columns['call_put'])[options])
+            sigma = np.array([vol if s is None else s
+                              for s in columns['sigma']],
+                             dtype=np.float64)[options]
+
+            base = pricing.price(spot, K, T, self.r, sigma, calls, q=self.q,
+                                 model=self.model)
+            shocked_sigma = np.maximum(sigma[:, None, None] +
+                                       vol_shocks[None, None, :],
+                                       pricing.MIN_VOLATILITY)
+            value = pricing.price(spots[None, :, None], K[:, None, None],
+                                  T[:, None, None], self.r, shocked_sigma,
+                                  calls[:, None, None], q=self.q,
+                                  model=self.model)
+            pnl[options] = ((value - base[:, None, None]) *
+                            quantity[options][:, None, None])
+
+        # NOTE(jkoelker) Sum the legs of each position into one block.
+        ids, inverse = np.unique(columns['position'], return_inverse=True)
+        totals = np.zeros((len(ids),) + pnl.shape[1:])
+        np.add.at(totals, inverse, pnl)
+        return dict(zip(ids.tolist(), totals))
+
+    def _blocks(self, underlying, spot, vol, price_shocks, vol_shocks, now):
+        '''P&L of each position in `underlying`, computing only new ones.'''
+        key = (spot, vol, self.r, self.q, self.model, price_shocks.tobytes(),
+               vol_shocks.tobytes(), now)
+        cached = self._cache.get(underlying)
+
+        if cached is None or cached[0] != key:
+            cached = self._cache[underlying] = (key, {})
+
+        blocks = cached[1]
+        rows = self._rows[underlying]
+        missing = [row for row in rows if row.position not in blocks]
+
+        if missing:
+            blocks.update(self._compute(missing, spot,
+                                        np.nan if vol is None else vol,
+                                        price_shocks, vol_shocks, now))
+
+        for position_id in list(blocks):
+            if self._position_underlyings.get(position_id) != underlying:
+                del blocks[position_id]
+
+        return blocks
+
+    def scenarios(self, spots, vols=None, price_shocks=PRICE_SHOCKS,
+                  vol_shocks=VOL_SHOCKS, now=None):
+        '''
+        Scenario P&L of every position.
+
+        `spots` and `vols` map each underlying to its price and to the
+            volatility of its options without a `sigma` of their own. `now`
+            fixes the valuation time; it defaults to the current time
+            floored to NOW_RESOLUTION. The cache is reused while the
+            valuation time stays the same.
+
+        returns a Cube with the positions in id order.
+        '''
+        price_shocks = np.asarray(price_shocks, dtype=np.float64)
+        vol_shocks = np.asarray(vol_shocks, dtype=np.float64)
+        vols = vols or {}
+        if now is None:
+            now = pd.Timestamp.now(tz='UTC').floor(NOW_RESOLUTION)
+        else:
+            now = pd.Timestamp(now)
+
+        blocks = {}
+
+        for underlying in self.underlyings:
+            vol = vols.get(underlying)
+            blocks.update(self._blocks(underlying, float(spots[underlying]),
+                                       None if vol is None else float(vol),
+                                       price_shocks, vol_shocks, now))
+
+        position_ids = sorted(blocks)
+        shape = (len(position_ids), len(price_shocks), len(vol_shocks))
+        pnl = np.array([blocks[i] for i in position_ids]).reshape(shape)
+
+        positions = pd.DataFrame(
+            {'underlying': [self._position_underlyings[i]
+                            for i in position_ids]},
+            index=pd.Index(position_ids, name='position'))
+
+        return Cube(pnl, positions, price_shocks, vol_shocks)
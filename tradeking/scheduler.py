@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+import urllib.parse
+
+import requests
+
+
+LOG = logging.getLogger(__name__)
+
+TRADE = 'trade'
+ACCOUNT = 'account'
+MARKET = 'market'
+
+# NOTE(jkoelker) Requests per minute allowed by TradeKing for each class.
+LIMITS = {TRADE: 40,
+          ACCOUNT: 180,
+          MARKET: 60}
+
+# NOTE(jkoelker) Lower goes first; orders before account before bulk market.
+PRIORITIES = {TRADE: 0,
+              ACCOUNT: 1,
+              MARKET: 2}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def classify(method, url):
+    '''Return the rate limit class (TRADE, ACCOUNT or MARKET) of a request.'''
+    path = urllib.parse.urlsplit(url).path
+
+    if '/accounts' in path:
+        if method.upper() == 'POST' and '/orders' in path:
+            return TRADE
+        return ACCOUNT
+
+    return MARKET
+
+
+class Clock(object):
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def wait(self, condition, timeout=None):
+        condition.wait(timeout)
+
+
+class FakeClock(Clock):
+    '''Clock that only moves when slept or waited on, for tests.'''
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now = self.now + seconds
+
+    def wait(self, condition, timeout=None):
+        if timeout is None:
+            condition.wait()
+        else:
+            self.now = self.now + timeout
+
+
+class TokenBucket(object):
+    '''`capacity` tokens refilled continuously at `rate` tokens a second.'''
+    def __init__(self, rate, capacity, clock):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._clock = clock
+        self._last = clock.monotonic()
+
+    def _refill(self):
+        now = self._clock.monotonic()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def delay(self):
+        '''Seconds until a token is available.'''
+        self._refill()
+
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens = self.tokens - 1
+
+    def drain(self):
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+
+class Scheduler(object):
+    '''
+    Client side rate limiting and prioritization of API requests.
+
+    Each request class (see `classify`) has a token bucket allowing
+        `limits[class]` requests per `period` seconds. Waiting requests are
+        queued by priority (PRIORITIES by default) and at most
+        `max_concurrency` requests are in flight at once, so when requests
+        pile up order and account calls go ahead of bulk market data.
+
+    Throttled (429) and failed (5xx or connection error) requests are
+        retried up to `max_retries` times after a full jitter exponential
+        backoff. Trade requests are only retried on 429 so an order is never
+        submitted twice.
+
+    `stats` returns per class counters of requests, retries, throttles,
+        queue depth and time spent waiting.
+    '''
+    def __init__(self, limits=LIMITS, priorities=PRIORITIES, period=60,
+                 max_concurrency=10, max_retries=3, backoff=0.5,
+                 max_backoff=30, clock=None, rng=None):
+        self._clock = clock or Clock()
+        self._rng = rng or random.Random()
+        self._buckets = dict((kind, TokenBucket(float(limit) / period, limit,
+                                                self._clock))
+                             for kind, limit in limits.items())
+        self.priorities = dict(priorities)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._counter = itertools.count()
+        self._in_flight = 0
+        self._stats = dict((kind, {'requests': 0, 'retries': 0,
+                                   'throttled': 0, 'queued': 0,
+                                   'max_queued': 0, 'wait_time': 0.0,
+                                   'max_wait': 0.0})
+                           for kind in self._buckets)
+
+    def stats(self):
+        with self._cond:
+            return dict((kind, dict(stats))
+                        for kind, stats in self._stats.items())
+
+    def _next(self):
+        '''The first waiter in priority order whose bucket has a token.'''
+        for waiter in sorted(self._waiters):
+            if self._buckets[waiter[2]].delay() == 0:
+                return waiter
+
+    def acquire(self, kind, priority=None):
+        if priority is None:
+            priority = self.priorities.get(kind, len(self.priorities))
+
+        bucket = self._buckets[kind]
+        stats = self._stats[kind]
+        waiter = (priority, next(self._counter), kind)
+        start = self._clock.monotonic()
+
+        with self._cond:
+            heapq.heappush(self._waiters, waiter)
+            stats['queued'] = stats['queued'] + 1
+            stats['max_queued'] = max(stats['max_queued'], stats['queued'])
+
+            while (self._in_flight >= self.max_concurrency or
+                   self._next() != waiter):
+                delay = bucket.delay()
+                self._clock.wait(self._cond, delay or None)
+
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+            bucket.take()
+            self._in_flight = self._in_flight + 1
+
+            waited = self._clock.monotonic() - start
+            stats['queued'] = stats['queued'] - 1
+            stats['requests'] = stats['requests'] + 1
+            stats['wait_time'] = stats['wait_time'] + waited
+            stats['max_wait'] = max(stats['max_wait'], waited)
+
+            self._cond.notify_all()
+
+    def release(self, kind):
+        with self._cond:
+            self._in_flight = self._in_flight - 1
+            self._cond.notify_all()
+
+    def _backoff(self, attempt, response=None):
+        delay = self._rng.uniform(0, min(self.max_backoff,
+                                         self.backoff * 2 ** attempt))
+
+        retry_after = None
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+
+        try:
+            delay = max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+
+        self._clock.sleep(delay)
+
+    def call(self, kind, func, priority=None):
+        '''Call `func` once admitted, retrying throttles and failures.'''
+        for attempt in itertools.count():
+            retries_left = attempt < self.max_retries
+            self.acquire(kind, priority=priority)
+
+            try:
+                r = func()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if kind == TRADE or not retries_left:
+                    raise
+                LOG.warning('Retrying %s request after %s', kind, e)
+                r = None
+            finally:
+                self.release(kind)
+
+            if r is not None:
+                status = r.status_code
+
+                if status == 429:
+                    with self._cond:
+                        self._stats[kind]['throttled'] += 1
+                        self._buckets[kind].drain()
+
+                if (status not in RETRY_STATUSES or not retries_left or
+                        (kind == TRADE and status != 429)):
+                    return r
+
+            with self._cond:
+                self._stats[kind]['retries'] += 1
+
+            self._backoff(attempt, r)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import hashlib
+import json
+
+import pandas as pd
+
+
+BALANCES = 'balances'
+HOLDINGS = 'holdings'
+ORDERS = 'orders'
+
+RESOURCES = (BALANCES, HOLDINGS, ORDERS)
+
+# NOTE(jkoelker) Market value and quote fields move every tick, only these
+#                identify a change in what an account holds.
+HOLDING_FIELDS = ('accounttype', 'costbasis', 'instrument.cusip',
+                  'instrument.sectyp', 'instrument.sym', 'qty')
+
+# NOTE(jkoelker) Only these are converted to numbers, identifiers such as
+#                cusips, symbols and order ids stay strings even when they
+#                are all digits.
+NUMERIC_FIELDS = frozenset((
+    # accountbalance
+    'accountvalue', 'fedcall', 'housecall',
+    'buyingpower.cashavailableforwithdrawal', 'buyingpower.daytrading',
+    'buyingpower.equitypercentage', 'buyingpower.options',
+    'buyingpower.soddaytrading', 'buyingpower.sodoptions',
+    'buyingpower.sodstock', 'buyingpower.stock',
+    'money.accruedinterest', 'money.cash', 'money.cashavailable',
+    'money.marginbalance', 'money.mmf', 'money.total',
+    'money.uncleareddeposits', 'money.unsettledfunds', 'money.yield',
+    'securities.longoptions', 'securities.longstocks', 'securities.options',
+    'securities.shortoptions', 'securities.shortstocks',
+    'securities.stocks', 'securities.total',
+    # accountholdings
+    'costbasis', 'gainloss', 'marketvalue', 'marketvaluechange', 'price',
+    'purchaseprice', 'qty', 'instrument.factor', 'instrument.mult',
+    'instrument.strkpx', 'quote.change', 'quote.lastprice',
+))
+
+Snapshot = collections.namedtuple('Snapshot', ('balances', 'holdings',
+                                               'orders', 'timestamp'))
+
+
+def _records(response, *path):
+    records = response['response']
+
+    for key in path:
+        records = (records or {}).get(key)
+
+    if not records:
+        return []
+
+    if isinstance(records, dict):
+        return [records]
+
+    return records
+
+
+# NOTE(jkoelker) The Account method requesting each resource and the path
+#                to its records in the response.
+_REQUESTS = {BALANCES: ('_balances', ('accountbalance',)),
+             HOLDINGS: ('_holdings', ('accountholdings', 'holding')),
+             ORDERS: ('_orders', ('orderstatus', 'order'))}
+
+
+def _fetch(account, resource):
+    method, path = _REQUESTS[resource]
+    return _records(getattr(account, method)(), *path)
+
+
+def _tasks(accounts, resources):
+    return [(account, resource) for account in accounts
+            for resource in resources]
+
+
+def _collect(tasks, results, resources):
+    fetched = dict((resource, {}) for resource in resources)
+
+    for (account, resource), records in zip(tasks, results):
+        fetched[resource][account.account_id] = records
+
+    return fetched
+
+
+def _typed(df):
+    for col in df.columns.intersection(NUMERIC_FIELDS):
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            try:
+                df[col] = pd.to_numeric(df[col])
+            except (TypeError, ValueError):
+                pass
+
+    return df
+
+
+def to_frame(records_by_account, index=True):
+    '''
+    Stack per account records into one typed DataFrame.
+
+    Nested fields are flattened and the NUMERIC_FIELDS columns are made
+        numeric. With `index` the frame is indexed by (account, position in
+        the account's records), otherwise by account alone.
+    '''
+    frames = [pd.json_normalize(records)
+              for records in records_by_account.values()]
+
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, keys=list(records_by_account),
+                   names=['account', None])
+
+    if not index:
+        df = df.droplevel(1)
+
+    # NOTE(jkoelker) The account is in the index, drop the duplicate column
+    return _typed(df.drop(columns='account', errors='ignore'))
+
+
+def fetch(api, accounts, resources=RESOURCES):
+    '''
+    Fetch `resources` for every account in `accounts` concurrently.
+
+    Every (account, resource) request runs on the API's executor over its
+        connection pool, still subject to its scheduler's account quota.
+
+    returns a dict of resource to a dict of account id to records.
+    '''
+    tasks = _tasks(accounts, resources)
+    results = api.map(lambda task: _fetch(*task), tasks)
+    return _collect(tasks, results, resources)
+
+
+def _snapshot(fetched, timestamp):
+    frames = dict((resource, to_frame(records, index=resource != BALANCES))
+                  for resource, records in fetched.items())
+
+    return Snapshot(balances=frames.get(BALANCES),
+                    holdings=frames.get(HOLDINGS),
+                    orders=frames.get(ORDERS),
+                    timestamp=timestamp)
+
+
+def snapshot(api, accounts, resources=RESOURCES):
+    '''
+    Balances, holdings and orders of `accounts` as one Snapshot.
+
+    `balances` is indexed by account id, `holdings` and `orders` by account
+        id and row. Resources not in `resources` are None.
+    '''
+    timestamp = pd.Timestamp.now(tz='UTC')
+    return _snapshot(fetch(api, accounts, resources=resources), timestamp)
+
+
+def _digest(records, fields=None):
+    if fields is not None:
+        records = pd.json_normalize(records)
+        records = records[records.columns.intersection(fields)]
+        records = records.sort_index(axis=1).to_json(orient='values')
+    else:
+        records = json.dumps(records, sort_keys=True)
+
+    return hashlib.sha1(records.encode('utf-8')).hexdigest()
+
+
+class SnapshotWatcher(object):
+    '''
+    Poll snapshots of many accounts, emitting only the ones that changed.
+
+    An account has changed when its holdings (compared on `holding_fields`)
+        or its orders differ from the last poll. Balances are fetched for the
+        changed accounts only once the holdings and orders are compared.
+
+        watcher = tkapi.watch()
+
+        while True:
+            changed = watcher.poll()
+            ...
+            time.sleep(5)
+    '''
+    def __init__(self, api, accounts, holding_fields=HOLDING_FIELDS):
+        self._api = api
+        self.accounts = list(accounts)
+        self.holding_fields = holding_fields
+        self._digests = {}
+
+    def _digest(self, holdings, orders):
+        return (_digest(holdings, self.holding_fields), _digest(orders))
+
+    def poll(self):
+        '''
+        Snapshot of the accounts that changed since the last poll.
+
+        The first poll returns every account. returns None when nothing
+            changed.
+        '''
+        timestamp = pd.Timestamp.now(tz='UTC')
+        fetched = fetch(self._api, self.accounts,
+                        resources=(HOLDINGS, ORDERS))
+        changed = self._changed(fetched)
+
+        if not changed:
+            return None
+
+        balances = fetch(self._api, changed, resources=(BALANCES,))
+        return self._changes(fetched, changed, balances, timestamp)
+
+    def _changed(self, fetched):
+        '''Accounts whose holdings or orders in `fetched` changed.'''
+        changed = []
+
+        for account in self.accounts:
+            account_id = account.account_id
+            digest = self._digest(fetched[HOLDINGS][account_id],
+                                  fetched[ORDERS][account_id])
+
+            if self._digests.get(account_id) != digest:
+                self._digests[account_id] = digest
+                changed.append(account)
+
+        return changed
+
+    def _changes(self, fetched, changed, balances, timestamp):
+        ids = [account.account_id for account in changed]
+
+        return Snapshot(
+            balances=to_frame(balances[BALANCES], index=False),
+            holdings=to_frame(dict((i, fetched[HOLDINGS][i]) for i in ids)),
+            orders=to_frame(dict((i, fetched[ORDERS][i]) for i in ids)),
+            timestamp=timestamp)
+
+    def reset(self):
+        '''Forget what was seen, the next poll returns every account.'''
+        self._digests.clear()
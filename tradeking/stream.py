@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import collections
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+
+import requests
+
+
+LOG = logging.getLogger(__name__)
+
+STREAM_URL = 'https://stream.tradeking.com/v1'
+
+Quote = collections.namedtuple('Quote', ('symbol', 'timestamp', 'bid', 'ask',
+                                         'bidsz', 'asksz'))
+Trade = collections.namedtuple('Trade', ('symbol', 'timestamp', 'last', 'vl',
+                                         'cvol', 'vwap'))
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _quote(message):
+    return Quote(symbol=message.get('symbol'),
+                 timestamp=_float(message.get('timestamp')),
+                 bid=_float(message.get('bid')),
+                 ask=_float(message.get('ask')),
+                 bidsz=_int(message.get('bidsz')),
+                 asksz=_int(message.get('asksz')))
+
+
+def _trade(message):
+    return Trade(symbol=message.get('symbol'),
+                 timestamp=_float(message.get('timestamp')),
+                 last=_float(message.get('last')),
+                 vl=_int(message.get('vl')),
+                 cvol=_int(message.get('cvol')),
+                 vwap=_float(message.get('vwap')))
+
+
+_RECORDS = {'quote': _quote, 'trade': _trade}
+
+
+def decode(chunks):
+    '''
+    Decode a stream of concatenated JSON messages.
+
+    `chunks` is an iterable of bytes as they arrive on the wire; a message
+        may be split across chunks. Yields each decoded message.
+    '''
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+
+    for chunk in chunks:
+        buf = buf + utf8.decode(chunk)
+        pos = 0
+
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos = pos + 1
+
+            if pos == len(buf):
+                break
+
+            try:
+                message, pos = decoder.raw_decode(buf, pos)
+            except ValueError:
+                break
+
+            yield message
+
+        buf = buf[pos:]
+
+
+def records(messages):
+    '''Turn decoded stream messages into Quote and Trade records.'''
+    for message in messages:
+        for key, value in message.items():
+            record = _RECORDS.get(key)
+
+            if record is not None:
+                yield record(value)
+            elif key == 'status':
+                LOG.debug('Stream status: %s', value)
+
+
+def _interrupt(response):
+    '''
+    Wake a thread blocked reading `response` by shutting its socket down.
+
+    Closing the response instead would wait on the read in progress, which
+        on a quiet stream lasts until `read_timeout`.
+    '''
+    connection = getattr(getattr(response, 'raw', None), 'connection', None)
+    sock = getattr(connection, 'sock', None)
+
+    if sock is None:
+        response.close()
+        return
+
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class QuoteStream(object):
+    '''
+    Streaming subscription to market/quotes.
+
+    Iterating the stream yields Quote and Trade records from one long lived
+        connection, reconnecting with exponential backoff (and resubscribing
+        to the current `symbols`) whenever it drops or is silent for
+        `read_timeout` seconds.
+
+    `start` instead reads the stream on a background thread into a bounded
+        queue of `queue_size` records and hands them off in batches of up to
+        `batch_size` records (waiting at most `batch_wait` seconds to fill
+        one) to a callback or a queue. When the consumer falls behind the
+        reader blocks, which stops reading from the socket, unless
+        `drop_when_full` is set in which case new records are dropped and
+        counted in `dropped`.
+
+        stream = tkapi.market.stream(['IBM', 'F'])
+        stream.start(callback=handle_batch)
+        ...
+        stream.stop()
+    '''
+    def __init__(self, api, symbols, queue_size=10000, batch_size=500,
+                 batch_wait=0.1, reconnect_wait=1, max_reconnect_wait=60,
+                 read_timeout=90, drop_when_full=False):
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+
+        self._api = api
+        self.symbols = list(symbols)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.reconnect_wait = reconnect_wait
+        self.max_reconnect_wait = max_reconnect_wait
+        self.read_timeout = read_timeout
+        self.drop_when_full = drop_when_full
+        self.dropped = 0
+        self.reconnects = 0
+
+        self._response = None
+        self._resubscribe = False
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def _connect(self):
+        path = self._api.join(self._api.stream_url, 'market', 'quotes')
+        params = {'symbols': ','.join(self.symbols)}
+        r = self._api.get(path, decode=False, params=params, stream=True,
+                          timeout=self.read_timeout)
+        r.raise_for_status()
+        return r
+
+    def _records(self):
+        wait = self.reconnect_wait
+
+        while not self._stopped.is_set():
+            try:
+                self._response = self._connect()
+                chunks = self._response.iter_content(chunk_size=None)
+
+                for record in records(decode(chunks)):
+                    wait = self.reconnect_wait
+                    yield record
+
+            except (requests.RequestException, AttributeError,
+                    ValueError) as e:
+                # NOTE(jkoelker) Closing the response from `subscribe` or
+                #                `stop` surfaces here as well.
+                if self._stopped.is_set():
+                    break
+
+                if not self._resubscribe:
+                    LOG.warning('Quote stream dropped: %s', e)
+
+            finally:
+                if self._response is not None:
+                    self._response.close()
+                    self._response = None
+
+            if self._resubscribe:
+                self._resubscribe = False
+                continue
+
+            if self._stopped.wait(wait):
+                break
+
+            self.reconnects = self.reconnects + 1
+            wait = min(wait * 2, self.max_reconnect_wait)
+
+    def __iter__(self):
+        self._stopped.clear()
+        return self._records()
+
+    def subscribe(self, symbols):
+        '''Replace the subscribed symbols, reconnecting the stream.'''
+        if isinstance(symbols, str):
+            symbols = symbols.split(',')
+
+        self.symbols = list(symbols)
+        self._resubscribe = True
+        response = self._response
+
+        if response is not None:
+            _interrupt(response)
+
+    def _read(self):
+        for record in self._records():
+            if not self.drop_when_full:
+                while not self._stopped.is_set():
+                    try:
+                        self._queue.put(record, timeout=self.batch_wait)
+                        break
+                    except queue.Full:
+                        continue
+                continue
+
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self.dropped = self.dropped + 1
+
+    def batches(self):
+        '''Yield lists of records from the background reader.'''
+        while not self._stopped.is_set() or not self._queue.empty():
+            try:
+                batch = [self._queue.get(timeout=self.batch_wait)]
+            except queue.Empty:
+                continue
+
+            deadline = time.monotonic() + self.batch_wait
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            yield batch
+
+    def _dispatch(self, callback, out):
+        for batch in self.batches():
+            if callback is not None:
+                callback(batch)
+            else:
+                out.put(batch)
+
+    def start(self, callback=None, queue=None):
+        '''
+        Start reading the stream on a background thread.
+
+        Batches of records are passed to `callback` or put on `queue`. With
+            neither, iterate `batches` to consume them.
+        '''
+        if self._threads:
+            raise ValueError('Stream already started')
+
+        self._stopped.clear()
+        self._threads.append(threading.Thread(target=self._read,
+                                              name='tradeking-stream',
+                                              daemon=True))
+
+        if callback is not None or queue is not None:
+            self._threads.append(threading.Thread(target=self._dispatch,
+                                                  args=(callback, queue),
+                                                  name='tradeking-dispatch',
+                                                  daemon=True))
+
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        response = self._response
+
+        if response is not None:
+            _interrupt(response)
+
+        for thread in self._threads:
+            thread.join(timeout)
+
+        self._threads = []
+
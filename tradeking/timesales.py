@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+INTERVALS = ('tick', '1min', '5min')
+
+DTYPE = np.dtype([('timestamp', np.int64),
+                  ('opn', np.float64),
+                  ('hi', np.float64),
+                  ('lo', np.float64),
+                  ('last', np.float64),
+                  ('vl', np.float64),
+                  ('incr_vl', np.float64)])
+
+
+def to_array(quotes):
+    '''Convert timesales quote dicts into a DTYPE structured array.'''
+    if isinstance(quotes, dict):
+        quotes = [quotes]
+
+    bars = np.empty(len(quotes), dtype=DTYPE)
+
+    for field in DTYPE.names:
+        values = [quote.get(field) for quote in quotes]
+        column = pd.to_numeric(pd.Series(values, dtype=object),
+                               errors='coerce')
+
+        if field == 'timestamp':
+            column = column.fillna(0)
+
+        bars[field] = column.to_numpy(dtype=DTYPE[field])
+
+    bars.sort(order='timestamp', kind='stable')
+    return bars
+
+
+def to_frame(bars):
+    '''
+    DataFrame of a DTYPE structured array indexed by datetime.
+
+    The columns are views of `bars`, so the frame of a memory mapped day
+        reads from the file rather than copying it and is read-only, as the
+        Store's maps are.
+    '''
+    index = pd.DatetimeIndex(pd.to_datetime(bars['timestamp'], unit='s'),
+                             name='datetime')
+    return pd.DataFrame(dict((field, bars[field])
+                             for field in DTYPE.names[1:]), index=index,
+                        copy=False)
+
+
+class Store(object):
+    '''
+    On-disk columnar cache of timesales bars.
+
+    Each (symbol, interval, day) is one `.npy` file of DTYPE records under
+        `path`/`interval`/`symbol`/. Reads memory map the file, so only the
+        pages that are touched are read from disk.
+    '''
+    def __init__(self, path):
+        self.path = path
+
+    def _path(self, symbol, interval, day):
+        day = pd.Timestamp(day).strftime('%Y-%m-%d')
+        return os.path.join(self.path, interval, symbol.upper(),
+                            day + '.npy')
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(*key))
+
+    def read(self, symbol, interval, day):
+        '''Memory mapped bars for a day, or None if it is not cached.'''
+        path = self._path(symbol, interval, day)
+
+        if not os.path.exists(path):
+            return None
+
+        bars = np.load(path, mmap_mode='r')
+
+        # NOTE(jkoelker) Days without bars cannot be memory mapped.
+        if not bars.shape[0]:
+            return np.empty(0, dtype=DTYPE)
+
+        return bars
+
+    def write(self, symbol, interval, day, bars):
+        path = self._path(symbol, interval, day)
+        directory = os.path.dirname(path)
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        # NOTE(jkoelker) Write then rename so concurrent readers never see a
+        #                partial file.
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'wb') as f:
+            np.save(f, np.asarray(bars, dtype=DTYPE))
+        os.replace(tmp, path)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+'''
+Transports send the API's HTTP requests.
+
+A transport is any object with a `request(method, url, **kwargs)` method
+    returning a requests.Response, as requests.Session does. API uses its
+    OAuth1 session unless given another transport. A transport with a
+    `bind(session)` method is handed the API's session, so it can wrap it.
+
+`Recorder` captures every response into a gzip compressed cassette and
+    `Replay` serves a cassette back, with optional simulated latency, so
+    the client can be benchmarked and tested without network access or
+    credentials:
+
+    recorder = transport.Recorder('ibm.json.gz')
+    tkapi = TradeKing(..., transport=recorder)
+    tkapi.market.options.quote('IBM')
+    recorder.save()
+
+    tkapi = TradeKing('', '', '', '', transport=transport.Replay(
+        'ibm.json.gz', latency=0.05))
+'''
+
+import base64
+import gzip
+import json
+import random
+import threading
+import time
+import urllib.parse
+
+import requests
+from requests import structures
+
+
+# NOTE(jkoelker) Only these keyword arguments change what is requested.
+_KEY_KWARGS = ('params', 'data')
+
+
+def _normalize(value):
+    if value is None:
+        return None
+
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+
+    if isinstance(value, dict):
+        return sorted((str(k), str(v)) for k, v in value.items())
+
+    return str(value)
+
+
+def key(method, url, **kwargs):
+    '''
+    The cassette key of a request.
+
+    The scheme and host are dropped so a cassette recorded against one
+        base url replays against another.
+    '''
+    path = urllib.parse.urlsplit(url)
+    path = urllib.parse.urlunsplit(('', '', path.path, path.query, ''))
+    return json.dumps([method.upper(), path] +
+                      [_normalize(kwargs.get(name)) for name in _KEY_KWARGS])
+
+
+def _encode_body(body):
+    try:
+        return {'text': body.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'base64': base64.b64encode(body).decode('ascii')}
+
+
+def _decode_body(body):
+    if 'text' in body:
+        return body['text'].encode('utf-8')
+
+    return base64.b64decode(body['base64'])
+
+
+def response(status_code=200, content=b'', headers=None, url=None):
+    '''A requests.Response holding `content`.'''
+    r = requests.Response()
+    r.status_code = status_code
+    r.headers = structures.CaseInsensitiveDict(headers or {})
+    r.url = url
+    r.encoding = 'utf-8'
+    r._content = content
+    # NOTE(jkoelker) Marks the body as read so iter_content serves it even
+    #                for stream=True requests.
+    r._content_consumed = True
+    return r
+
+
+def load(path):
+    '''Read a cassette, returning a dict of key to list of interactions.'''
+    interactions = {}
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            interaction = json.loads(line)
+            interactions.setdefault(interaction['key'],
+                                    []).append(interaction)
+
+    return interactions
+
+
+class Recorder(object):
+    '''
+    Record the responses of `transport` (the API's session by default).
+
+    Interactions are kept in memory until `save` writes the cassette to
+        `path`, one JSON object per line, gzip compressed. Request headers,
+        and so the OAuth signature, are never recorded.
+    '''
+    def __init__(self, path, transport=None):
+        self.path = path
+        self.transport = transport
+        self.interactions = []
+        self._lock = threading.Lock()
+
+    def bind(self, session):
+        if self.transport is None:
+            self.transport = session
+
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.save()
+
+    def request(self, method, url, **kwargs):
+        r = self.transport.request(method, url, **kwargs)
+
+        # NOTE(jkoelker) Reading a streaming body here would block until the
+        #                stream ends, pass those through unrecorded.
+        if kwargs.get('stream'):
+            return r
+
+        interaction = {'key': key(method, url, **kwargs),
+                       'status_code': r.status_code,
+                       'headers': dict(r.headers),
+                       'body': _encode_body(r.content)}
+
+        with self._lock:
+            self.interactions.append(interaction)
+
+        return r
+
+    def save(self):
+        with self._lock:
+            interactions = list(self.interactions)
+
+        with gzip.open(self.path, 'wt', encoding='utf-8') as f:
+            for interaction in interactions:
+                f.write(json.dumps(interaction, sort_keys=True))
+                f.write('\n')
+
+
+class Replay(object):
+    '''
+    Serve the responses of a cassette recorded by Recorder.
+
+    Each request sleeps `latency` seconds plus up to `jitter` more before
+        its response is returned. A request recorded several times replays
+        its responses in order, repeating the last one once they run out.
+        Requests missing from the cassette raise KeyError.
+
+    `requests` counts the requests served.
+    '''
+    def __init__(self, path=None, interactions=None, latency=0, jitter=0,
+                 rng=None, sleep=time.sleep):
+        if interactions is None:
+            interactions = load(path)
+
+        self.interactions = interactions
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._rng = rng or random.Random()
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._served = {}
+
+    def request(self, method, url, **kwargs):
+        request_key = key(method, url, **kwargs)
+
+        with self._lock:
+            recorded = self.interactions.get(request_key)
+
+            if not recorded:
+                raise KeyError('Request not in cassette: %s' % request_key)
+
+            served = self._served.get(request_key, 0)
+            self._served[request_key] = served + 1
+            self.requests = self.requests + 1
+            interaction = recorded[min(served, len(recorded) - 1)]
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+
+        if delay:
+            self._sleep(delay)
+
+        return response(status_code=interaction['status_code'],
+                        content=_decode_body(interaction['body']),
+                        headers=interaction['headers'], url=url)
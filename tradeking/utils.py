@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 
-import itertools
+import functools
+import threading
 import time
 
+import numpy as np
 import pandas as pd
 
 
@@ -12,41 +14,229 @@ LONG = 'L'
 SHORT = 'S'
 
 
+def _is_int(value):
+    return isinstance(value, (int, np.integer)) and not isinstance(value,
+                                                                   bool)
+
+
 class Price(int):
+    '''
+    Fixed-point price, an int of thousandths (7.95 is Price(7.95) == 7950).
+
+    Arithmetic keeps the type and the scale: adding or subtracting Prices
+        or decimal shifted ints, negating and multiplying or dividing by a
+        number return a Price, rounding to the nearest thousandth. Dividing
+        one Price by another returns their float ratio. Operations with
+        arrays defer to numpy (see PriceArray).
+
+    `encode` and `decode` accept scalars or whole arrays.
+    '''
     BASE = 1000.0
 
     def __new__(cls, value=0):
         return int.__new__(cls, cls.encode(value))
 
+    @classmethod
+    def _raw(cls, value):
+        '''A Price from an already decimal shifted int.'''
+        return int.__new__(cls, value)
+
     def __str__(self):
         return self.__repr__()
 
     def __repr__(self):
         return self._decode().__repr__()
 
+    def __reduce__(self):
+        return (Price._raw, (int(self),))
+
     @classmethod
     def encode(cls, value):
-        return int(value * cls.BASE)
+        if np.ndim(value):
+            return np.round(np.asarray(value, dtype=np.float64) *
+                            cls.BASE).astype(np.int64)
+
+        return int(round(float(value) * cls.BASE))
 
     @classmethod
     def decode(cls, value):
+        if np.ndim(value):
+            return np.asarray(value, dtype=np.float64) / cls.BASE
+
         return float(value) / cls.BASE
 
     def _decode(self):
         return self.decode(self.real)
 
+    def __add__(self, other):
+        if _is_int(other):
+            return Price._raw(int(self) + int(other))
+        return NotImplemented
 
-def option_symbol(underlying, expiration, call_put, strike):
-    '''Format an option symbol from its component parts.'''
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if _is_int(other):
+            return Price._raw(int(self) - int(other))
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if _is_int(other):
+            return Price._raw(int(other) - int(self))
+        return NotImplemented
+
+    def __neg__(self):
+        return Price._raw(-int(self))
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Price._raw(abs(int(self)))
+
+    def __mul__(self, other):
+        if isinstance(other, Price):
+            return Price._raw(int(round(int(self) * int(other) / self.BASE)))
+
+        if _is_int(other):
+            return Price._raw(int(self) * int(other))
+
+        if isinstance(other, (float, np.floating)):
+            return Price._raw(int(round(int(self) * other)))
+
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Price):
+            return int(self) / int(other)
+
+        if isinstance(other, (int, float, np.number)):
+            return Price._raw(int(round(int(self) / other)))
+
+        return NotImplemented
+
+
+class PriceArray(np.ndarray):
+    '''
+    int64 array of decimal shifted prices that stays fixed-point.
+
+    Addition, subtraction, negation, abs, maximum, minimum and sums keep
+        the PriceArray type. Multiplying or dividing by plain numbers rounds
+        back to whole thousandths, dividing by another PriceArray gives the
+        float ratio and comparisons give plain bool arrays. Scalars taken
+        out of it are Price.
+
+        prices = PriceArray.encode([7.95, 8.10])
+        (prices * 2).decode()
+    '''
+    _PRESERVE = (np.add, np.subtract, np.negative, np.positive, np.absolute,
+                 np.maximum, np.minimum, np.fmax, np.fmin)
+    _SCALE = (np.multiply, np.true_divide, np.floor_divide)
+
+    def __new__(cls, values=()):
+        return np.asarray(values, dtype=np.int64).view(cls)
+
+    @classmethod
+    def encode(cls, values):
+        '''A PriceArray of float `values`.'''
+        return Price.encode(np.atleast_1d(values)).view(cls)
+
+    def decode(self):
+        '''The prices as a float64 ndarray.'''
+        return Price.decode(self.view(np.ndarray))
+
+    def __repr__(self):
+        return 'PriceArray(%s)' % np.array2string(self.decode())
+
+    def __str__(self):
+        return np.array2string(self.decode())
+
+    def __getitem__(self, key):
+        value = super(PriceArray, self).__getitem__(key)
+
+        if isinstance(value, np.integer):
+            return Price._raw(int(value))
+
+        return value
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        prices = [isinstance(i, (PriceArray, Price)) for i in inputs]
+        raw = [i.view(np.ndarray) if isinstance(i, PriceArray)
+               else int(i) if isinstance(i, Price) else i for i in inputs]
+
+        if 'out' in kwargs:
+            kwargs['out'] = tuple(o.view(np.ndarray)
+                                  if isinstance(o, PriceArray) else o
+                                  for o in kwargs['out'])
+
+        result = getattr(ufunc, method)(*raw, **kwargs)
+
+        if result is NotImplemented or method not in ('__call__', 'reduce',
+                                                      'accumulate'):
+            return result
+
+        if ufunc in self._SCALE:
+            if ufunc is np.multiply and all(prices):
+                result = np.asarray(result) / Price.BASE
+            elif ufunc is not np.multiply and prices[-1]:
+                # NOTE(jkoelker) Price / Price is a plain ratio.
+                return result
+
+            result = np.asarray(result)
+
+            if result.dtype.kind == 'f':
+                result = np.round(result)
+        elif ufunc not in self._PRESERVE:
+            return result
+
+        # NOTE(jkoelker) Integral results, in place ones included, are only
+        #                viewed so `payoffs += leg_payoffs` does not copy.
+        result = np.asarray(result).astype(np.int64, copy=False)
+
+        if result.ndim == 0:
+            return Price._raw(int(result))
+
+        return result.view(PriceArray)
+
+
+@functools.lru_cache(maxsize=4096)
+def _format_expiration(expiration):
+    return pd.to_datetime(expiration).strftime('%y%m%d')
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_expiration(expiration):
+    return pd.to_datetime(expiration, format='%y%m%d')
+
+
+def format_expiration(expiration):
+    '''Format an expiration as the YYMMDD of an option symbol.'''
+    try:
+        return _format_expiration(expiration)
+    except TypeError:
+        return pd.to_datetime(expiration).strftime('%y%m%d')
+
+
+def format_strikes(strikes):
+    '''Format an array of strikes as the 8 digit strikes of option symbols.'''
+    return np.char.zfill(Price.encode(np.atleast_1d(strikes)).astype(str), 8)
+
+
+def _check_call_put(call_put):
     call_put = call_put.upper()
     if call_put not in (CALL, PUT):
         raise ValueError("call_put value not one of ('%s', '%s'): %s" %
                          (CALL, PUT, call_put))
+    return call_put
 
-    expiration = pd.to_datetime(expiration).strftime('%y%m%d')
 
-    strike = str(Price.encode(strike)).rstrip('L')
-    strike = ('0' * (8 - len(strike))) + strike
+def option_symbol(underlying, expiration, call_put, strike):
+    '''Format an option symbol from its component parts.'''
+    call_put = _check_call_put(call_put)
+    expiration = format_expiration(expiration)
+    strike = '%08d' % Price.encode(strike)
 
     return '%s%s%s%s' % (underlying, expiration, call_put, strike)
 
@@ -64,8 +254,16 @@ def option_symbols(underlying, expirations, strikes, calls=True, puts=True):
     if puts:
         call_put = call_put + PUT
 
-    return [option_symbol(*args) for args in
-            itertools.product([underlying], expirations, call_put, strikes)]
+    # NOTE(jkoelker) Format each expiration and strike once, the product is
+    #                then only string concatenation.
+    expirations = [underlying + format_expiration(expiration)
+                   for expiration in expirations]
+    strikes = format_strikes(strikes).tolist()
+
+    return [expiration + cp + strike
+            for expiration in expirations
+            for cp in call_put
+            for strike in strikes]
 
 
 def parse_option_symbol(symbol):
@@ -76,11 +274,151 @@ def parse_option_symbol(symbol):
     '''
     strike = Price.decode(symbol[-8:])
     call_put = symbol[-9:-8].upper()
-    expiration = pd.to_datetime(symbol[-15:-9])
+    expiration = _parse_expiration(symbol[-15:-9])
     underlying = symbol[:-15].upper()
     return underlying, expiration, call_put, strike
 
 
+def parse_option_symbols(symbols):
+    '''
+    Parse many option symbols at once.
+
+    returns a DataFrame with the columns underlying, expiration
+        (datetime64), call_put and strike (decimal shifted int64 as
+        Price.encode would return).
+    '''
+    symbols = pd.Series(symbols, dtype=object).str
+
+    expirations = symbols[-15:-9]
+    return pd.DataFrame({
+        'underlying': symbols[:-15].str.upper(),
+        'expiration': pd.to_datetime(expirations, format='%y%m%d',
+                                     cache=True),
+        'call_put': symbols[-9:-8].str.upper(),
+        'strike': symbols[-8:].astype(np.int64),
+    })
+
+
+class _Cache(dict):
+    '''
+    Per instance store of cached_property values.
+
+    Entries are (value, expires) tuples, `expires` being None for values
+        that never expire.
+    '''
+    def __init__(self):
+        super(_Cache, self).__init__()
+        self._lock = threading.Lock()
+        self._locks = {}
+        self._generations = {}
+
+    def lock(self, name):
+        with self._lock:
+            lock = self._locks.get(name)
+
+            if lock is None:
+                lock = self._locks[name] = threading.RLock()
+
+            return lock
+
+    def generation(self, name):
+        return self._generations.get(name, 0)
+
+    def invalidate(self, name):
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+            return self.pop(name, None) is not None
+
+
+_CACHE_LOCK = threading.Lock()
+
+
+def _instance_cache(inst):
+    try:
+        return inst._cache
+    except AttributeError:
+        pass
+
+    with _CACHE_LOCK:
+        try:
+            return inst._cache
+        except AttributeError:
+            pass
+
+        try:
+            inst._cache = _Cache()
+        except AttributeError:
+            raise TypeError("%s has no '_cache' slot for its cached "
+                            "properties" % type(inst).__name__)
+
+        return inst._cache
+
+
+def invalidate(inst, *names):
+    '''
+    Drop the cached values of `names` on `inst`, and of every cached
+        property depending on them.
+    '''
+    cache = getattr(inst, '_cache', None)
+
+    if cache is None:
+        return
+
+    owner = type(inst)
+    names = list(names)
+
+    while names:
+        name = names.pop()
+        prop = getattr(owner, name, None)
+
+        if not isinstance(prop, cached_property):
+            continue
+
+        if cache.invalidate(name):
+            prop._count('invalidations')
+
+        names.extend(prop.dependents)
+
+
+class _Dependency(object):
+    '''
+    Attribute that invalidates the cached properties depending on it when
+        it is set or deleted. Wraps the attribute's slot when it has one.
+    '''
+    def __init__(self, name, slot=None):
+        self.name = name
+        self.slot = slot
+        self.dependents = set()
+
+    def __get__(self, inst, owner):
+        if inst is None:
+            return self
+
+        if self.slot is not None:
+            return self.slot.__get__(inst, owner)
+
+        try:
+            return inst.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+
+    def __set__(self, inst, value):
+        if self.slot is not None:
+            self.slot.__set__(inst, value)
+        else:
+            inst.__dict__[self.name] = value
+
+        invalidate(inst, *self.dependents)
+
+    def __delete__(self, inst):
+        if self.slot is not None:
+            self.slot.__delete__(inst)
+        else:
+            del inst.__dict__[self.name]
+
+        invalidate(inst, *self.dependents)
+
+
 #
 # © 2011 Christopher Arndt, MIT License
 #
@@ -92,7 +430,6 @@ class cached_property(object):
 
         import random
 
-        # the class containing the property must be a new-style class
         class MyClass(object):
             # create property whose value is cached for ten minutes
             @cached_property(ttl=600)
@@ -100,24 +437,33 @@ class cached_property(object):
                 # will only be evaluated every 10 min. at maximum.
                 return random.randint(0, 100)
 
-    The value is cached  in the '_cache' attribute of the object instance that
-    has the property getter method wrapped by this decorator. The '_cache'
-    attribute value is a dictionary which has a key for every property of the
-    object which is wrapped by this decorator. Each entry in the cache is
-    created only when the property is accessed for the first time and is a
-    two-element tuple with the last computed property value and the last time
-    it was updated in seconds since the epoch.
+    Values are kept in the instance's `_cache` attribute, created on first
+        use. Classes with `__slots__` must include a '_cache' slot.
+
+    The default time-to-live (TTL) is 300 seconds (5 minutes), measured with
+        `clock` (time.monotonic by default). Set the TTL to zero for the
+        cached value to never expire.
 
-    The default time-to-live (TTL) is 300 seconds (5 minutes). Set the TTL to
-    zero for the cached value to never expire.
+    Concurrent first accesses from several threads compute the value once;
+        the other threads wait for it.
 
-    To expire a cached property value manually just do::
+    `depends` names attributes (or other cached properties) the value is
+        derived from. Setting or deleting any of them drops the cached value
+        so the next access recomputes it. To expire a value manually::
 
-        del instance._cache[<property name>]
+        utils.invalidate(instance, <property name>)
 
+    Counters of hits, misses, expirations and invalidations across every
+        instance are returned by `stats`, e.g. `MyClass.randint.stats()`.
     '''
-    def __init__(self, ttl=300):
+    def __init__(self, ttl=300, depends=(), clock=time.monotonic):
         self.ttl = ttl
+        self.depends = tuple(depends)
+        self.clock = clock
+        self.dependents = set()
+        self._stats_lock = threading.Lock()
+        self._stats = dict.fromkeys(('hits', 'misses', 'expirations',
+                                     'invalidations'), 0)
 
     def __call__(self, fget, doc=None):
         self.fget = fget
@@ -126,17 +472,67 @@ class cached_property(object):
         self.__module__ = fget.__module__
         return self
 
+    def __set_name__(self, owner, name):
+        self.__name__ = name
+
+        for attr in self.depends:
+            existing = owner.__dict__.get(attr)
+
+            if isinstance(existing, (cached_property, _Dependency)):
+                existing.dependents.add(name)
+                continue
+
+            slot = existing if hasattr(existing, '__set__') else None
+            dependency = _Dependency(attr, slot=slot)
+            dependency.dependents.add(name)
+            setattr(owner, attr, dependency)
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self._stats[stat] = self._stats[stat] + 1
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _fresh(self, entry):
+        return entry is not None and (entry[1] is None or
+                                      self.clock() < entry[1])
+
     def __get__(self, inst, owner):
-        now = time.time()
-        try:
-            value, last_update = inst._cache[self.__name__]
-            if self.ttl > 0 and now - last_update > self.ttl:
-                raise AttributeError
-        except (KeyError, AttributeError):
+        if inst is None:
+            return self
+
+        name = self.__name__
+        cache = _instance_cache(inst)
+        entry = cache.get(name)
+
+        if self._fresh(entry):
+            self._count('hits')
+            return entry[0]
+
+        with cache.lock(name):
+            entry = cache.get(name)
+
+            # NOTE(jkoelker) Another thread may have computed it meanwhile.
+            if self._fresh(entry):
+                self._count('hits')
+                return entry[0]
+
+            if entry is not None:
+                self._count('expirations')
+
+            self._count('misses')
+            generation = cache.generation(name)
             value = self.fget(inst)
-            try:
-                cache = inst._cache
-            except AttributeError:
-                cache = inst._cache = {}
-            cache[self.__name__] = (value, now)
-        return value
+            expires = None
+
+            if self.ttl > 0:
+                expires = self.clock() + self.ttl
+
+            # NOTE(jkoelker) Never store a value computed from dependencies
+            #                that changed while it was being computed.
+            if cache.generation(name) == generation:
+                cache[name] = (value, expires)
+
+            return value